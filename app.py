@@ -1,550 +1,572 @@
-from flask import Flask, render_template, request, jsonify
-import random
+import atexit
+import hmac
+import multiprocessing
+import os
+import re
+import secrets
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from flask import Flask, Response, g, render_template, request, jsonify, send_from_directory
+
+from assets import ASSET_DIR, ASSET_MAX_AGE, CARD_BACK_IMAGE, variants
+import mcts
+import metrics
+import policy
+import serialize
+from engine import ADMIN, AUDIENCES, PHASE_SECONDS, PLAYER, SPECTATOR, AIDecision, Game, PhaseTimer
+from rooms import RoomRegistry
+from snapshots import SnapshotStore
+from store import VersionConflict, open_store
+from timers import Scheduler
 
 app = Flask(__name__)
 
-# ---------------- CARD DATA (Simplified for this file) ----------------
-CARD_NAMES = {
-    "Attack": 3, "Skip": 3, "Favor": 3,
-    "See the Future": 3, "Shuffle": 3, "Nope": 5, "Defuse": 4 
-}
-CARD_IMAGE_PATHS = [f"images/card{i}.jpg" for i in range(1, 46)]
-
-class Card:
-    available_images = CARD_IMAGE_PATHS.copy()
-
-    def __init__(self, name):
-        self.name = name
-        if not Card.available_images:
-            Card.available_images = CARD_IMAGE_PATHS.copy()
-        
-        self.image = random.choice(Card.available_images)
-        Card.available_images.remove(self.image)
-
-    def to_dict(self):
-        return {"name": self.name, "image": self.image}
-
-# Define all card classes
-class Defuse(Card):
-    def __init__(self):
-        super().__init__("Defuse")
-class ExplodingKitten(Card):
-    def __init__(self):
-        super().__init__("Exploding Kitten")
-class Attack(Card):
-    def __init__(self):
-        super().__init__("Attack")
-class Skip(Card):
-    def __init__(self):
-        super().__init__("Skip")
-class Favor(Card):
-    def __init__(self):
-        super().__init__("Favor")
-class SeeTheFuture(Card):
-    def __init__(self):
-        super().__init__("See the Future")
-class Shuffle(Card):
-    def __init__(self):
-        super().__init__("Shuffle")
-class Nope(Card):
-    def __init__(self):
-        super().__init__("Nope")
-
-
-# ---------------- PLAYER CLASS & GAME STATE ----------------
-class Player:
-    def __init__(self, name, is_human=True):
-        self.name = name
-        self.hand = []
-        self.is_alive = True
-        self.is_human = is_human
-
-players = []
-deck = []
-current_player_idx = 0
-game_started = False
-turns_to_take = 1 
-pending_action = None 
-
-# ---------------- HELPERS ----------------
-def get_next_player_index(start_idx):
-    idx = start_idx
-    count = 0
-    max_count = len(players) * 2
-    while True:
-        idx = (idx + 1) % len(players)
-        if players[idx].is_alive:
-            return idx
-        if count >= max_count:
-            return -1
-        count += 1
-
-def change_turn():
-    global current_player_idx, turns_to_take
-    turns_to_take = max(0, turns_to_take - 1)
-    if turns_to_take == 0:
-        current_player_idx = get_next_player_index(current_player_idx)
-        if current_player_idx != -1:
-            turns_to_take = 1
-    return current_player_idx
-
-def check_win_condition():
-    alive_players = [p for p in players if p.is_alive]
-    if len(alive_players) == 1:
-        winner = alive_players[0]
-        return winner, {"type": "win", "player": winner.name, "message": f"🏆 {winner.name} wins the game! 🏆"}
-    if len(alive_players) == 0:
-        return None, {"type": "game_broken", "message": "Game over! No remaining players. Restarting is recommended."}
-    return None, None
-
-
-# ---------------- AI LOGIC ----------------
-def process_ai_turns():
-    moves = []
-    max_iterations = len(players) * 5 
-    count = 0
-    
-    while current_player_idx != -1 and players[current_player_idx].is_alive and not players[current_player_idx].is_human:
-        if count >= max_iterations: 
-            moves.append({"type": "error", "message": "AI turn sequence stalled."})
-            break 
-        count += 1
-        
-        ai = players[current_player_idx]
-        is_turn_skipped_by_play = False
-        
-        # --- AI Card Playing Phase ---
-        ai_played_card = True
-        while ai_played_card and not is_turn_skipped_by_play:
-            ai_played_card = False
-            
-            playables = [c for c in ai.hand if not isinstance(c, ExplodingKitten) and not isinstance(c, Defuse)]
-            played_card = None
-            
-            # 1. See the Future
-            see_future_cards = [c for c in playables if isinstance(c, SeeTheFuture)]
-            if see_future_cards and (len(deck) < 5 or any(isinstance(c, Defuse) for c in ai.hand)):
-                played_card = see_future_cards[0]
-            
-            # 2. Attack
-            attack_cards = [c for c in playables if isinstance(c, Attack)]
-            if not played_card and attack_cards:
-                played_card = attack_cards[0]
-            
-            # 3. Shuffle
-            shuffle_cards = [c for c in playables if isinstance(c, Shuffle)]
-            if not played_card and shuffle_cards and random.random() < 0.2:
-                played_card = shuffle_cards[0]
-            
-            # 4. Favor 
-            favor_cards = [c for c in playables if isinstance(c, Favor)]
-            if not played_card and favor_cards and len(ai.hand) < 4:
-                played_card = favor_cards[0]
-            
-            if played_card:
-                ai.hand.remove(played_card)
-                ai_played_card = True
-                
-                moves.append({
-                    "type": "ai_play",
-                    "player": ai.name,
-                    "card": played_card.to_dict(),
-                    "message": f"{ai.name} played {played_card.name}"
-                })
-                
-                # Execute Card Effect 
-                if isinstance(played_card, Attack):
-                    next_idx = get_next_player_index(current_player_idx)
-                    global turns_to_take
-                    turns_to_take += 2
-                    is_turn_skipped_by_play = True
-                    
-                elif isinstance(played_card, Skip):
-                    is_turn_skipped_by_play = True
-                    
-                elif isinstance(played_card, Shuffle):
-                    random.shuffle(deck)
-                    moves.append({"type": "shuffle_effect", "message": "The Deck was Shuffled!"})
-
-                elif isinstance(played_card, SeeTheFuture):
-                    top_three = [c.name for c in deck[:3]]
-                    moves.append({"type": "seefuture_effect", "player": ai.name, "cards": top_three, "message": f"{ai.name} saw the top 3 cards."})
-                    
-                elif isinstance(played_card, Favor):
-                    target_players = [p for p in players if p.name != ai.name and p.is_alive and p.hand]
-                    if target_players:
-                        target = random.choice(target_players)
-                        stolen_card_idx = random.randint(0, len(target.hand) - 1)
-                        stolen_card = target.hand.pop(stolen_card_idx)
-                        ai.hand.append(stolen_card)
-                        moves.append({"type": "favor_effect", "player": ai.name, "target": target.name, "message": f"{ai.name} stole a card from {target.name}."})
-
-
-        # --- Draw Card Phase ---
-        if turns_to_take > 0 and ai.is_alive and not is_turn_skipped_by_play: 
-            
-            if deck:
-                card = deck.pop(0)
-                
-                if isinstance(card, ExplodingKitten):
-                    defuse = next((c for c in ai.hand if isinstance(c, Defuse)), None)
-                    if defuse:
-                        ai.hand.remove(defuse)
-                        deck.insert(random.randint(0, len(deck)), card) 
-                        moves.append({"type": "ai_defuse", "player": ai.name, "message": f"{ai.name} drew Exploding Kitten but used Defuse!"})
-                    else:
-                        ai.is_alive = False
-                        moves.append({"type": "ai_explode", "player": ai.name, "dead_player_index": players.index(ai), "message": f"{ai.name} drew Exploding Kitten and exploded! 💀"})
-                else:
-                    ai.hand.append(card)
-                    moves.append({"type": "ai_draw", "player": ai.name, "card": {"name": card.name}, "message": f"{ai.name} drew a card."})
-            else:
-                moves.append({"type": "error", "message": "Deck is empty in AI draw phase."})
-            
-            # --- End of Turn ---
-            change_turn()
-            
-            winner, win_move = check_win_condition()
-            if win_move:
-                moves.append(win_move)
-                if winner or win_move["type"] == "game_broken":
+# ---------------- ROOMS ----------------
+# Every table lives in its own room. The room id travels in the "room" query
+# parameter / JSON field, falling back to a cookie for plain browser sessions.
+ROOM_COOKIE = "room_id"
+
+# With GAME_STORE set (see store.py) every worker process reads and writes
+# the same versioned copy of each room, so rooms can be served by any worker.
+# Without it rooms live in this process, and every change is snapshotted to
+# SQLite in the background so games survive a restart (SNAPSHOT_DB="" turns
+# that off). Either way, rooms this process has not seen are loaded on first use.
+GAME_STORE = os.environ.get("GAME_STORE", "")
+store = open_store(GAME_STORE)
+MAX_RETRIES = 5
+
+SNAPSHOT_DB = os.environ.get("SNAPSHOT_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "games.db"))
+snapshots = SnapshotStore(SNAPSHOT_DB) if SNAPSHOT_DB and store is None else None
+if snapshots is not None:
+    atexit.register(snapshots.close)
+
+def load_room(room_id):
+    if store is not None:
+        return store.load(room_id)
+    game = snapshots.load(room_id) if snapshots is not None else None
+    return (game, 0) if game is not None else None
+
+rooms = RoomRegistry(Game, loader=load_room)
+
+# Ids rooms.new_room_id() makes are 11 of these; anything else a client
+# sends is treated as no room at all
+ROOM_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+def valid_room_id(room_id):
+    return room_id if isinstance(room_id, str) and ROOM_ID.fullmatch(room_id) else None
+
+def get_room_id():
+    data = request.get_json(silent=True) or {}
+    return valid_room_id(request.args.get("room") or data.get("room") or request.cookies.get(ROOM_COOKIE))
+
+def no_room():
+    return jsonify({"error": "Game not found. Start a new game."})
+
+# ?view=spectator watches a table without its hidden cards; ?view=admin
+# shows everything and needs the X-Admin-Token header (see engine.AUDIENCES).
+# The seated player's view (the default) needs the seat token /start_game
+# handed out, in the seat_<room id> cookie or the X-Seat-Token header.
+# Without it a request watches as a spectator and cannot move.
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+SEAT_COOKIE = "seat_"
+
+def seat_cookie(room_id):
+    return SEAT_COOKIE + room_id
+
+def is_seated(game, token):
+    secret = game.seat_token
+    return bool(secret and token) and hmac.compare_digest(token.encode(), secret.encode())
+
+def audience_for(view, token, seated=False):
+    # None when the view is unknown, or admin without the right token
+    view = view or PLAYER
+    if view not in AUDIENCES:
+        return None
+    if view == ADMIN and not (ADMIN_TOKEN and hmac.compare_digest((token or "").encode(), ADMIN_TOKEN.encode())):
+        return None
+    if view == PLAYER and not seated:
+        return SPECTATOR
+    return view
+
+def get_seat_token(room_id):
+    return request.headers.get("X-Seat-Token") or request.cookies.get(seat_cookie(room_id))
+
+def get_audience(room):
+    seated = is_seated(room.game, get_seat_token(room.id))
+    return audience_for(request.args.get("view"), request.headers.get("X-Admin-Token"), seated)
+
+def as_seat(token, action):
+    # A move only the seated player may make; act() runs it on the latest state
+    def run(game):
+        if not is_seated(game, token):
+            return {"error": "Only the player seated at this table can move."}
+        return action(game)
+    return run
+
+def bad_view():
+    return jsonify({"error": "Unknown view, or not allowed to use it."}), 403
+
+def respond(payload):
+    # serialize.dumps (orjson when installed), timed as the "response" phase (see /metrics)
+    start = time.perf_counter()
+    response = Response(serialize.dumps(payload), mimetype="application/json")
+    PHASE_SECONDS.observe(time.perf_counter() - start, "response")
+    return response
+
+def game_etag(room, audience=PLAYER):
+    # Every change to a game appends to its event log, so the room id plus
+    # the latest sequence number identifies one version of the table
+    etag = f"{room.id}-{room.game.seq}"
+    return etag if audience == PLAYER else f"{etag}-{audience}"
+
+def not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+def refresh(room):
+    # Called with room.lock held: pick up whatever other workers have saved
+    if store is None or store.version(room.id) == room.version:
+        return
+    room.game, room.version = store.load(room.id) or (Game(), 0)
+
+def commit(room):
+    # Called with room.lock held after the game changed
+    if store is not None:
+        room.version = store.save(room.id, room.game, room.version)
+    elif snapshots is not None:
+        # Only packs the bytes, the write is batched
+        snapshots.save(room.id, room.game)
+
+# A retried request (double click, lost response) carries the same
+# Idempotency-Key header / "idempotency_key" field and gets the first
+# answer back instead of acting twice. "expected_seq" (the last event the
+# client has seen) refuses moves made against an out-of-date table. Keys
+# are remembered with the game for its last RESPONSE_CACHE moves, so with a
+# GAME_STORE every worker sees them.
+RESPONSE_CACHE = 16
+MAX_KEY_LENGTH = 128
+REPEATS = metrics.Counter("ek_repeated_actions_total", "Mutating requests answered without running them", label="reason")
+
+def guard(header, data):
+    # act()'s (key, expected) from the Idempotency-Key header and JSON body; either may be None
+    key = header or data.get("idempotency_key")
+    expected = data.get("expected_seq")
+    return (str(key)[:MAX_KEY_LENGTH] if key else None), (expected if type(expected) is int else None)
+
+def get_guard(data):
+    return guard(request.headers.get("Idempotency-Key"), data)
+
+def act(room, action, key=None, expected=None):
+    """Run action(game) on the room's latest state and save the result.
+    If another worker saved the room in between, reload and run it again."""
+    for _ in range(MAX_RETRIES):
+        with room.lock:
+            refresh(room)
+            responses = room.game.responses
+            if key is not None and key in responses:
+                REPEATS.inc("retry")
+                return responses[key]
+            seq = room.game.seq
+            if expected is not None and expected != seq:
+                REPEATS.inc("stale")
+                return {"error": "The table changed before your move arrived.", "stale": True, "seq": seq}
+            result = action(room.game)
+            if key is not None:
+                # Before the commit, so the saved copy carries it too
+                responses[key] = result
+                if len(responses) > RESPONSE_CACHE:
+                    responses.popitem(last=False)
+            # Every change logs an event; errors leave the game untouched
+            if room.game.seq != seq:
+                try:
+                    commit(room)
+                except VersionConflict:
+                    room.version = -1 # stale, reload on the next try
+                    continue
+            after_action(room)
+            return result
+    return {"error": "The table is busy, please try again."}
+
+
+# ---------------- PUSH (SSE) ----------------
+# In push mode human requests return as soon as their own move is done. AI
+# seats are played on a small thread pool, one move at a time, and every
+# logged event reaches /stream subscribers (players and spectators alike).
+AI_MOVE_DELAY = 1.2 # seconds between AI moves, was the client-side delay
+STREAM_KEEPALIVE = 15
+# Moves saved by other workers don't wake our streams, so those poll the store
+STREAM_POLL = 0.5
+ai_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="ai")
+# Called as hook(room), with room.lock held, whenever a room may have logged
+# new events; asgi.py uses it to wake its async waiters
+change_hooks = []
+
+def notify(room):
+    room.changed.notify_all()
+    for hook in change_hooks:
+        hook(room)
+
+def after_action(room):
+    # Called with room.lock held after anything that may have logged events
+    notify(room)
+    game = room.game
+    if not game.auto_ai and not room.ai_running and game.ai_to_move():
+        room.ai_running = True
+        ai_pool.submit(run_ai, room)
+    start_clock(room)
+
+class AIChain:
+    # One push-mode run of the AI seats: the ai_moves() generator and where it got to
+    def __init__(self, room, game):
+        self.room = room
+        self.game = game
+        self.epoch = game.events_start
+        self.steps = game.ai_moves()
+        self.reply = None
+        self.thinking = 0.0
+        self.timer = PhaseTimer()
+
+def run_ai(room):
+    with room.lock:
+        game = room.game
+        game.log_action("a")
+        chain = AIChain(room, game)
+    ai_step(chain)
+
+def ai_step(chain):
+    # Plays the chain up to its next visible move. The pause before the one
+    # after is a timer, so no pool worker sleeps through it.
+    room = chain.room
+    game = chain.game
+    done = True
+    try:
+        while True:
+            with room.lock:
+                refresh(room)
+                if room.game is not game or game.events_start != chain.epoch:
+                    break # the room was restarted or moved on underneath us
+                try:
+                    move = chain.timer.send(chain.steps, chain.reply)
+                except StopIteration:
                     break
-
-    moves.append({"new_current_player": current_player_idx, "turns_to_take": turns_to_take})
-    return moves
+                chain.reply = None
+                if not isinstance(move, AIDecision):
+                    game.record([move])
+                    try:
+                        commit(room)
+                    except VersionConflict:
+                        room.version = -1
+                        break
+                    notify(room)
+            if isinstance(move, AIDecision):
+                # Think without holding the room lock; the time spent comes
+                # out of the pause after the move it produces
+                start = time.monotonic()
+                try:
+                    chain.reply = policy.TABLE.decide(move.view, search)
+                except Exception:
+                    app.logger.exception("AI search failed, drawing instead")
+                    chain.reply = None
+                chain.thinking += time.monotonic() - start
+                chain.timer.add("ai_search", time.monotonic() - start)
+                continue
+            if "player" in move:
+                delay = max(0.0, AI_MOVE_DELAY - chain.thinking)
+                chain.thinking = 0.0
+                timers.schedule((room.id, "ai"), delay, lambda: in_pool(ai_step, chain))
+                done = False
+                return
+    finally:
+        if done:
+            chain.timer.observe()
+            with room.lock:
+                room.ai_running = False
+                # A restarted game (or a stalled chain) may still need the AI
+                after_action(room)
+
+
+# ---------------- TURN CLOCK ----------------
+# Every room's deadlines sit on one timer thread (see timers.py). When the
+# person to move lets their clock run out the server moves for them: it
+# picks their pending Favor card, otherwise it draws. The clock restarts
+# whenever the game changes, so only an idle seat times out. 0 turns it off.
+TURN_TIMEOUT = float(os.environ.get("TURN_TIMEOUT", 60))
+FAVOR_TIMEOUT = float(os.environ.get("FAVOR_TIMEOUT", 30))
+timers = Scheduler()
+
+def in_pool(fn, *args):
+    # For timer callbacks, which must not block the timer thread
+    try:
+        ai_pool.submit(fn, *args)
+    except RuntimeError:
+        pass # the process is shutting down
+
+def start_clock(room):
+    # Called with room.lock held
+    game = room.game
+    key = (room.id, "turn")
+    timeout = FAVOR_TIMEOUT if game.pending_action else TURN_TIMEOUT
+    if not timeout or not game.human_to_move():
+        room.clock_seq = None
+        timers.cancel(key)
+        return
+    if room.clock_seq == game.seq and key in timers:
+        return # nothing happened since the clock started
+    seq = room.clock_seq = game.seq
+    timers.schedule(key, timeout, lambda: in_pool(time_out, room, seq))
+
+def time_out(room, seq):
+    # Without touching the room: an abandoned table still expires
+    if rooms.peek(room.id) is not room:
+        return
+    act(room, lambda game: game.time_out() if game.seq == seq and game.human_to_move() else None)
+
+# ---------------- SEARCH AI ----------------
+# Searched AI seats (see mcts.py) think in a process pool, so the search
+# never holds the GIL of the process serving requests. Workers are spawned
+# on first use rather than forked from this threaded process. Situations
+# already searched (or loaded from policy.bin) come from policy.TABLE.
+SEARCH_WORKERS = os.cpu_count() or 1
+search_pool = None
+search_pool_lock = threading.Lock()
+
+def search(view):
+    global search_pool
+    with search_pool_lock:
+        if search_pool is None:
+            search_pool = ProcessPoolExecutor(SEARCH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return search_pool.submit(mcts.choose, view).result()
+
+def sse(encoded, reset, seq):
+    # SSE frames for encoded_events() output, which runs up to event `seq`
+    frames = [b"event: reset\ndata: {}\n\n"] if reset else []
+    first = seq - len(encoded) + 1
+    frames += [b"id: %d\ndata: %s\n\n" % (first + i, data) for i, data in enumerate(encoded)]
+    return b"".join(frames)
+
+def events_json(encoded):
+    return serialize.Raw(b"[" + b",".join(encoded) + b"]")
+
+# ---------------- METRICS ----------------
+# Prometheus text on /metrics. Route latency is measured here; the game
+# loop's phases and event counts come from engine.py.
+ROUTE_SECONDS = metrics.Histogram("ek_route_seconds", "Request latency by route", label="route")
+metrics.Gauge("ek_rooms", "Rooms held by this worker", lambda: len(rooms))
+metrics.Gauge("ek_policy_entries", "Decisions in the AI policy table", lambda: len(policy.TABLE))
+metrics.Gauge("ek_policy_lookups_total", "AI policy table lookups", label="result", kind="counter",
+              read=lambda: {"hit": policy.TABLE.hits, "miss": policy.TABLE.misses})
+metrics.Gauge("ek_timers", "Pending turn, Favor and AI move timers", lambda: len(timers))
+metrics.Gauge("ek_store_conflicts_total", "Saves that lost a race to another worker", kind="counter",
+              read=lambda: store.conflicts if store is not None else 0)
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def observe_latency(response):
+    if request.url_rule is not None:
+        # Streams are timed until their headers go out
+        ROUTE_SECONDS.observe(time.perf_counter() - g.request_start, request.url_rule.rule)
+    return response
 
 
 # ---------------- ROUTES ----------------
 @app.route("/")
 def index():
     # Assuming you have an index.html template
-    return render_template("index.html")
+    return render_template("index.html", card_back=variants(CARD_BACK_IMAGE))
+
+@app.route("/assets/<path:filename>")
+def asset(filename):
+    # Built by build_assets.py; names are content hashes, so never revalidate
+    response = send_from_directory(ASSET_DIR, filename, max_age=ASSET_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@app.route("/metrics")
+def metrics_text():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 @app.route("/get_game_state", methods=["GET"])
 def get_game_state():
-    frontend_players = []
-    for p in players:
-        frontend_players.append({
-            "name":p.name,
-            "is_human":p.is_human,
-            "is_alive":p.is_alive,
-            "hand": [c.to_dict() for c in p.hand] if p.is_human else [], 
-            "hand_length": len(p.hand),
-        })
-        
-    return jsonify({
-        "players": frontend_players,
-        "current_player": current_player_idx,
-        "turns_to_take": turns_to_take,
-        "pending_action": pending_action
-    })
+    room = rooms.get(get_room_id())
+    if room is None:
+        return no_room()
+    audience = get_audience(room)
+    if audience is None:
+        return bad_view()
+
+    with room.lock:
+        refresh(room)
+        etag = game_etag(room, audience)
+        if request.if_none_match.contains(etag):
+            return not_modified(etag)
+        state = room.game.get_state(audience)
+    response = respond({"room": room.id, **state})
+    response.set_etag(etag)
+    return response
+
+@app.route("/events", methods=["GET"])
+def events():
+    # Delta sync: only the events after ?since=N, or 304 when nothing is new
+    room = rooms.get(get_room_id())
+    if room is None:
+        return no_room()
+
+    audience = get_audience(room)
+    if audience is None:
+        return bad_view()
+
+    since = request.args.get("since", 0, type=int)
+    with room.lock:
+        refresh(room)
+        etag = game_etag(room, audience)
+        if request.if_none_match.contains(etag):
+            return not_modified(etag)
+        new_events, reset = room.game.encoded_events(since, audience)
+        seq = room.game.seq
+    response = respond({"room": room.id, "seq": seq, "reset": reset, "events": events_json(new_events)})
+    response.set_etag(etag)
+    return response
+
+@app.route("/stream", methods=["GET"])
+def stream():
+    # Server-Sent Events: every event after ?since=N (or Last-Event-ID), then
+    # each new one as soon as it is logged. Every subscriber with the same
+    # ?view= is sent the same encoded bytes.
+    room = rooms.get(get_room_id())
+    if room is None:
+        return no_room()
+    audience = get_audience(room)
+    if audience is None:
+        return bad_view()
+
+    since = request.headers.get("Last-Event-ID", type=int)
+    if since is None:
+        since = request.args.get("since", 0, type=int)
+
+    # A room just restored from a snapshot may be waiting on its AI seats
+    with room.lock:
+        after_action(room)
+
+    wait = STREAM_KEEPALIVE if store is None else STREAM_POLL
+
+    def generate(cursor):
+        idle = 0.0
+        while True:
+            with room.changed:
+                room.changed.wait_for(lambda: room.game.seq != cursor, timeout=wait)
+                refresh(room)
+                new_events, reset = room.game.encoded_events(cursor, audience)
+                cursor = room.game.seq
+            if not new_events:
+                idle += wait
+                if idle < STREAM_KEEPALIVE:
+                    continue
+                idle = 0.0
+                # Idle: keep the room alive while somebody is watching it
+                if rooms.get(room.id) is not room:
+                    return
+                yield b": keep-alive\n\n"
+                continue
+            idle = 0.0
+            yield sse(new_events, reset, cursor)
+
+    return Response(generate(since), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def start_room(room_id, token, key=None):
+    # The room /start_game deals into. Restarting a table is a move too, so
+    # without its seat token the game goes to a new room instead (unless this
+    # is a retry of the start that dealt it, which act() answers from cache).
+    room = rooms.get(room_id)
+    if room is not None and (not room.game.seat_token or is_seated(room.game, token) or key in room.game.responses):
+        return room
+    return rooms.create(room_id if room is None else None)
+
+def new_game(data, name, token=None):
+    # The action /start_game runs on the room's game (asgi.py shares it), for
+    # the request carrying seat `token`. The seated player keeps their token
+    # across restarts; a new table gets a fresh one. It is part of the result
+    # so a retried start gets the same one back.
+    def start(game):
+        # Checked again here, on the latest state under the room's lock
+        if game.seat_token and not is_seated(game, token):
+            return {"error": "Somebody else is playing at this table."}
+        game.seat_token = game.seat_token or secrets.token_urlsafe(16)
+        # "easy" / "medium" / "hard" search (mcts.LEVELS); anything else is the classic AI
+        game.ai_level = data.get("difficulty") if data.get("difficulty") in mcts.LEVELS else None
+        # A searched AI always plays in push mode, where it thinks in the
+        # search pool (ai_step), never on this request thread under the lock
+        game.auto_ai = not data.get("push", False) and game.ai_level is None
+        game.start([name, "AI"])
+        return dict(game.begin(), seat_token=game.seat_token)
+    return start
 
 @app.route("/start_game", methods=["POST"])
 def start_game():
-    global players, deck, current_player_idx, game_started, turns_to_take, pending_action
-    
     data = request.json
     name = data.get("players","").strip()
     if not name:
         return jsonify({"error":"Enter your name!"})
 
-    # Reset game state
-    players.clear()
-    players.append(Player(name,is_human=True))
-    players.append(Player("AI",is_human=False))
-
-    deck.clear()
-    pending_action = None 
-    
-    # Initialize Deck and handle Defuse cards
-    all_cards = []
-    for card_name, count in CARD_NAMES.items():
-        CardClass = globals().get(card_name.replace(" ", ""))
-        if CardClass:
-            for _ in range(count):
-                all_cards.append(CardClass())
-
-    # Separate Defuse cards for guaranteed distribution
-    defuse_cards = [c for c in all_cards if isinstance(c, Defuse)]
-    other_cards = [c for c in all_cards if not isinstance(c, Defuse) and not isinstance(c, ExplodingKitten)]
-
-    # Deal cards: 1 Defuse + 4 random cards
-    for p in players:
-        # Give one Defuse (Guaranteed)
-        if defuse_cards:
-            p.hand.append(defuse_cards.pop(0))
-        
-        # Give 4 random cards (from other_cards pool)
-        for _ in range(4):
-            if other_cards: p.hand.append(other_cards.pop(random.randrange(len(other_cards))))
-
-    # Recombine remaining non-Defuse cards into the deck
-    deck.extend(other_cards)
-
-    # Add Exploding Kittens (N-1 where N is player count)
-    for _ in range(len(players)-1): 
-        deck.append(ExplodingKitten())
-        
-    random.shuffle(deck)
-
-    current_player_idx = random.randint(0, len(players) - 1)
-    turns_to_take = 1
-    game_started = True
-
-    frontend_players = []
-    for p in players:
-        frontend_players.append({
-            "name":p.name,
-            "is_human":p.is_human,
-            "is_alive":p.is_alive,
-            "hand": [c.to_dict() for c in p.hand] if p.is_human else [],
-            "hand_length": len(p.hand),
-        })
-
-    moves = []
-    if not players[current_player_idx].is_human:
-        moves.extend(process_ai_turns())
-    else:
-        moves.append({"message": f"{players[current_player_idx].name}'s turn (Draw 1)"})
-        moves.append({"new_current_player": current_player_idx, "turns_to_take": turns_to_take})
-    
-    final_player_idx = moves[-1].get("new_current_player", current_player_idx)
-    
-    # Update hand lengths before sending
-    for p_fe in frontend_players:
-        p_real = next((p for p in players if p.name == p_fe['name']), None)
-        if p_real:
-             p_fe['hand_length'] = len(p_real.hand)
-
-    return jsonify({"players":frontend_players,"current_player":final_player_idx, "moves": moves})
+    room_id = get_room_id()
+    key, expected = get_guard(data)
+    token = get_seat_token(room_id) if room_id else None
+    room = start_room(room_id, token, key)
+    result = act(room, new_game(data, name, token), key, expected)
+
+    response = respond({"room": room.id, **result})
+    response.set_cookie(ROOM_COOKIE, room.id, samesite="Lax")
+    if "seat_token" in result:
+        response.set_cookie(seat_cookie(room.id), result["seat_token"], httponly=True, samesite="Lax")
+    return response
 
 @app.route("/draw_card", methods=["POST"])
 def draw_card():
-    global current_player_idx
-    if not game_started or players[current_player_idx].is_human == False or players[current_player_idx].is_alive == False:
-        return jsonify({"error":"It's not your turn or game not started"})
-
-    player = players[current_player_idx]
-    moves = []
-
-    if not deck:
-        moves.append({"message": "Deck is empty! Game should have ended already."})
-    else:
-        card = deck.pop(0) 
-        
-        if isinstance(card, ExplodingKitten):
-            defuse = next((c for c in player.hand if isinstance(c, Defuse)),None)
-            if defuse:
-                player.hand.remove(defuse)
-                
-                # Player must choose where to put the kitten (for now, random)
-                deck.insert(random.randint(0,len(deck)),card)
-                moves.append({
-                    "type":"draw",
-                    "player": player.name,
-                    "card": card.to_dict(), 
-                    "message":f"{player.name} drew Exploding Kitten but used Defuse!"
-                })
-            else:
-                player.is_alive=False
-                moves.append({
-                    "type":"draw",
-                    "player": player.name,
-                    "dead_player_index": current_player_idx,
-                    "message":f"{player.name} drew Exploding Kitten and exploded! 💀"
-                })
-        else:
-            player.hand.append(card)
-            moves.append({
-                "type":"draw",
-                "player": player.name,
-                "card": card.to_dict(),
-                "message":f"{player.name} drew {card.name}. Turns left: {turns_to_take}"
-            })
-
-    # 1. Move to next player after drawing (or exploding)
-    change_turn()
-
-    # 2. Check for winner
-    winner, win_move = check_win_condition()
-    if win_move:
-        moves.append(win_move)
-        winner_found = winner or win_move["type"] == "game_broken"
-    else:
-        winner_found = False
-
-    # 3. Process AI moves only if no winner was found yet
-    if not winner_found:
-        ai_moves = process_ai_turns()
-        moves.extend(ai_moves)
-
-    final_player_idx = moves[-1].get("new_current_player", current_player_idx)
-    human_player_hand = [c.to_dict() for c in player.hand] if player.is_alive else []
-    
-    return jsonify({"moves":moves,"current_player":final_player_idx, "human_hand": human_player_hand})
+    room = rooms.get(get_room_id())
+    if room is None:
+        return no_room()
+
+    action = as_seat(get_seat_token(room.id), lambda game: game.draw_card())
+    result = act(room, action, *get_guard(request.get_json(silent=True) or {}))
+    return respond(result)
 
 
 @app.route("/play_card", methods=["POST"])
 def play_card():
-    global current_player_idx, turns_to_take, pending_action
+    room = rooms.get(get_room_id())
+    if room is None:
+        return no_room()
+
     data = request.json
     idx = data.get("card_index")
-    target_name = data.get("target_player_name") 
-
-    player = players[current_player_idx]
-    
-    if idx is None or not isinstance(idx, int) or idx < 0 or idx >= len(player.hand) or not player.is_human or not player.is_alive:
-        return jsonify({"error":"Invalid card index or player state"})
-
-    card = player.hand.pop(idx) 
-    
-    human_play_move = {
-        "type": "play",
-        "card": card.to_dict(),
-        "player": player.name, 
-        "message": f"{player.name} played {card.name}"
-    }
-    
-    moves = [human_play_move]
-    turn_ends = False 
-
-    # --- Favor Card Logic Modification ---
-    if isinstance(card, Favor):
-        target = next((p for p in players if p.name == target_name and p.is_alive and p.hand), None)
-        
-        if not target:
-            moves.append({"message": f"Favor failed: {target_name} is not a valid target or has no cards."})
-            turn_ends = False 
-        else:
-            target_hand_data = [c.to_dict() for c in target.hand]
-            
-            # HALT the game and enter PENDING_ACTION state
-            pending_action = {
-                "type": "favor_select",
-                "player_making_favor": player.name, 
-                "target_name": target.name, 
-                "target_hand": target_hand_data, 
-            }
-            
-            moves.append({"type": "pending_action", "details": pending_action})
-            
-            # Return immediately, waiting for resolve_favor
-            return jsonify({
-                "moves": moves,
-                "current_player": current_player_idx, 
-                "turns_to_take": turns_to_take,
-                "human_hand": [c.to_dict() for c in player.hand], 
-                "pending_action": pending_action
-            })
-            
-    # --- Other Card Logic ---
-    elif isinstance(card, Skip):
-        change_turn()
-        turn_ends = True
-        
-    elif isinstance(card, Attack):
-        next_idx = get_next_player_index(current_player_idx)
-        if players[next_idx].is_alive:
-            turns_to_take += 2 
-        change_turn()
-        turn_ends = True
-
-    elif isinstance(card, Shuffle):
-        random.shuffle(deck)
-        moves.append({"type": "shuffle_effect", "message": "The Deck was Shuffled!"})
-        turn_ends = False
-        
-    elif isinstance(card, SeeTheFuture):
-        top_three = [c.name for c in deck[:3]]
-        moves.append({"type": "seefuture_effect", "player": player.name, "cards": top_three, "message": f"You saw the top 3 cards: {', '.join(top_three)}."})
-        turn_ends = False
-
-    elif isinstance(card, Defuse) or isinstance(card, ExplodingKitten):
-        player.hand.append(card)
-        return jsonify({"error": f"Cannot play {card.name} in this phase."})
-
-    # Process AI moves if the turn ended (Skip or Attack)
-    if turn_ends:
-        winner, win_move = check_win_condition()
-        if win_move:
-            moves.append(win_move)
-            winner_found = winner or win_move["type"] == "game_broken"
-        else:
-            winner_found = False
-
-        if not winner_found:
-            ai_moves = process_ai_turns()
-            moves.extend(ai_moves)
-            
-    # Return the final state
-    final_player_idx = moves[-1].get("new_current_player", current_player_idx)
-    final_turns_to_take = moves[-1].get("turns_to_take", turns_to_take)
-    human_player_hand = [c.to_dict() for c in player.hand]
-    
-    return jsonify({
-        "moves": moves,
-        "current_player": final_player_idx,
-        "turns_to_take": final_turns_to_take,
-        "human_hand": human_player_hand,
-        "pending_action": pending_action
-    })
+    target_name = data.get("target_player_name")
+
+    action = as_seat(get_seat_token(room.id), lambda game: game.play_card(idx, target_name))
+    result = act(room, action, *get_guard(data))
+    return respond(result)
 
 
 # ---------------- NEW FAVOR RESOLUTION ROUTE ----------------
 @app.route("/resolve_favor", methods=["POST"])
 def resolve_favor():
-    global pending_action, current_player_idx, turns_to_take
+    room = rooms.get(get_room_id())
+    if room is None:
+        return no_room()
+
     data = request.json
     selected_card_name = data.get("card_name")
 
-    if not pending_action or pending_action.get('type') != 'favor_select':
-        return jsonify({"error": "No Favor action is pending."})
-    
-    player_making_favor = next((p for p in players if p.name == pending_action['player_making_favor']), None)
-    target_player = next((p for p in players if p.name == pending_action['target_name']), None)
-
-    if not player_making_favor or not target_player:
-        pending_action = None
-        return jsonify({"error": "Invalid player state for Favor resolution."})
-
-    moves = []
-    stolen_card = None
-    
-    # 1. Find and steal the selected card from the target player's hand
-    for i, card in enumerate(target_player.hand):
-        if card.name == selected_card_name:
-            stolen_card = target_player.hand.pop(i)
-            player_making_favor.hand.append(stolen_card)
-            break
-
-    pending_action = None # Clear the pending state
-    
-    if stolen_card:
-        moves.append({
-            "type": "favor_resolved",
-            "player": player_making_favor.name,
-            "target": target_player.name,
-            "card_name": stolen_card.name,
-            "message": f"{player_making_favor.name} successfully stole {stolen_card.name} from {target_player.name}."
-        })
-    else:
-        moves.append({"type": "error", "message": "Failed to find selected card in target's hand."})
-
-    # Favor does not end the turn; player must still draw. No turn change or AI processing needed here.
-    final_player_idx = current_player_idx 
-    final_turns_to_take = turns_to_take 
-    
-    human_player_hand = [c.to_dict() for c in player_making_favor.hand]
-    
-    return jsonify({
-        "moves": moves,
-        "current_player": final_player_idx,
-        "turns_to_take": final_turns_to_take,
-        "human_hand": human_player_hand,
-        "pending_action": pending_action
-    })
+    action = as_seat(get_seat_token(room.id), lambda game: game.resolve_favor(selected_card_name))
+    result = act(room, action, *get_guard(data))
+    return respond(result)
 
 
 if __name__=="__main__":
     # Ensure this runs the server for testing
-    app.run(debug=True)
+    app.run(debug=True)
\ No newline at end of file
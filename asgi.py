@@ -0,0 +1,473 @@
+# asgi.py
+# The game API as an ASGI application, for tables whose clients keep
+# /events long-polls and /stream connections open: an idle connection is a
+# parked coroutine here instead of a server thread. Rooms, stores, AI seats
+# and the rules are the same ones app.py uses; moves on a room run one at
+# a time under that room's asyncio.Lock.
+#
+#   uvicorn asgi:app --port 8000      # any ASGI server
+#   python asgi.py [--port 8000]      # uvicorn if installed, else the small built-in server
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+import weakref
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote
+
+import app as core
+import metrics
+import serialize
+from engine import PHASE_SECONDS
+
+LONG_POLL_MAX = 60 # seconds an /events?wait= request may be held open
+log = logging.getLogger("asgi")
+
+
+# ---------------- ROOM WAITERS ----------------
+class AsyncRoom:
+    # The asyncio side of a room: a lock that orders its moves, and an event
+    # that is set (and replaced) every time its game changes
+    __slots__ = ("lock", "changed")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.changed = asyncio.Event()
+
+    def notify(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    async def wait(self, timeout):
+        try:
+            await asyncio.wait_for(self.changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+# Dropped along with the room when the registry evicts it
+async_rooms = weakref.WeakKeyDictionary()
+loop = None
+
+def async_room(room):
+    state = async_rooms.get(room)
+    if state is None:
+        state = async_rooms[room] = AsyncRoom()
+    return state
+
+def wake(room):
+    state = async_rooms.get(room)
+    if state is not None:
+        state.notify()
+
+def on_change(room):
+    # core.notify calls this from request handlers and AI threads alike
+    if loop is not None:
+        loop.call_soon_threadsafe(wake, room)
+
+core.change_hooks.append(on_change)
+
+async def find_room(room_id):
+    """rooms.get() on a thread: a room this worker does not hold is loaded
+    from the store or snapshots, which reads disk and decodes."""
+    return await asyncio.to_thread(core.rooms.get, room_id)
+
+async def in_room(room, fn, *args):
+    """fn(*args) under the room's async lock. It always runs on a thread:
+    it takes room.lock, which an AI thread may hold through a move, and
+    with a shared GAME_STORE it reads and writes the store too. Neither
+    may block the loop."""
+    async with async_room(room).lock:
+        return await asyncio.to_thread(fn, *args)
+
+
+# ---------------- REQUESTS & RESPONSES ----------------
+class Request:
+    def __init__(self, scope, body):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.args = {k: v[-1] for k, v in parse_qs(scope["query_string"].decode("latin-1")).items()}
+        self.headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        self.body = body
+        self._json = None
+
+    def json(self):
+        if self._json is None:
+            try:
+                data = json.loads(self.body) if self.body else {}
+            except ValueError:
+                data = {}
+            self._json = data if isinstance(data, dict) else {}
+        return self._json
+
+    def cookie(self, name):
+        for part in self.headers.get("cookie", "").split(";"):
+            key, _, value = part.strip().partition("=")
+            if key == name:
+                return value
+        return None
+
+    def room_id(self):
+        return core.valid_room_id(self.args.get("room") or self.json().get("room") or self.cookie(core.ROOM_COOKIE))
+
+    def guard(self):
+        return core.guard(self.headers.get("idempotency-key"), self.json())
+
+    def seat_token(self, room_id):
+        return self.headers.get("x-seat-token") or self.cookie(core.seat_cookie(room_id))
+
+    def audience(self, room):
+        seated = core.is_seated(room.game, self.seat_token(room.id))
+        return core.audience_for(self.args.get("view"), self.headers.get("x-admin-token"), seated)
+
+    def number(self, name, default, kind=int):
+        try:
+            return kind(self.args.get(name, default))
+        except ValueError:
+            return default
+
+    def etag_matches(self, etag):
+        tags = self.headers.get("if-none-match")
+        if not tags:
+            return False
+        return any(tag.strip().removeprefix("W/").strip('"') in (etag, "*") for tag in tags.split(","))
+
+
+def json_response(payload, status=200, headers=()):
+    start = time.perf_counter()
+    body = serialize.dumps(payload)
+    PHASE_SECONDS.observe(time.perf_counter() - start, "response")
+    return status, [(b"content-type", b"application/json"), *headers], body
+
+def no_room():
+    return json_response({"error": "Game not found. Start a new game."})
+
+def bad_view():
+    return json_response({"error": "Unknown view, or not allowed to use it."}, status=403)
+
+def etag_header(etag):
+    return (b"etag", f'"{etag}"'.encode())
+
+async def send_response(send, response):
+    status, headers, body = response
+    await send({"type": "http.response.start", "status": status,
+                "headers": [*headers, (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+# ---------------- ROUTES ----------------
+async def get_game_state(request):
+    room = await find_room(request.room_id())
+    if room is None:
+        return no_room()
+    audience = request.audience(room)
+    if audience is None:
+        return bad_view()
+
+    def read():
+        with room.lock:
+            core.refresh(room)
+            etag = core.game_etag(room, audience)
+            if request.etag_matches(etag):
+                return 304, [etag_header(etag)], b""
+            return json_response({"room": room.id, **room.game.get_state(audience)}, headers=[etag_header(etag)])
+
+    return await in_room(room, read)
+
+async def events(request):
+    # Delta sync like app.py's /events; with ?wait=S it is a long poll that
+    # answers as soon as there is something after ?since=N (or after S seconds)
+    room = await find_room(request.room_id())
+    if room is None:
+        return no_room()
+    audience = request.audience(room)
+    if audience is None:
+        return bad_view()
+
+    since = request.number("since", 0)
+    wait = min(max(request.number("wait", 0.0, float), 0.0), LONG_POLL_MAX)
+    deadline = time.monotonic() + wait
+    # Moves saved by other workers don't wake us, so those poll the store
+    poll = core.STREAM_POLL if core.store is not None else LONG_POLL_MAX
+
+    def read():
+        with room.lock:
+            core.refresh(room)
+            new_events, reset = room.game.encoded_events(since, audience)
+            return core.game_etag(room, audience), room.game.seq, new_events, reset
+
+    while True:
+        etag, seq, new_events, reset = await in_room(room, read)
+        remaining = deadline - time.monotonic()
+        if new_events or reset or remaining <= 0:
+            break
+        await async_room(room).wait(min(remaining, poll))
+
+    if request.etag_matches(etag):
+        return 304, [etag_header(etag)], b""
+    payload = {"room": room.id, "seq": seq, "reset": reset, "events": core.events_json(new_events)}
+    return json_response(payload, headers=[etag_header(etag)])
+
+async def start_game(request):
+    data = request.json()
+    name = data.get("players","").strip()
+    if not name:
+        return json_response({"error":"Enter your name!"})
+
+    room_id = request.room_id()
+    key, expected = request.guard()
+    token = request.seat_token(room_id) if room_id else None
+    room = await asyncio.to_thread(core.start_room, room_id, token, key)
+    result = await in_room(room, core.act, room, core.new_game(data, name, token), key, expected)
+    cookies = [(b"set-cookie", f"{core.ROOM_COOKIE}={room.id}; Path=/; SameSite=Lax".encode())]
+    if "seat_token" in result:
+        seat = f"{core.seat_cookie(room.id)}={result['seat_token']}; Path=/; HttpOnly; SameSite=Lax"
+        cookies.append((b"set-cookie", seat.encode()))
+    return json_response({"room": room.id, **result}, headers=cookies)
+
+async def game_action(request, action):
+    room = await find_room(request.room_id())
+    if room is None:
+        return no_room()
+    action = core.as_seat(request.seat_token(room.id), action)
+    return json_response(await in_room(room, core.act, room, action, *request.guard()))
+
+async def draw_card(request):
+    return await game_action(request, lambda game: game.draw_card())
+
+async def play_card(request):
+    data = request.json()
+    idx = data.get("card_index")
+    target_name = data.get("target_player_name")
+    return await game_action(request, lambda game: game.play_card(idx, target_name))
+
+async def resolve_favor(request):
+    selected_card_name = request.json().get("card_name")
+    return await game_action(request, lambda game: game.resolve_favor(selected_card_name))
+
+async def metrics_text(request):
+    return 200, [(b"content-type", b"text/plain; version=0.0.4")], metrics.render().encode()
+
+async def stream(request, receive, send):
+    # Server-Sent Events, as in app.py: every event after ?since=N (or
+    # Last-Event-ID), then each new one as soon as it is logged
+    room = await find_room(request.room_id())
+    if room is None:
+        return await send_response(send, no_room())
+    audience = request.audience(room)
+    if audience is None:
+        return await send_response(send, bad_view())
+
+    since = request.headers.get("last-event-id")
+    cursor = int(since) if since and since.isdigit() else request.number("since", 0)
+
+    def kick_ai():
+        # A room just restored from a snapshot may be waiting on its AI seats
+        with room.lock:
+            core.after_action(room)
+
+    def read(cursor):
+        with room.lock:
+            core.refresh(room)
+            new_events, reset = room.game.encoded_events(cursor, audience)
+            return new_events, reset, room.game.seq
+
+    await in_room(room, kick_ai)
+    await send({"type": "http.response.start", "status": 200, "headers": [
+        (b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache"), (b"x-accel-buffering", b"no")]})
+
+    state = async_room(room)
+    wait = core.STREAM_KEEPALIVE if core.store is None else core.STREAM_POLL
+    gone = asyncio.ensure_future(receive()) # resolves on http.disconnect
+    last_sent = time.monotonic()
+    try:
+        while not gone.done():
+            new_events, reset, cursor = await in_room(room, read, cursor)
+            if new_events or reset:
+                await send({"type": "http.response.body", "body": core.sse(new_events, reset, cursor), "more_body": True})
+                last_sent = time.monotonic()
+                continue
+            if time.monotonic() - last_sent >= core.STREAM_KEEPALIVE:
+                # Idle: keep the room alive while somebody is watching it
+                if await find_room(room.id) is not room:
+                    break
+                await send({"type": "http.response.body", "body": b": keep-alive\n\n", "more_body": True})
+                last_sent = time.monotonic()
+            changed = asyncio.ensure_future(state.wait(wait))
+            await asyncio.wait((changed, gone), return_when=asyncio.FIRST_COMPLETED)
+            changed.cancel()
+    finally:
+        gone.cancel()
+    await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+ROUTES = {
+    ("GET", "/get_game_state"): get_game_state,
+    ("GET", "/events"): events,
+    ("POST", "/start_game"): start_game,
+    ("POST", "/draw_card"): draw_card,
+    ("POST", "/play_card"): play_card,
+    ("POST", "/resolve_favor"): resolve_favor,
+    ("GET", "/metrics"): metrics_text,
+}
+STREAMS = {("GET", "/stream"): stream}
+
+
+async def app(scope, receive, send):
+    global loop
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                loop = asyncio.get_running_loop()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+    loop = loop or asyncio.get_running_loop()
+
+    start = time.perf_counter()
+    body = b""
+    more = True
+    while more:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+        body += message.get("body", b"")
+        more = message.get("more_body", False)
+    request = Request(scope, body)
+    key = (request.method, request.path)
+
+    try:
+        if key in STREAMS:
+            # Streams are timed until their headers go out, as in app.py
+            core.ROUTE_SECONDS.observe(time.perf_counter() - start, request.path)
+            return await STREAMS[key](request, receive, send)
+        handler = ROUTES.get(key)
+        if handler is None:
+            known = any(path == request.path for _, path in ROUTES) or any(path == request.path for _, path in STREAMS)
+            status = HTTPStatus.METHOD_NOT_ALLOWED if known else HTTPStatus.NOT_FOUND
+            response = json_response({"error": status.phrase}, status=status)
+        else:
+            response = await handler(request)
+            core.ROUTE_SECONDS.observe(time.perf_counter() - start, request.path)
+    except Exception:
+        log.exception("%s %s failed", request.method, request.path)
+        response = json_response({"error": "Internal server error"}, status=500)
+    await send_response(send, response)
+
+
+# ---------------- BUILT-IN SERVER ----------------
+# Just enough HTTP/1.1 for this API (keep-alive, Content-Length request
+# bodies, chunked streaming responses) so the async mode runs without an
+# ASGI server installed. Put uvicorn or hypercorn in front in production.
+async def serve_connection(reader, writer, asgi_app):
+    server = writer.get_extra_info("sockname")
+    client = writer.get_extra_info("peername")
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            if not line.strip():
+                continue
+            try:
+                method, target, version = line.decode("latin-1").split()
+            except ValueError:
+                return
+            headers = []
+            while True:
+                header = await reader.readline()
+                if header in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = header.decode("latin-1").partition(":")
+                headers.append((name.strip().lower().encode("latin-1"), value.strip().encode("latin-1")))
+            lookup = dict(headers)
+            length = int(lookup.get(b"content-length", b"0") or 0)
+            body = await reader.readexactly(length) if length else b""
+            keep_alive = version == "HTTP/1.1" and lookup.get(b"connection", b"").lower() != b"close"
+            path, _, query = target.partition("?")
+            scope = {
+                "type": "http", "asgi": {"version": "3.0"}, "http_version": version.partition("/")[2],
+                "method": method, "scheme": "http", "path": unquote(path), "raw_path": path.encode("latin-1"),
+                "query_string": query.encode("latin-1"), "root_path": "", "headers": headers,
+                "server": server[:2] if server else None, "client": client[:2] if client else None,
+            }
+
+            received = False
+            async def receive():
+                nonlocal received
+                if not received:
+                    received = True
+                    return {"type": "http.request", "body": body, "more_body": False}
+                # Only streams ask again: wait for the client to hang up
+                while await reader.read(4096):
+                    pass
+                return {"type": "http.disconnect"}
+
+            chunked = False
+            async def send(message):
+                nonlocal chunked
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    out = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n".encode()]
+                    out += [k + b": " + v + b"\r\n" for k, v in message.get("headers", [])]
+                    chunked = not any(k.lower() == b"content-length" for k, _ in message.get("headers", []))
+                    if chunked:
+                        out.append(b"transfer-encoding: chunked\r\n")
+                    out.append(b"connection: keep-alive\r\n\r\n" if keep_alive and not chunked else b"connection: close\r\n\r\n")
+                    writer.write(b"".join(out))
+                elif message["type"] == "http.response.body":
+                    data = message.get("body", b"")
+                    if chunked:
+                        if data:
+                            writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+                        if not message.get("more_body", False):
+                            writer.write(b"0\r\n\r\n")
+                    else:
+                        writer.write(data)
+                    await writer.drain()
+
+            await asgi_app(scope, receive, send)
+            if chunked or not keep_alive:
+                return
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host, port, backlog=4096):
+    global loop
+    loop = asyncio.get_running_loop()
+    server = await asyncio.start_server(lambda r, w: serve_connection(r, w, app), host, port, backlog=backlog)
+    log.info("serving on http://%s:%s", host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the game API with asyncio.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--builtin", action="store_true", help="use the built-in server even if uvicorn is installed")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if not args.builtin:
+        try:
+            import uvicorn
+        except ImportError:
+            pass
+        else:
+            uvicorn.run(app, host=args.host, port=args.port, backlog=4096)
+            return
+    asyncio.run(serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
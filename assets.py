@@ -0,0 +1,34 @@
+# assets.py
+# Lookup for the card image variants written by build_assets.py. Before the
+# first build the manifest is empty and everything falls back to the
+# original JPEGs under /static/images.
+
+import json
+import os
+
+ASSET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "assets")
+ASSET_URL_PREFIX = "/assets/"
+MANIFEST_NAME = "manifest.json"
+CARD_BACK_IMAGE = "images/backphoto.jpg"
+# Hashed file names never change content, so browsers may keep them a year
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+
+def load_manifest(path=os.path.join(ASSET_DIR, MANIFEST_NAME)):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+MANIFEST = load_manifest()
+
+
+def variants(image):
+    """{"thumb": {"webp": url, "jpg": url}, "full": {...}} for an original
+    image path such as "images/card5.jpg", or {} if it was never built."""
+    entry = MANIFEST.get(image)
+    if not entry:
+        return {}
+    return {"thumb": entry["thumb"], "full": entry["full"]}
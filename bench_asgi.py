@@ -0,0 +1,183 @@
+# bench_asgi.py
+# What idle connections cost each way of serving the game: the threaded
+# Flask server (app.py) parks a thread per open /stream, the asyncio one
+# (asgi.py) a coroutine. Opens thousands of idle SSE streams against each,
+# then reports the server's memory and the latency of a client that keeps
+# playing while they are held open.
+#
+#   python bench_asgi.py [--servers flask asgi] [--idle 10000] [--requests 300]
+
+import argparse
+import asyncio
+import http.client
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+from bench_routes import free_port, percentile, serve, wait_for
+
+BATCH = 200 # streams opened at once
+CONNECT_TIMEOUT = 30
+
+
+def raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def serve_flask(port):
+    raise_fd_limit()
+    serve(port)
+
+
+def serve_asgi(port):
+    raise_fd_limit()
+    import asgi
+    asyncio.run(asgi.serve("127.0.0.1", port))
+
+
+SERVERS = {"flask": serve_flask, "asgi": serve_asgi}
+
+
+def memory(pid):
+    # Resident memory in MB and thread count, from /proc (Linux only)
+    status = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            status[key] = value.split()
+    return int(status["VmRSS"][0]) / 1024, int(status["Threads"][0])
+
+
+# ---------------- CLIENTS ----------------
+def call(conn, method, path, body=None, seat=None):
+    # `seat`: the seat token from /start_game, to play as that table's player
+    data = json.dumps(body).encode() if body is not None else None
+    headers = {"Content-Type": "application/json"} if data is not None else {}
+    if seat:
+        headers["X-Seat-Token"] = seat
+    conn.request(method, path, body=data, headers=headers)
+    return json.loads(conn.getresponse().read())
+
+
+async def open_stream(port, room, since):
+    # Ask for the last event so the server answers straight away, then go idle
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET /stream?room={room}&since={since} HTTP/1.1\r\nHost: bench\r\n\r\n".encode())
+    await writer.drain()
+    received = b""
+    # Headers end in \r\n\r\n, an event in \n\n
+    while b"\n\n" not in received:
+        chunk = await reader.read(65536)
+        if not chunk:
+            raise ConnectionError("stream closed")
+        received += chunk
+    return writer
+
+
+async def open_streams(port, room, since, count):
+    writers, failed = [], 0
+    for start in range(0, count, BATCH):
+        batch = [asyncio.wait_for(open_stream(port, room, since), CONNECT_TIMEOUT) for _ in range(min(BATCH, count - start))]
+        for result in await asyncio.gather(*batch, return_exceptions=True):
+            if isinstance(result, BaseException):
+                failed += 1
+            else:
+                writers.append(result)
+    return writers, failed
+
+
+def play(port, requests):
+    # One player drawing and polling in their own room, one request at a time
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    started = call(conn, "POST", "/start_game", {"players": "Bench"})
+    room, seat = started["room"], started["seat_token"]
+    samples = []
+    for i in range(requests):
+        start = time.perf_counter()
+        if i % 2:
+            state = call(conn, "GET", f"/get_game_state?room={room}", seat=seat)
+        else:
+            state = call(conn, "POST", "/draw_card", {"room": room}, seat=seat)
+        samples.append((time.perf_counter() - start) * 1000)
+        if "error" in state:
+            # Out of the game: deal a new one
+            started = call(conn, "POST", "/start_game", {"players": "Bench", "room": room}, seat=seat)
+            room, seat = started["room"], started["seat_token"]
+    conn.close()
+    return samples
+
+
+async def run(name, idle, requests):
+    port = free_port()
+    server = multiprocessing.get_context("spawn").Process(target=SERVERS[name], args=(port,), daemon=True)
+    server.start()
+    writers = []
+    try:
+        wait_for(port)
+        base = play(port, requests)
+        rss_before, threads_before = memory(server.pid)
+
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        room = call(conn, "POST", "/start_game", {"players": "Watcher"})["room"]
+        seq = call(conn, "GET", f"/events?room={room}")["seq"]
+        conn.close()
+        start = time.perf_counter()
+        writers, failed = await open_streams(port, room, seq - 1, idle)
+        opened = time.perf_counter() - start
+
+        # The player's requests are blocking calls; run them off the loop
+        loaded = await asyncio.to_thread(play, port, requests)
+        rss, threads = memory(server.pid)
+    finally:
+        for writer in writers:
+            writer.close()
+        server.terminate()
+        server.join()
+
+    return {"server": name, "idle": len(writers), "failed": failed, "open_s": round(opened, 2),
+            "rss_mb_before": round(rss_before, 1), "rss_mb": round(rss, 1),
+            "kb_per_stream": round((rss - rss_before) * 1024 / max(len(writers), 1), 1),
+            "threads": threads, "threads_before": threads_before,
+            "p50_ms_before": round(percentile(base, 50), 2), "p95_ms_before": round(percentile(base, 95), 2),
+            "p50_ms": round(percentile(loaded, 50), 2), "p95_ms": round(percentile(loaded, 95), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark idle streaming connections, threaded vs asyncio.")
+    parser.add_argument("--servers", nargs="+", default=list(SERVERS), choices=list(SERVERS))
+    parser.add_argument("--idle", type=int, default=10000, help="idle /stream connections to hold open")
+    parser.add_argument("--requests", type=int, default=300, help="requests from the active player")
+    parser.add_argument("--out", help="write the results here as JSON")
+    args = parser.parse_args()
+    raise_fd_limit()
+
+    tmp = tempfile.mkdtemp()
+    os.environ.setdefault("SNAPSHOT_DB", os.path.join(tmp, "bench.db"))
+    results = []
+    try:
+        for name in args.servers:
+            results.append(asyncio.run(run(name, args.idle, args.requests)))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"{'server':>6} {'streams':>8} {'failed':>7} {'open s':>7} {'RSS MB':>15} {'KB/stream':>10} {'threads':>8}"
+          f" {'p50 ms':>14} {'p95 ms':>14}")
+    for r in results:
+        print(f"{r['server']:>6} {r['idle']:>8} {r['failed']:>7} {r['open_s']:>7.1f}"
+              f" {r['rss_mb_before']:>6.1f} -> {r['rss_mb']:>6.1f} {r['kb_per_stream']:>10.1f} {r['threads']:>8}"
+              f" {r['p50_ms_before']:>5.2f} -> {r['p50_ms']:>5.2f} {r['p95_ms_before']:>5.2f} -> {r['p95_ms']:>5.2f}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nsaved {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# bench_deck.py
+# Compares the block/Fenwick Deck with the plain list decks it replaced.
+#
+#   python bench_deck.py
+
+import random
+import time
+
+from deck import Deck
+
+SIZES = [50, 5_000, 500_000]
+OPS = 2_000
+
+
+def time_per_op(fn, ops=OPS):
+    start = time.perf_counter()
+    for _ in range(ops):
+        fn()
+    return (time.perf_counter() - start) / ops * 1e6
+
+
+def bench_list(size):
+    deck = list(range(size))
+    results = {}
+
+    def draw_top():
+        deck.append(deck.pop(0))
+    results["draw top"] = time_per_op(draw_top)
+
+    def draw_bottom():
+        deck.insert(0, deck.pop())
+    results["draw bottom"] = time_per_op(draw_bottom)
+
+    def insert_random():
+        deck.insert(random.randint(0, len(deck)), deck.pop(0))
+    results["random insert"] = time_per_op(insert_random)
+
+    results["peek 3"] = time_per_op(lambda: deck[:3])
+    return results
+
+
+def bench_deck(size):
+    deck = Deck(range(size))
+    results = {}
+
+    def draw_top():
+        deck.add_card(deck.draw())
+    results["draw top"] = time_per_op(draw_top)
+
+    def draw_bottom():
+        deck.insert(0, deck.draw_bottom())
+    results["draw bottom"] = time_per_op(draw_bottom)
+
+    def insert_random():
+        deck.insert(random.randint(0, len(deck)), deck.draw())
+    results["random insert"] = time_per_op(insert_random)
+
+    results["peek 3"] = time_per_op(lambda: deck.peek(3))
+    return results
+
+
+if __name__ == "__main__":
+    # Every op is paired with a put-back so the deck size stays fixed
+    print(f"{'cards':>8} {'operation':<14} {'list us':>10} {'Deck us':>10}")
+    for size in SIZES:
+        old = bench_list(size)
+        new = bench_deck(size)
+        for op in old:
+            print(f"{size:>8} {op:<14} {old[op]:>10.3f} {new[op]:>10.3f}")
@@ -0,0 +1,84 @@
+# bench_mcts.py
+# Rollouts/sec of the search AI on one core and across a process pool,
+# what each difficulty costs per decision, and optionally how often one
+# searched seat beats the scripted AI.
+#
+#   python bench_mcts.py [--players 3] [--workers 1 2 4] [--games 200]
+
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import mcts
+from engine import AI_PLAYABLE, Game
+from simulate import play_game
+
+POSITIONS = 20
+
+
+def sample_views(players, count, seed=0):
+    # Opening positions where the seat to move has something to decide
+    rng = random.Random(seed)
+    views = []
+    while len(views) < count:
+        game = Game(rng=random.Random(rng.random()))
+        game.start([f"AI {i}" for i in range(players)], humans=0)
+        seat = game.current_player_idx
+        if any(c in game.players[seat].hand for c in AI_PLAYABLE):
+            views.append(game.ai_view(seat))
+    return views
+
+
+def rate_for(views, seconds):
+    # One worker's rollouts/sec, averaged over the sample positions
+    per = seconds / len(views)
+    return sum(mcts.rollout_rate(v, per) for v in views) / len(views)
+
+
+def strength(players, level, games, seed):
+    wins = 0
+    for i in range(games):
+        game = Game(rng=random.Random(seed + i))
+        game.ai_level = [level] + [None] * (players - 1)
+        winner, _, _ = play_game(game, players)
+        wins += winner == 0
+    return wins / games
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the search AI.")
+    parser.add_argument("--players", type=int, default=3)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seconds", type=float, default=4.0)
+    parser.add_argument("--games", type=int, default=0, help="games per level against the scripted AI")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    views = sample_views(args.players, POSITIONS, args.seed)
+    print(f"{args.players} players, {POSITIONS} opening positions, {os.cpu_count()} CPUs")
+
+    print(f"\n{'workers':>8} {'rollouts/s':>11} {'per worker':>11}")
+    for n in args.workers:
+        with ProcessPoolExecutor(n) as pool:
+            rates = list(pool.map(rate_for, [views] * n, [args.seconds] * n))
+        print(f"{n:>8} {sum(rates):>11,.0f} {sum(rates) / n:>11,.0f}")
+
+    print(f"\n{'level':>8} {'rollouts':>9} {'ms/decision':>12}")
+    for level, rollouts in mcts.LEVELS.items():
+        start = time.perf_counter()
+        for view in views:
+            mcts.choose(dict(view, level=level), time_budget=None)
+        ms = (time.perf_counter() - start) / len(views) * 1000
+        print(f"{level:>8} {rollouts:>9} {ms:>12,.1f}")
+
+    if args.games:
+        baseline = 1 / args.players
+        print(f"\nwin rate of one searched seat vs {args.players - 1} scripted (fair share {baseline:.0%})")
+        for level in mcts.LEVELS:
+            print(f"  {level:>8}: {strength(args.players, level, args.games, args.seed):.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# bench_memory.py
+# Bytes of card storage per dealt game: the hands and deck as card codes
+# (Hand and Deck bytearrays) vs the old layout of lists of one Python
+# object per card with its own name and image strings. Only the cards are
+# kept and counted; players, event logs, odds and the rest of a Game are
+# left out on both sides.
+#
+#   python bench_memory.py
+
+import random
+import tracemalloc
+
+from engine import CARD_NAMES, CARD_TYPES, Game
+
+GAMES = 2000
+SEATS = 4
+IMAGE_PATHS = [f"images/card{i}.jpg" for i in range(1, 46)]
+
+
+class LegacyCard:
+    # What every card used to be: an object with a name and an image path
+    def __init__(self, name, image):
+        self.name = name
+        self.image = image
+
+
+class LegacyPlayer:
+    def __init__(self, name):
+        self.name = name
+        self.hand = []
+        self.is_alive = True
+        self.is_human = False
+
+
+def legacy_game(seats):
+    cards = []
+    for name, count in CARD_NAMES.items():
+        for _ in range(count):
+            cards.append(LegacyCard(name, random.choice(IMAGE_PATHS)))
+    players = [LegacyPlayer(f"AI {i}") for i in range(seats)]
+    defuses = [c for c in cards if c.name == "Defuse"]
+    others = [c for c in cards if c.name != "Defuse"]
+    for p in players:
+        if defuses:
+            p.hand.append(defuses.pop())
+        for _ in range(4):
+            p.hand.append(others.pop(random.randrange(len(others))))
+    deck = others + [LegacyCard(CARD_TYPES[0], IMAGE_PATHS[17]) for _ in range(seats - 1)]
+    random.shuffle(deck)
+    return [p.hand for p in players], deck
+
+
+# The legacy layout used the global RNG, so share one here too
+SHARED_RNG = random.Random()
+
+
+def coded_game(seats):
+    # Deal a real game, then keep only its cards
+    game = Game(rng=SHARED_RNG)
+    game.start([f"AI {i}" for i in range(seats)], humans=0)
+    return [p.hand for p in game.players], game.deck
+
+
+def compare(before, after):
+    if after <= before:
+        return f"{before / after:.1f}x smaller"
+    return f"{after / before:.1f}x larger"
+
+
+def bytes_per_game(factory):
+    tracemalloc.start()
+    games = [factory(SEATS) for _ in range(GAMES)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del games
+    return current / GAMES
+
+
+if __name__ == "__main__":
+    before = bytes_per_game(legacy_game)
+    after = bytes_per_game(coded_game)
+    print(f"{SEATS} seats, {GAMES} games")
+    print(f"  card objects : {before:>8,.0f} bytes/game of cards")
+    print(f"  card codes   : {after:>8,.0f} bytes/game of cards ({compare(before, after)})")
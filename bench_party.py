@@ -0,0 +1,85 @@
+# bench_party.py
+# Passing the turn at party-size tables as players drop out: the seat ring
+# (seats.py) against the scan it replaced, which walked the seats one by
+# one to the next live player and rebuilt the list of live players for
+# every win check. Each turn advance is one change_turn() plus one
+# check_win_condition(), as after every draw.
+#
+#   python bench_party.py [--players 100 500 2000] [--out 0 0.5 0.9 0.99]
+
+import argparse
+import random
+import time
+
+import engine
+import metrics
+
+# Only the turn order is being timed, not the phase histograms
+metrics.ENABLED = False
+
+ADVANCES = 20000
+
+
+class LegacyGame(engine.Game):
+    def get_next_player_index(self, start_idx):
+        players = self.players
+        idx = start_idx
+        count = 0
+        max_count = len(players) * 2
+        while True:
+            idx = (idx + 1) % len(players)
+            if players[idx].is_alive:
+                return idx
+            if count >= max_count:
+                return -1
+            count += 1
+
+    def check_win_condition(self):
+        alive_players = [p for p in self.players if p.is_alive]
+        result = None, None
+        if len(alive_players) == 1:
+            winner = alive_players[0]
+            result = winner, {"type": "win", "player": winner.name, "message": f"🏆 {winner.name} wins the game! 🏆"}
+        elif len(alive_players) == 0:
+            result = None, {"type": "game_broken", "message": "Game over! No remaining players. Restarting is recommended."}
+        return result
+
+
+def table(cls, players, out, seed):
+    # A dealt party table with a share of the seats, picked at random, out
+    game = cls(rng=random.Random(seed))
+    game.start([f"AI {i}" for i in range(players)], humans=0, seed=seed, party=True)
+    for idx in random.Random(seed).sample(range(players), min(int(players * out), players - 2)):
+        game.eliminate(idx)
+    game.current_player_idx = game.get_next_player_index(0)
+    return game
+
+
+def advance_us(game, advances=ADVANCES):
+    start = time.perf_counter()
+    for _ in range(advances):
+        game.turns_to_take = 1
+        game.change_turn()
+        game.check_win_condition()
+    return (time.perf_counter() - start) / advances * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark turn order at party-size tables.")
+    parser.add_argument("--players", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--out", type=float, nargs="+", default=[0, 0.5, 0.9, 0.99], help="share of seats eliminated")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print("microseconds per turn advance (change_turn + check_win_condition)")
+    print(f"{'players':>8} {'out':>6} {'left':>6} {'scan':>10} {'ring':>10} {'speedup':>8}")
+    for players in args.players:
+        for out in args.out:
+            legacy = table(LegacyGame, players, out, args.seed)
+            ring = table(engine.Game, players, out, args.seed)
+            before, after = advance_us(legacy), advance_us(ring)
+            print(f"{players:>8} {out:>6.0%} {ring.seats.count:>6} {before:>10.2f} {after:>10.2f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
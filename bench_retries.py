@@ -0,0 +1,80 @@
+# bench_retries.py
+# A flaky network against /draw_card: some responses are lost and the
+# client sends the move again, and some clicks arrive twice. Counts how many
+# draws the server actually makes per draw the player meant, and how many
+# AI turns it plays, for a client without idempotency keys and for one that
+# sends Idempotency-Key and expected_seq the way game.js does.
+#
+#   python bench_retries.py [--games 200] [--loss 0.1] [--double 0.05]
+
+import argparse
+import os
+import random
+import time
+
+MAX_ACTIONS = 200 # per game, in case a game never finishes
+
+
+def ai_turns():
+    from engine import AI_ITERATIONS
+    return AI_ITERATIONS.values[None]
+
+
+def human_draws(room, name):
+    with room.lock:
+        return sum(1 for e in room.game.events if e.get("type") == "draw" and e.get("player") == name)
+
+
+def run(games, loss, double, keyed, seed):
+    import app as core
+    client = core.app.test_client()
+    rng = random.Random(seed)
+    intended = executed = requests = 0
+    turns = ai_turns()
+    start = time.perf_counter()
+    room_id = None
+    for g in range(games):
+        room_id = client.post("/start_game", json={"players": "Flaky", "room": room_id}).get_json()["room"]
+        room = core.rooms.peek(room_id)
+        for n in range(MAX_ACTIONS):
+            state = client.get(f"/get_game_state?room={room_id}").get_json()
+            me = state["players"][0]
+            if not me["is_alive"] or sum(p["is_alive"] for p in state["players"]) <= 1 or state["current_player"] != 0:
+                break
+            body, headers = {"room": room_id}, {}
+            if keyed:
+                headers["Idempotency-Key"] = f"{g}-{n}"
+                body["expected_seq"] = state["seq"]
+            intended += 1
+            # The first send always reaches the server; a lost response or a double click sends it again
+            sends = 1 + (rng.random() < loss) + (rng.random() < double)
+            for _ in range(sends):
+                client.post("/draw_card", json=body, headers=headers)
+            requests += sends
+        executed += human_draws(room, "Flaky")
+    return {"intended": intended, "requests": requests, "executed": executed,
+            "ai_turns": ai_turns() - turns, "seconds": time.perf_counter() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark retried moves with and without idempotency keys.")
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--loss", type=float, default=0.1, help="share of responses lost (the client retries)")
+    parser.add_argument("--double", type=float, default=0.05, help="share of clicks sent twice")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # No snapshots of these games (app.py reads this on import)
+    os.environ.setdefault("SNAPSHOT_DB", "")
+    import metrics
+    print(f"{args.games} games, {args.loss:.0%} responses lost, {args.double:.0%} double clicks")
+    print(f"{'client':>10} {'meant':>7} {'sent':>7} {'drawn':>7} {'extra':>7} {'AI turns':>9} {'per draw':>9} {'seconds':>8}")
+    for label, keyed in (("plain", False), ("keyed", True)):
+        r = run(args.games, args.loss, args.double, keyed, args.seed)
+        extra = r["executed"] - r["intended"]
+        print(f"{label:>10} {r['intended']:>7} {r['requests']:>7} {r['executed']:>7} {extra:>+7} {r['ai_turns']:>9} {r['ai_turns'] / r['intended']:>9.2f} {r['seconds']:>8.2f}")
+    print("\n" + "\n".join(line for line in metrics.render().splitlines() if line.startswith("ek_repeated")))
+
+
+if __name__ == "__main__":
+    main()
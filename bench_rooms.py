@@ -0,0 +1,49 @@
+# bench_rooms.py
+# Checks that request latency stays flat as the number of live rooms grows.
+#
+#   python bench_rooms.py [room counts...]
+
+import random
+import statistics
+import sys
+import time
+
+from app import app, rooms
+
+ROOM_COUNTS = [1, 100, 1000, 5000]
+REQUESTS = 2000
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def fill_rooms(client, target):
+    while len(rooms) < target:
+        client.post("/start_game", json={"players": "Bench"})
+        client.delete_cookie("room_id")
+
+
+def run(room_counts):
+    client = app.test_client()
+    print(f"{'rooms':>8} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+    for target in room_counts:
+        fill_rooms(client, target)
+        room_ids = list(rooms._rooms)
+        samples = []
+        for _ in range(REQUESTS):
+            room_id = random.choice(room_ids)
+            path = random.choice(("/get_game_state", "/draw_card"))
+            start = time.perf_counter()
+            if path == "/draw_card":
+                client.post(f"{path}?room={room_id}")
+            else:
+                client.get(f"{path}?room={room_id}")
+            samples.append((time.perf_counter() - start) * 1000)
+        print(f"{len(rooms):>8} {percentile(samples, 50):>8.3f} {percentile(samples, 95):>8.3f} {statistics.mean(samples):>8.3f}")
+
+
+if __name__ == "__main__":
+    counts = [int(a) for a in sys.argv[1:]] or ROOM_COUNTS
+    run(counts)
@@ -0,0 +1,254 @@
+# bench_routes.py
+# Latency of each game route, in process through Flask's test client and
+# over HTTP against a real local server with several clients at once. Every
+# client plays scripted games: it leans on Attack and Skip so the AI has
+# long chains to play inside the request, and on Favor so /resolve_favor
+# gets traffic. Results go to a JSON file that a later run can --compare
+# against to catch regressions.
+#
+#   python bench_routes.py [--modes client server] [--games 30] [--clients 8] [--out routes.json]
+#   python bench_routes.py --compare routes.json
+
+import argparse
+import http.client
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+ROUTES = ("/start_game", "/draw_card", "/play_card", "/resolve_favor", "/get_game_state")
+MAX_ACTIONS = 200 # per game, in case a game never finishes
+REGRESSION = 0.2 # --compare fails when a p95 gets this much slower
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+# ---------------- CLIENTS ----------------
+class LocalClient:
+    def __init__(self):
+        from app import app
+        self.client = app.test_client()
+
+    def call(self, method, path, body=None):
+        response = self.client.get(path) if method == "GET" else self.client.post(path, json=body)
+        return response.get_json()
+
+
+class HTTPClient:
+    def __init__(self, port):
+        # One keep-alive connection per client, like a browser tab
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        # The latest table's seat token, sent the way the browser sends its cookie
+        self.seat = None
+
+    def call(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if data is not None else {}
+        if self.seat:
+            headers["X-Seat-Token"] = self.seat
+        self.conn.request(method, path, body=data, headers=headers)
+        result = json.loads(self.conn.getresponse().read())
+        self.seat = result.get("seat_token", self.seat)
+        return result
+
+
+def serve(port):
+    from werkzeug.serving import make_server
+    from app import app
+    # One access log line per request would be most of the work
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    make_server("127.0.0.1", port, app, threaded=True).serve_forever()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not come up")
+
+
+# ---------------- SCRIPTED GAMES ----------------
+def pick_card(hand, rng):
+    # Index of the card to play, or None to draw
+    for names, chance in ((("Attack", "Skip"), 0.7), (("Favor",), 0.8), (("See the Future", "Shuffle"), 0.3)):
+        found = [i for i, name in enumerate(hand) if name in names]
+        if found and rng.random() < chance:
+            return rng.choice(found)
+    return None
+
+
+def play_games(client, games, seed, samples):
+    rng = random.Random(seed)
+
+    def timed(method, path, body=None):
+        start = time.perf_counter()
+        result = client.call(method, path, body)
+        samples.append((path.split("?")[0], (time.perf_counter() - start) * 1000))
+        return result
+
+    room = None
+    for _ in range(games):
+        # Each client keeps dealing new games into its own room
+        room = timed("POST", "/start_game", {"players": "Bench", "room": room})["room"]
+        for _ in range(MAX_ACTIONS):
+            state = timed("GET", f"/get_game_state?room={room}")
+            players = state["players"]
+            if not players[0]["is_alive"] or sum(p["is_alive"] for p in players) <= 1 or state["current_player"] != 0:
+                break
+            pending = state["pending_action"]
+            if pending:
+                names = [card["name"] for card in pending["target_hand"]]
+                timed("POST", "/resolve_favor", {"room": room, "card_name": rng.choice(names)})
+                continue
+            hand = [card["name"] for card in players[0]["hand"]]
+            idx = pick_card(hand, rng)
+            if idx is None:
+                timed("POST", "/draw_card", {"room": room})
+            else:
+                target = "AI" if hand[idx] == "Favor" else None
+                timed("POST", "/play_card", {"room": room, "card_index": idx, "target_player_name": target})
+
+
+def run(make_client, clients, games, seed):
+    samples = []
+    # list.append is atomic, so the clients can share one list
+    threads = [threading.Thread(target=play_games, args=(make_client(), games, seed + i, samples)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    by_route = defaultdict(list)
+    for route, ms in samples:
+        by_route[route].append(ms)
+    routes = {}
+    for route in ROUTES:
+        ms = by_route.get(route)
+        if not ms:
+            continue
+        routes[route] = {
+            "requests": len(ms),
+            "p50_ms": round(percentile(ms, 50), 3),
+            "p95_ms": round(percentile(ms, 95), 3),
+            "p99_ms": round(percentile(ms, 99), 3),
+            "mean_ms": round(sum(ms) / len(ms), 3),
+            # What the route alone would sustain at this concurrency (Little's law)
+            "rps": round(clients * 1000 * len(ms) / sum(ms), 1),
+        }
+    return {"clients": clients, "games": clients * games, "wall_s": round(wall, 3),
+            "rps": round(len(samples) / wall, 1), "routes": routes}
+
+
+def print_run(mode, result):
+    print(f"\n{mode}: {result['clients']} clients, {result['games']} games, {result['rps']:,.0f} req/s overall")
+    print(f"{'route':>16} {'requests':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>9}")
+    for route, r in result["routes"].items():
+        print(f"{route:>16} {r['requests']:>9} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['rps']:>9,.0f}")
+
+
+def compare(old, new, threshold):
+    """Print p95 changes per route. Returns False if any got `threshold` slower."""
+    ok = True
+    print(f"\np95 vs {old.get('commit') or 'baseline'}")
+    for mode, run_new in new["runs"].items():
+        run_old = old["runs"].get(mode)
+        if not run_old:
+            continue
+        for route, r in run_new["routes"].items():
+            before = run_old["routes"].get(route)
+            if not before:
+                continue
+            change = r["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+            flag = " REGRESSION" if change > threshold else ""
+            ok = ok and not flag
+            print(f"{mode:>7} {route:>16} {before['p95_ms']:>8.2f} -> {r['p95_ms']:>8.2f} ms {change:>+7.1%}{flag}")
+    return ok
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the game routes.")
+    parser.add_argument("--modes", nargs="+", default=["client", "server"], choices=["client", "server"])
+    parser.add_argument("--games", type=int, default=30, help="games per client")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent clients against the server")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write the results here as JSON")
+    parser.add_argument("--compare", help="results JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=REGRESSION)
+    args = parser.parse_args()
+
+    # Don't snapshot into the real games.db (the server process inherits this)
+    tmp = tempfile.mkdtemp()
+    os.environ.setdefault("SNAPSHOT_DB", os.path.join(tmp, "bench.db"))
+    try:
+        results = bench(args)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nsaved {args.out}")
+    if args.compare:
+        with open(args.compare) as f:
+            if not compare(json.load(f), results, args.threshold):
+                sys.exit(1)
+
+
+def bench(args):
+    results = {"commit": git_commit(), "date": time.strftime("%Y-%m-%dT%H:%M:%S"), "cpus": os.cpu_count(),
+               "python": platform.python_version(), "runs": {}}
+    print(f"{os.cpu_count()} CPUs, Python {results['python']}, commit {results['commit']}")
+
+    if "client" in args.modes:
+        results["runs"]["client"] = run(LocalClient, 1, args.games, args.seed)
+        print_run("test client", results["runs"]["client"])
+
+    if "server" in args.modes:
+        port = free_port()
+        server = multiprocessing.get_context("spawn").Process(target=serve, args=(port,), daemon=True)
+        server.start()
+        try:
+            wait_for(port)
+            results["runs"]["server"] = run(lambda: HTTPClient(port), args.clients, args.games, args.seed)
+        finally:
+            server.terminate()
+            server.join()
+        print_run("local server", results["runs"]["server"])
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# bench_serialize.py
+# Cost of turning a game into a /get_game_state response on a 10-seat
+# table where every hand is large: rebuilding every card dict and running
+# the json module (what every poll used to do), the shared card payloads
+# with json and with orjson, and the per-player JSON fragments both warm
+# and with one hand changing between polls.
+#
+#   python bench_serialize.py [--players 10] [--hand 40]
+
+import argparse
+import json
+import random
+import time
+
+import serialize
+from assets import variants
+from engine import CARD_TYPES, NOPE, Game
+
+REPEATS = 2000
+
+
+def make_table(players, hand_size):
+    rng = random.Random(1)
+    game = Game(rng=rng)
+    game.start([f"Player {i}" for i in range(players)], humans=players)
+    for p in game.players:
+        while len(p.hand) < hand_size:
+            p.hand.append(rng.randrange(1, NOPE + 1))
+    return game
+
+
+def rebuilt(game):
+    # Every card dict built from scratch, then Flask's default json settings
+    players = [{
+        "name": p.name,
+        "is_human": p.is_human,
+        "is_alive": p.is_alive,
+        "hand": [{"name": CARD_TYPES[c], "image": game.images[c], **variants(game.images[c])} for c in p.hand],
+        "hand_length": len(p.hand),
+    } for p in game.players]
+    state = {"players": players, "current_player": game.current_player_idx, "turns_to_take": game.turns_to_take,
+             "pending_action": game.pending_action, "seq": game.seq}
+    return json.dumps(state, sort_keys=True).encode()
+
+
+def plain_state(game):
+    # get_state() with the players as dicts, built from the shared card payloads
+    return {"players": game.public_players(), "current_player": game.current_player_idx,
+            "turns_to_take": game.turns_to_take, "pending_action": game.pending_action, "seq": game.seq}
+
+
+def cached_json(game):
+    return json.dumps(plain_state(game), separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def cached_orjson(game):
+    return serialize.orjson.dumps(plain_state(game))
+
+
+def fragments(game):
+    return serialize.dumps(game.get_state())
+
+
+def fragments_one_changed(game):
+    # Somebody drew a card since the last poll
+    hand = game.players[game.seq % len(game.players)].hand
+    game.seq += 1
+    if len(hand) % 2:
+        hand.pop()
+    else:
+        hand.append(NOPE)
+    return serialize.dumps(game.get_state())
+
+
+def per_call(fn, game):
+    fn(game)
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        body = fn(game)
+    return (time.perf_counter() - start) / REPEATS * 1e6, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark game state serialization.")
+    parser.add_argument("--players", type=int, default=10)
+    parser.add_argument("--hand", type=int, default=40, help="cards per hand")
+    args = parser.parse_args()
+
+    game = make_table(args.players, args.hand)
+    print(f"{args.players} players x {args.hand} cards, orjson {'installed' if serialize.orjson else 'missing'}")
+    print(f"{'':>28} {'us/call':>9} {'bytes':>8}")
+    rows = [("rebuilt + json", rebuilt), ("cached cards + json", cached_json)]
+    if serialize.orjson is not None:
+        rows.append(("cached cards + orjson", cached_orjson))
+    rows += [("fragments, unchanged", fragments), ("fragments, one hand changed", fragments_one_changed)]
+    for label, fn in rows:
+        us, size = per_call(fn, game)
+        print(f"{label:>28} {us:>9.1f} {size:>8,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# bench_setup.py
+# Games set up per second from the deck templates compiled at import
+# (engine.py, game.py, game_logic.py) against the per-game recipes they
+# replaced, which built every card, filtered the list and dealt with
+# pop(randrange()). Warm-up and test runs start many short bot games, so
+# this is the part of a game they pay for most.
+#
+#   python bench_setup.py [--games 20000] [--players 2 4 5]
+
+import argparse
+import random
+import time
+
+import engine
+import game
+import game_logic
+from engine import CARD_CODES, CARD_IMAGES, CARD_NAMES, DEFUSE, EXPLODING_KITTEN, Player
+
+
+# ---------------- THE OLD RECIPES ----------------
+class LegacyEngineGame(engine.Game):
+    def start(self, names, humans=1, seed=None):
+        rng = self.rng
+        if seed is None:
+            seed = rng.getrandbits(64)
+        rng.seed(seed)
+        self.action_log = {"seed": seed, "players": list(names), "humans": humans,
+                           "auto_ai": self.auto_ai, "ai_level": self.ai_level, "actions": []}
+        players = self.players
+        deck = self.deck
+        players.clear()
+        for i, name in enumerate(names):
+            players.append(Player(name, is_human=i < humans))
+        deck.clear()
+        self.pending_action = None
+        self.images = tuple(rng.choice(images) for images in CARD_IMAGES)
+
+        all_cards = []
+        for card_name, count in CARD_NAMES.items():
+            code = CARD_CODES.get(card_name)
+            if code is not None:
+                all_cards.extend([code] * count)
+        defuse_cards = [c for c in all_cards if c == DEFUSE]
+        other_cards = [c for c in all_cards if c != DEFUSE and c != EXPLODING_KITTEN]
+        for p in players:
+            if defuse_cards:
+                p.hand.append(defuse_cards.pop(0))
+            for _ in range(4):
+                if other_cards: p.hand.append(other_cards.pop(rng.randrange(len(other_cards))))
+        deck.extend(other_cards)
+        for _ in range(len(players)-1):
+            deck.add_card(EXPLODING_KITTEN)
+        deck.shuffle(rng)
+
+        self.current_player_idx = rng.randint(0, len(players) - 1)
+        self.turns_to_take = 1
+        self.game_started = True
+        self.events = []
+        self.wire = {}
+        self.events_start = self.seq + 1
+        self.record([{"type": "start", "players": self.public_players(), "current_player": self.current_player_idx}])
+
+
+class LegacyGame(game.Game):
+    def setup_deck(self):
+        for _ in range(3):
+            self.deck.add_card(game.Attack())
+            self.deck.add_card(game.Skip())
+            self.deck.add_card(game.Favor())
+        for _ in range(len(self.players)-1):
+            self.deck.add_card(game.ExplodingKitten())
+        for _ in range(len(self.players)):
+            self.deck.add_card(game.Defuse())
+        self.deck.shuffle(self.rng)
+
+    def deal_cards(self):
+        for p in self.players:
+            p.hand.append(game.Defuse())
+            for _ in range(3):
+                card = self.deck.draw()
+                if card:
+                    p.hand.append(card)
+
+
+class LegacyLogicGame(game_logic.Game):
+    def setup_deck(self):
+        img_index = 1
+        for _ in range(3):
+            self.deck.add_card(game_logic.Attack(f"card{img_index}.jpg")); img_index+=1
+            self.deck.add_card(game_logic.Skip(f"card{img_index}.jpg")); img_index+=1
+            self.deck.add_card(game_logic.Favor(f"card{img_index}.jpg")); img_index+=1
+        for _ in range(len(self.players)-1):
+            self.deck.add_card(game_logic.ExplodingKitten(f"card{img_index}.jpg")); img_index+=1
+        for _ in range(len(self.players)):
+            self.deck.add_card(game_logic.Defuse(f"card{img_index}.jpg")); img_index+=1
+        self.deck.shuffle(self.rng)
+
+    def deal_cards(self):
+        for p in self.players:
+            p.hand.append(game_logic.Defuse(f"card{self.rng.randint(1,45)}.jpg"))
+            for _ in range(3):
+                card = self.deck.draw()
+                if card:
+                    p.hand.append(card)
+
+
+# ---------------- SETUPS ----------------
+# Each builds one new game of `names` from the seed, the way a bot run does
+def engine_setup(cls):
+    # One Game dealt again for every seed, the way simulate.py plays its games
+    g = cls(rng=random.Random())
+    def setup(names, seed):
+        g.start(names, humans=0, seed=seed)
+    return setup
+
+
+def game_setup(cls):
+    def setup(names, seed):
+        g = cls(random.Random(seed))
+        g.add_players(names)
+        g.setup_deck()
+        g.deal_cards()
+    return setup
+
+
+def logic_setup(cls):
+    def setup(names, seed):
+        cls(names, random.Random(seed))
+    return setup
+
+
+SETUPS = [
+    ("engine.py", engine_setup(LegacyEngineGame), engine_setup(engine.Game)),
+    ("game.py", game_setup(LegacyGame), game_setup(game.Game)),
+    ("game_logic.py", logic_setup(LegacyLogicGame), logic_setup(game_logic.Game)),
+]
+
+
+def games_per_second(setup, names, games):
+    start = time.perf_counter()
+    for seed in range(games):
+        setup(names, seed)
+    return games / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark new-game setup.")
+    parser.add_argument("--games", type=int, default=20000)
+    parser.add_argument("--players", type=int, nargs="+", default=[2, 4, 5])
+    args = parser.parse_args()
+
+    print(f"{args.games} games each, games set up per second")
+    print(f"{'module':>14} {'players':>8} {'recipe':>10} {'template':>10} {'speedup':>8}")
+    for label, legacy, template in SETUPS:
+        for players in args.players:
+            names = [f"Bot {i + 1}" for i in range(players)]
+            before = games_per_second(legacy, names, args.games)
+            after = games_per_second(template, names, args.games)
+            print(f"{label:>14} {players:>8} {before:>10.0f} {after:>10.0f} {after / before:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# bench_snapshots.py
+# Snapshot size and write throughput with 10k active games, plus what a
+# save costs the request that triggers it and how fast a restarted
+# process gets games back.
+#
+#   python bench_snapshots.py [games]
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from engine import Game
+from snapshots import RNG_WORDS, SnapshotStore, decode, encode
+
+GAMES = 10_000
+ROUNDS = 5
+SEATS = 2
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def make_games(count):
+    games = {}
+    for i in range(count):
+        game = Game(rng=random.Random(i))
+        game.start(["Bench"] + [f"AI {s}" for s in range(1, SEATS)])
+        games[f"room{i}"] = game
+    return games
+
+
+def step(game):
+    # One move's worth of change: the top card goes into the current hand
+    card = game.deck.draw()
+    if card is not None:
+        game.players[game.current_player_idx].hand.append(card)
+        game.deck.add_card(card)
+    game.seq += 1
+
+
+def run(count):
+    games = make_games(count)
+    sizes = [len(encode(g)) for g in games.values()]
+    print(f"{count} games, {SEATS} seats")
+    print(f"  snapshot size : {sum(sizes) / count:,.0f} bytes avg ({RNG_WORDS.size:,} of them RNG state), {sum(sizes) / 1e6:.1f} MB total")
+
+    start = time.perf_counter()
+    blobs = [encode(g) for g in games.values()]
+    encode_us = (time.perf_counter() - start) / count * 1e6
+    start = time.perf_counter()
+    for blob in blobs:
+        decode(blob)
+    decode_us = (time.perf_counter() - start) / count * 1e6
+    print(f"  encode        : {encode_us:,.1f} us/game")
+    print(f"  decode        : {decode_us:,.1f} us/game")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        store = SnapshotStore(path)
+
+        # Every game changes and saves once per round; save() is what a
+        # request pays, the SQLite write happens on the writer thread
+        save_us = []
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            for room_id, game in games.items():
+                step(game)
+                t = time.perf_counter()
+                store.save(room_id, game)
+                save_us.append((time.perf_counter() - t) * 1e6)
+        store.flush()
+        elapsed = time.perf_counter() - start
+        saves = count * ROUNDS
+        print(f"  save() call   : p50 {percentile(save_us, 50):,.1f} us, p99 {percentile(save_us, 99):,.1f} us")
+        print(f"  throughput    : {saves / elapsed:,.0f} saves/sec ({store.writes:,} rows in {store.batches} batches,"
+              f" {saves - store.writes:,} coalesced)")
+
+        # Every game written back-to-back, no coalescing
+        store.flush()
+        writes = store.writes
+        start = time.perf_counter()
+        for room_id, game in games.items():
+            store.save_bytes(room_id, blobs[0])
+        store.flush()
+        elapsed = time.perf_counter() - start
+        print(f"  bulk write    : {(store.writes - writes) / elapsed:,.0f} rows/sec")
+        store.close()
+        print(f"  database      : {os.path.getsize(path) / 1e6:.1f} MB")
+
+        # A fresh store, like a restarted process, restoring every room
+        store = SnapshotStore(path)
+        start = time.perf_counter()
+        for room_id in games:
+            store.load(room_id)
+        elapsed = time.perf_counter() - start
+        print(f"  restore       : {count / elapsed:,.0f} games/sec ({elapsed / count * 1e6:,.0f} us/game)")
+        store.close()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else GAMES)
@@ -0,0 +1,181 @@
+# bench_spectators.py
+# One table watched by many spectators. First in process: the cost of
+# getting every new event to every spectator when each one redacts and
+# encodes it for themselves (what /stream used to do) against the shared
+# per-audience bytes from Game.encoded_events. Then live: spectators on
+# asgi.py's /stream?view=spectator while a player plays, timing how long
+# each event takes to reach all of them.
+#
+#   python bench_spectators.py [--spectators 1000] [--moves 40] [--no-live]
+
+import argparse
+import asyncio
+import http.client
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from bench_asgi import call, raise_fd_limit, serve_asgi
+from bench_routes import free_port, percentile, wait_for
+from engine import SPECTATOR, Game
+from serialize import dumps
+
+BATCH = 200 # streams opened at once
+
+
+def sse_frame(event):
+    return f"id: {event['seq']}\ndata: {dumps(event).decode()}\n\n".encode()
+
+
+def shared_frames(game, cursor):
+    encoded, _ = game.encoded_events(cursor, SPECTATOR)
+    first = game.seq - len(encoded) + 1
+    return b"".join(b"id: %d\ndata: %s\n\n" % (first + i, data) for i, data in enumerate(encoded))
+
+
+def per_viewer_frames(game, cursor):
+    events, _ = game.events_since(cursor)
+    return b"".join(sse_frame(game.redact(event, SPECTATOR)) for event in events)
+
+
+# ---------------- IN PROCESS ----------------
+def fan_out(spectators, moves, seed, frames):
+    # A scripted game; after every human action each spectator pulls what it missed
+    game = Game(rng=random.Random(seed))
+    game.start(["Player", "AI"])
+    game.begin()
+    cursors = [0] * spectators
+    spent = 0.0
+    sent = 0
+    for _ in range(moves):
+        if game.human_to_move():
+            game.draw_card()
+        else:
+            game.start(["Player", "AI"])
+            game.begin()
+        start = time.perf_counter()
+        for i in range(spectators):
+            sent += len(frames(game, cursors[i]))
+            cursors[i] = game.seq
+        spent += time.perf_counter() - start
+    return game.seq, spent, sent
+
+
+# ---------------- LIVE ----------------
+async def watch(port, room, arrivals):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET /stream?room={room}&view=spectator HTTP/1.1\r\nHost: bench\r\n\r\n".encode())
+    await writer.drain()
+    buffer = b""
+    while True:
+        chunk = await reader.read(65536)
+        if not chunk:
+            return
+        now = time.perf_counter()
+        buffer += chunk
+        *frames, buffer = buffer.split(b"\n\n")
+        for frame in frames:
+            at = frame.rfind(b"id: ")
+            if at != -1:
+                seq = int(frame[at + 4:frame.index(b"\n", at)])
+                arrivals.setdefault(seq, []).append(now)
+
+
+def play(port, room, seat, moves, produced):
+    # Draws for the player; every event a request logged is timed from its start
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    seq = call(conn, "GET", f"/events?room={room}&since=0", seat=seat)["seq"]
+    for _ in range(moves):
+        time.sleep(0.05)
+        start = time.perf_counter()
+        result = call(conn, "POST", "/draw_card", {"room": room}, seat=seat)
+        if "error" in result:
+            result = call(conn, "POST", "/start_game", {"players": "Player", "room": room}, seat=seat)
+            seat = result["seat_token"]
+        for s in range(seq + 1, result["seq"] + 1):
+            produced[s] = start
+        seq = result["seq"]
+    conn.close()
+
+
+async def live(spectators, moves):
+    port = free_port()
+    server = multiprocessing.get_context("spawn").Process(target=serve_asgi, args=(port,), daemon=True)
+    server.start()
+    tasks = []
+    try:
+        wait_for(port)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        started = call(conn, "POST", "/start_game", {"players": "Player"})
+        room, seat = started["room"], started["seat_token"]
+        conn.close()
+        arrivals = {}
+        for start in range(0, spectators, BATCH):
+            tasks += [asyncio.ensure_future(watch(port, room, arrivals)) for _ in range(min(BATCH, spectators - start))]
+            await asyncio.sleep(0.2)
+        await asyncio.sleep(1.0)
+        watching = len(arrivals.get(max(arrivals), [])) if arrivals else 0
+
+        produced = {}
+        await asyncio.to_thread(play, port, room, seat, moves, produced)
+        await asyncio.sleep(1.0)
+        cpu = cpu_seconds(server.pid)
+    finally:
+        for task in tasks:
+            task.cancel()
+        server.terminate()
+        server.join()
+
+    to_each, to_all = [], []
+    for seq, start in produced.items():
+        times = arrivals.get(seq, [])
+        to_each += [(t - start) * 1000 for t in times]
+        if len(times) == watching:
+            to_all.append((max(times) - start) * 1000)
+    return {"watching": watching, "events": len(produced), "complete": len(to_all), "server_cpu_s": cpu,
+            "p50_ms": percentile(to_each, 50), "p95_ms": percentile(to_each, 95),
+            "all_p50_ms": percentile(to_all, 50) if to_all else None, "all_p95_ms": percentile(to_all, 95) if to_all else None}
+
+
+def cpu_seconds(pid):
+    # utime + stime of the server so far, from /proc (Linux only)
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark spectator fan-out.")
+    parser.add_argument("--spectators", type=int, default=1000)
+    parser.add_argument("--moves", type=int, default=40, help="player actions")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-live", action="store_true", help="skip the run against a live server")
+    args = parser.parse_args()
+
+    print(f"{args.spectators} spectators, {args.moves} player actions")
+    for label, frames in (("per viewer", per_viewer_frames), ("shared bytes", shared_frames)):
+        events, spent, sent = fan_out(args.spectators, args.moves, args.seed, frames)
+        print(f"{label:>14}: {events} events, {spent * 1000:8.1f} ms, {spent / events * 1e6:8.1f} us/event"
+              f" for all spectators, {sent / 1e6:.1f} MB")
+
+    if args.no_live:
+        return
+    raise_fd_limit()
+    tmp = tempfile.mkdtemp()
+    os.environ.setdefault("SNAPSHOT_DB", os.path.join(tmp, "bench.db"))
+    try:
+        r = asyncio.run(live(args.spectators, args.moves))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    print(f"\nlive (asgi.py): {r['watching']} spectators, {r['events']} events, server CPU {r['server_cpu_s']:.2f} s")
+    print(f"  move -> one spectator  p50 {r['p50_ms']:.1f} ms  p95 {r['p95_ms']:.1f} ms")
+    if r["all_p50_ms"] is not None:
+        print(f"  move -> all spectators p50 {r['all_p50_ms']:.1f} ms  p95 {r['all_p95_ms']:.1f} ms"
+              f" ({r['complete']}/{r['events']} events reached everyone)")
+
+
+if __name__ == "__main__":
+    main()
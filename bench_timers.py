@@ -0,0 +1,76 @@
+# bench_timers.py
+# The turn clock's scheduler (timers.py) with one deadline per room for
+# many rooms: cost of scheduling, rescheduling (every move restarts a
+# clock) and cancelling as the number of pending timers grows, and how late
+# they fire once due. All of it runs on one timer thread.
+#
+#   python bench_timers.py [--timers 1000 10000 100000] [--spread 2.0]
+
+import argparse
+import random
+import threading
+import time
+
+from bench_routes import percentile
+from timers import Scheduler
+
+
+def per_op(fn, keys):
+    start = time.perf_counter()
+    for key in keys:
+        fn(key)
+    return (time.perf_counter() - start) / max(len(keys), 1) * 1e6
+
+
+def run(count, spread, rng):
+    threads_before = threading.active_count()
+    timers = Scheduler()
+    due_at = {}
+    late = []
+    done = threading.Event()
+
+    def fire(key):
+        late.append(time.monotonic() - due_at[key])
+        if len(late) == expected:
+            done.set()
+
+    def schedule(key):
+        # Deadlines land between spread and 2 * spread seconds from now
+        due_at[key] = timers.schedule(key, spread * (1 + rng.random()), lambda: fire(key))
+
+    keys = list(range(count))
+    expected = count
+    schedule_us = per_op(schedule, keys)
+    moved = rng.sample(keys, count // 2)
+    reschedule_us = per_op(schedule, moved)
+    cancelled = rng.sample(keys, count // 10)
+    expected = count - len(cancelled)
+    cancel_us = per_op(timers.cancel, cancelled)
+    pending, heap, threads = len(timers), len(timers._heap), threading.active_count() - threads_before
+
+    done.wait(4 * spread + 30)
+    return {"timers": count, "schedule_us": schedule_us, "reschedule_us": reschedule_us, "cancel_us": cancel_us,
+            "pending": pending, "heap": heap, "threads": threads, "fired": len(late), "expected": expected,
+            "late_p50_ms": percentile(late, 50) * 1000, "late_p99_ms": percentile(late, 99) * 1000,
+            "late_max_ms": max(late) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the timer scheduler.")
+    parser.add_argument("--timers", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--spread", type=float, default=2.0, help="seconds until the first deadlines")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'timers':>8} {'schedule us':>12} {'reschedule':>11} {'cancel':>7} {'pending':>8} {'heap':>8} {'+threads':>8}"
+          f" {'fired':>8} {'late p50 ms':>12} {'p99':>7} {'max':>7}")
+    for count in args.timers:
+        r = run(count, args.spread, rng)
+        print(f"{r['timers']:>8} {r['schedule_us']:>12.2f} {r['reschedule_us']:>11.2f} {r['cancel_us']:>7.2f}"
+              f" {r['pending']:>8} {r['heap']:>8} {r['threads']:>8} {r['fired']:>8}"
+              f" {r['late_p50_ms']:>12.2f} {r['late_p99_ms']:>7.2f} {r['late_max_ms']:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
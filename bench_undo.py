@@ -0,0 +1,82 @@
+# bench_undo.py
+# What a lookahead pays per hypothetical move: deepcopy the game and play
+# the move, clone() it and play the move, or play the move on the real
+# game and roll it back with the journal. The last two columns repeat it
+# with 5,000 extra cards in the deck to show which costs grow with it.
+#
+#   python bench_undo.py
+
+import copy
+import random
+import time
+
+from engine import CARD_CODES, CARD_TYPES, Game
+
+POSITIONS = 200
+REPEATS = 20
+BIG_DECK = 5000
+
+
+def positions(count, extra_cards=0):
+    rng = random.Random(1)
+    games = []
+    while len(games) < count:
+        game = Game(rng=random.Random(rng.random()))
+        game.auto_ai = False
+        # Every seat human, so a move never sets off the AI
+        game.start(["A", "B", "C"], humans=3)
+        if extra_cards:
+            game.deck.extend(rng.choice((CARD_CODES["Nope"], CARD_CODES["Skip"])) for _ in range(extra_cards))
+        for _ in range(rng.randrange(6)):
+            game.draw_card()
+        if game.players[game.current_player_idx].is_alive and len(game.players) > 1:
+            games.append(game)
+    return games
+
+
+def draw(game):
+    game.draw_card()
+
+
+def play(game):
+    # Shuffle if the seat holds one (touches the whole deck), else draw
+    hand = game.players[game.current_player_idx].hand
+    for i, card in enumerate(hand):
+        if CARD_TYPES[card] == "Shuffle":
+            game.play_card(i)
+            return
+    game.draw_card()
+
+
+def per_move(games, move, how):
+    search_rng = random.Random(2)
+    start = time.perf_counter()
+    for game in games:
+        for _ in range(REPEATS):
+            if how == "deepcopy":
+                move(copy.deepcopy(game))
+            elif how == "clone":
+                move(game.clone())
+            elif how == "clone(rng)":
+                move(game.clone(rng=search_rng))
+            else:
+                mark = game.checkpoint()
+                move(game)
+                game.rollback(mark)
+    return (time.perf_counter() - start) / (len(games) * REPEATS) * 1e6
+
+
+def main():
+    small = positions(POSITIONS)
+    big = positions(POSITIONS // 4, BIG_DECK)
+
+    print(f"{POSITIONS} positions x {REPEATS} moves, microseconds per move")
+    print(f"{'':>22} {'draw':>9} {'shuffle':>9} {'draw +5k':>9} {'shuffle +5k':>12}")
+    for how in ("deepcopy", "clone", "clone(rng)", "journal"):
+        row = [per_move(games, move, how) for games in (small, big) for move in (draw, play)]
+        label = "checkpoint/rollback" if how == "journal" else how + " + move"
+        print(f"{label:>22} {row[0]:>9.1f} {row[1]:>9.1f} {row[2]:>9.1f} {row[3]:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
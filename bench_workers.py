@@ -0,0 +1,94 @@
+# bench_workers.py
+# Throughput of the Flask app with 1, 2, 4, ... worker processes sharing
+# one GAME_STORE, the way gunicorn -w N would run it. Workers pick rooms
+# at random from a shared pool, so they regularly race on the same room
+# and the version checks in store.py have to sort it out.
+#
+#   python bench_workers.py [--store sqlite:/tmp/bench.db] [--workers 1 2 4] [--rooms 200] [--seconds 5]
+
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+
+def worker(store_spec, rooms, seconds, seed, results):
+    os.environ["GAME_STORE"] = store_spec
+    from app import app, store
+
+    client = app.test_client()
+    rng = random.Random(seed)
+    requests = restarts = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        # Every worker plays as the room's seated player
+        room_id, seat = rng.choice(rooms)
+        headers = {"X-Seat-Token": seat}
+        if rng.random() < 0.5:
+            client.get(f"/get_game_state?room={room_id}", headers=headers)
+        else:
+            result = client.post("/draw_card", json={"room": room_id}, headers=headers).get_json()
+            # Finished (or lost to the AI): deal a new game in the same room
+            if "error" in result or any(m.get("type") in ("win", "game_broken") for m in result.get("moves", ())):
+                client.post("/start_game", json={"room": room_id, "players": "Bench"}, headers=headers)
+                restarts += 1
+        requests += 1
+    results.put((requests, restarts, store.conflicts))
+
+
+def make_rooms(store_spec, count):
+    os.environ["GAME_STORE"] = store_spec
+    from app import app
+
+    client = app.test_client()
+    rooms = []
+    for _ in range(count):
+        started = client.post("/start_game", json={"players": "Bench"}).get_json()
+        rooms.append((started["room"], started["seat_token"]))
+        client.delete_cookie("room_id")
+    return rooms
+
+
+def run(store_spec, worker_counts, room_count, seconds):
+    ctx = multiprocessing.get_context("spawn")
+    rooms = ctx.Pool(1).apply(make_rooms, (store_spec, room_count))
+    print(f"{store_spec}, {room_count} rooms, {seconds}s per run, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'req/s':>10} {'scaling':>8} {'conflicts':>10} {'restarts':>9}")
+    base = None
+    for n in worker_counts:
+        results = ctx.Queue()
+        procs = [ctx.Process(target=worker, args=(store_spec, rooms, seconds, i, results)) for i in range(n)]
+        for p in procs:
+            p.start()
+        totals = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+        requests = sum(t[0] for t in totals)
+        rate = requests / seconds
+        base = base or rate
+        print(f"{n:>8} {rate:>10,.0f} {rate / base:>7.2f}x {sum(t[2] for t in totals):>10} {sum(t[1] for t in totals):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-worker load test over a shared GAME_STORE.")
+    parser.add_argument("--store", help="GAME_STORE value (default: a fresh SQLite file)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--rooms", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    try:
+        store_spec = args.store or f"sqlite:{os.path.join(tmp, 'bench.db')}"
+        if store_spec == "memory":
+            raise SystemExit("memory is per process; use sqlite:PATH or file:DIR")
+        run(store_spec, args.workers, args.rooms, args.seconds)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
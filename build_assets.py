@@ -0,0 +1,126 @@
+# build_assets.py
+# Builds the card images the browser actually downloads: a small "thumb"
+# for hands and flying cards, a "full" size for the discard pile, each as
+# WebP plus a JPEG fallback. File names carry a hash of their contents so
+# they can be cached forever (see the /assets route in app.py), and
+# manifest.json maps every original image to its variants.
+#
+# Needs Pillow. Run it whenever the card art changes:
+#
+#   python build_assets.py [--src DIR] [--out DIR]
+
+import argparse
+import hashlib
+import io
+import json
+import os
+
+from assets import ASSET_DIR, ASSET_URL_PREFIX, CARD_BACK_IMAGE, MANIFEST_NAME
+from class_data import CARD_MAP
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# (max width, max height) per variant: 2x the size the CSS draws them at
+SIZES = {
+    "thumb": (160, 224),
+    "full": (400, 560),
+}
+WEBP_QUALITY = 75
+JPEG_QUALITY = 78
+HASH_LENGTH = 10
+
+# Files in the repo that don't match the name CARD_MAP uses
+SOURCE_ALIASES = {"card35.jpg": "crd35.jpg"}
+
+
+def find_source(filename, search_dirs):
+    for name in (filename, SOURCE_ALIASES.get(filename)):
+        if not name:
+            continue
+        for folder in search_dirs:
+            path = os.path.join(folder, name)
+            if os.path.exists(path):
+                return path
+    return None
+
+
+def encode(image, fmt, quality):
+    buf = io.BytesIO()
+    if fmt == "jpg":
+        image.save(buf, "JPEG", quality=quality, optimize=True, progressive=True)
+    else:
+        image.save(buf, "WEBP", quality=quality, method=6)
+    return buf.getvalue()
+
+
+def write_hashed(out_dir, stem, variant, ext, data):
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    name = f"{stem}.{variant}.{digest}.{ext}"
+    path = os.path.join(out_dir, name)
+    if not os.path.exists(path):
+        with open(path, "wb") as f:
+            f.write(data)
+    return ASSET_URL_PREFIX + name
+
+
+def build_image(Image, source, out_dir):
+    stem = os.path.splitext(os.path.basename(source))[0]
+    variants = {}
+    with Image.open(source) as original:
+        original = original.convert("RGB")
+        for variant, box in SIZES.items():
+            image = original.copy()
+            image.thumbnail(box, Image.LANCZOS)
+            variants[variant] = {
+                "webp": write_hashed(out_dir, stem, variant, "webp", encode(image, "webp", WEBP_QUALITY)),
+                "jpg": write_hashed(out_dir, stem, variant, "jpg", encode(image, "jpg", JPEG_QUALITY)),
+            }
+    return variants
+
+
+def build(search_dirs, out_dir):
+    try:
+        from PIL import Image
+    except ImportError:
+        raise SystemExit("build_assets.py needs Pillow: pip install pillow")
+
+    os.makedirs(out_dir, exist_ok=True)
+    images = {filename: title for filename, title in CARD_MAP.items()}
+    images[os.path.basename(CARD_BACK_IMAGE)] = "Card Back"
+
+    manifest = {}
+    for filename, title in images.items():
+        source = find_source(filename, search_dirs)
+        if source is None:
+            print(f"  missing {filename}, skipped")
+            continue
+        manifest[f"images/{filename}"] = {"name": title, **build_image(Image, source, out_dir)}
+
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return manifest
+
+
+def total_bytes(out_dir, manifest, variant, ext):
+    return sum(os.path.getsize(os.path.join(out_dir, entry[variant][ext][len(ASSET_URL_PREFIX):]))
+               for entry in manifest.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build resized, content-hashed card images.")
+    parser.add_argument("--src", action="append", help="folder with the original JPEGs (repeatable)")
+    parser.add_argument("--out", default=ASSET_DIR)
+    args = parser.parse_args()
+
+    search_dirs = args.src or [os.path.join(HERE, "static", "images"), HERE]
+    manifest = build(search_dirs, args.out)
+
+    originals = sum(os.path.getsize(find_source(name.split("/", 1)[1], search_dirs)) for name in manifest)
+    print(f"{len(manifest)} images, originals {originals / 1024:,.0f} KB")
+    for variant in SIZES:
+        for ext in ("webp", "jpg"):
+            print(f"  {variant:<5} {ext:<4} {total_bytes(args.out, manifest, variant, ext) / 1024:>8,.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
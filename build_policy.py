@@ -0,0 +1,72 @@
+# build_policy.py
+# Fills policy.bin offline: plays AI-only games with every seat searching
+# at the given difficulties, and keeps each decision the search made under
+# its abstract key (see policy.py). app.py loads the file at startup, so
+# those situations never need a search at serving time. Running it again
+# adds to the existing file.
+#
+#   python build_policy.py [--levels easy medium] [--games 200] [--players 3]
+
+import argparse
+import os
+import random
+import time
+from multiprocessing import Pool
+
+import policy
+from engine import Game
+from simulate import play_game
+
+
+def run_games(job):
+    seed, games, seats, level = job
+    rng = random.Random(seed)
+    game = Game(rng=rng)
+    game.ai_level = level
+    # A fresh table per job, so what comes back is only this job's work
+    table = policy.TABLE = policy.PolicyTable()
+    for _ in range(games):
+        play_game(game, seats)
+    return list(table.entries.items()), table.hits, table.misses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute search AI decisions into a policy file.")
+    parser.add_argument("--levels", nargs="+", default=["easy", "medium"], choices=list(policy.LEVEL_NAMES))
+    parser.add_argument("--games", type=int, default=200, help="games per level")
+    parser.add_argument("--players", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--capacity", type=int, default=policy.CAPACITY)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default=policy.POLICY_FILE)
+    args = parser.parse_args()
+
+    table = policy.load_table(args.out, args.capacity)
+    existing = len(table)
+    master = random.Random(args.seed)
+    jobs = []
+    for level in args.levels:
+        per_worker, extra = divmod(args.games, args.workers)
+        for i in range(args.workers):
+            n = per_worker + (i < extra)
+            if n:
+                jobs.append((master.getrandbits(64), n, args.players, level))
+
+    start = time.perf_counter()
+    hits = misses = 0
+    with Pool(args.workers) as pool:
+        for entries, chunk_hits, chunk_misses in pool.imap_unordered(run_games, jobs):
+            for key, card in entries:
+                table.put(key, card)
+            hits += chunk_hits
+            misses += chunk_misses
+    elapsed = time.perf_counter() - start
+    table.save(args.out)
+
+    decisions = hits + misses
+    print(f"{decisions:,} decisions in {elapsed:.1f}s, {hits / max(decisions, 1):.1%} answered from the table")
+    print(f"{args.out}: {existing:,} -> {len(table):,} entries, {os.path.getsize(args.out):,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,205 @@
-import random
+# Cards live in blocks ordered bottom -> top, and each block is itself
+# ordered bottom -> top, so drawing from the top is a plain list.pop().
+# A Fenwick tree over the block sizes finds the block holding any
+# position in O(log n), which keeps random inserts (Defuse) cheap.
+BLOCK_SIZE = 512
 
 class Deck:
-    def __init__(self):
-        self.cards = []
+    def __init__(self, cards=None, kind=list):
+        # kind=bytearray stores small integer card codes one byte each
+        self.kind = kind
+        # A journal.Journal while a search may roll this deck back
+        self.journal = None
+        self._reset()
+        if cards:
+            self.extend(cards)
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        # Top card first, like the old list decks
+        for block in reversed(self._blocks):
+            yield from reversed(block)
+
+    def __repr__(self):
+        return f"Deck({self.peek(len(self))!r})"
+
+    @property
+    def cards(self):
+        return list(self)
+
+    def copy(self):
+        deck = Deck(kind=self.kind)
+        deck._rebuild(self._bottom_first())
+        return deck
+
+    def clear(self):
+        if self.journal is not None:
+            self._save()
+        self._reset()
+
+    def _reset(self):
+        self._blocks = []
+        self._tree = [0]
+        self._size = 0
+        # Cards drawn from the bottom block that the tree has not been told about
+        self._trim = 0
 
     def add_card(self, card):
-        self.cards.append(card)
+        # New cards go to the bottom, like appending to the old list decks
+        self.insert(self._size, card)
+
+    def extend(self, cards):
+        # Given top first, added underneath the current bottom card
+        if self.journal is not None:
+            self._save()
+        self._rebuild(self.kind(cards)[::-1] + self._bottom_first())
 
-    def shuffle(self):
-        random.shuffle(self.cards)
+    def shuffle(self, rng):
+        # Always the owning game's RNG, so one game never moves another's stream
+        if self.journal is not None:
+            self._save()
+        cards = self._bottom_first()
+        rng.shuffle(cards)
+        self._rebuild(cards)
 
     def draw(self):
-        if self.cards:
-            return self.cards.pop(0)
-        return None
+        """Take the top card, or None when the deck is empty. O(1)."""
+        if not self._size:
+            return None
+        blocks = self._blocks
+        top = blocks[-1]
+        card = top.pop()
+        self._size -= 1
+        if top:
+            # Updating the last Fenwick slot only ever touches that slot
+            self._tree[-1] -= 1
+        elif len(blocks) == 1:
+            self._reset()
+        else:
+            blocks.pop()
+            self._tree.pop()
+        if self.journal is not None:
+            self.journal.entries.append((self._insert, (0, card)))
+        return card
+
+    def draw_bottom(self):
+        """Take the bottom card, or None when the deck is empty."""
+        if not self._size:
+            return None
+        bottom = self._blocks[0]
+        card = bottom.pop(0)
+        self._size -= 1
+        # Removing from block 0 lowers every prefix sum by one, so just
+        # remember the offset instead of walking the tree
+        self._trim += 1
+        if not bottom:
+            del self._blocks[0]
+            self._rebuild_tree()
+        if self.journal is not None:
+            self.journal.entries.append((self._insert, (self._size, card)))
+        return card
+
+    def peek(self, k=3):
+        """Top k cards, top first, without removing them."""
+        seen = []
+        for block in reversed(self._blocks):
+            for card in reversed(block):
+                if len(seen) >= k:
+                    return seen
+                seen.append(card)
+        return seen
+
+    def insert(self, index, card):
+        """Put a card so that `index` cards sit above it (0 = top)."""
+        index = max(0, min(index, self._size))
+        self._insert(index, card)
+        if self.journal is not None:
+            self.journal.entries.append((self._delete, (index,)))
+
+    # ---------------- UNDO ----------------
+    # The raw operations the journal replays; they don't journal themselves
+    def _save(self):
+        self.journal.entries.append((self._rebuild, (self._bottom_first(),)))
+
+    def _insert(self, index, card):
+        below = self._size - index
+        blocks = self._blocks
+        if not blocks:
+            self._rebuild(self.kind([card]))
+            return
+        if below == self._size:
+            # Straight onto the top block
+            block_idx = len(blocks) - 1
+            blocks[-1].append(card)
+        else:
+            block_idx, offset = self._locate(below)
+            blocks[block_idx].insert(offset, card)
+        self._size += 1
+        if len(blocks[block_idx]) > 2 * BLOCK_SIZE:
+            block = blocks[block_idx]
+            blocks[block_idx:block_idx + 1] = [block[:BLOCK_SIZE], block[BLOCK_SIZE:]]
+            self._rebuild_tree()
+        else:
+            self._tree_add(block_idx, 1)
+
+    def _delete(self, index):
+        # Remove the card with `index` cards above it
+        block_idx, offset = self._locate(self._size - index)
+        blocks = self._blocks
+        blocks[block_idx].pop(offset - 1)
+        self._size -= 1
+        if blocks[block_idx]:
+            self._tree_add(block_idx, -1)
+        else:
+            del blocks[block_idx]
+            self._rebuild_tree()
+
+    # ---------------- FENWICK HELPERS ----------------
+    def _bottom_first(self):
+        if self.kind is bytearray:
+            return bytearray().join(self._blocks)
+        return [c for block in self._blocks for c in block]
+
+    def _rebuild(self, cards_bottom_first):
+        self._blocks = [cards_bottom_first[i:i + BLOCK_SIZE] for i in range(0, len(cards_bottom_first), BLOCK_SIZE)]
+        self._size = len(cards_bottom_first)
+        self._rebuild_tree()
+
+    def _rebuild_tree(self):
+        tree = [0] + [len(b) for b in self._blocks]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+        self._trim = 0
+
+    def _tree_add(self, block_idx, delta):
+        tree = self._tree
+        i = block_idx + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _locate(self, below):
+        # Find the block with `below` cards underneath the insert point:
+        # the last block whose prefix sum is still < below (+ trim offset).
+        tree = self._tree
+        target = below + self._trim
+        pos = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            nxt = pos + step
+            if nxt < len(tree) and tree[nxt] < target:
+                pos = nxt
+                target -= tree[nxt]
+            step >>= 1
+        if pos == 0:
+            return 0, below
+        # `target` is now below minus the true size of blocks[:pos]
+        if pos == len(self._blocks):
+            pos -= 1
+            return pos, len(self._blocks[pos])
+        return pos, target
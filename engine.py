@@ -0,0 +1,973 @@
+# engine.py
+# The game rules with no web framework attached. app.py wraps a Game per
+# room; simulate.py plays whole games with nothing but AI seats.
+
+import random
+from collections import OrderedDict
+from time import perf_counter
+
+from assets import variants
+from class_data import CARD_MAP
+from deck import Deck
+from hand import Hand
+from journal import Journal
+import metrics
+from metrics import Counter, Histogram
+from risk import SURE, KittenOdds
+from seats import SeatRing
+from serialize import Raw, dumps
+
+# ---------------- CARD DATA ----------------
+CARD_NAMES = {
+    "Attack": 3, "Skip": 3, "Favor": 3,
+    "See the Future": 3, "Shuffle": 3, "Nope": 5, "Defuse": 4 
+}
+
+# Cards are plain small ints. Decks and hands hold these codes in compact
+# bytearrays; everything else about a card type comes from the tables below.
+CARD_TYPES = ("Exploding Kitten", "Defuse", "Attack", "Skip", "Favor", "See the Future", "Shuffle", "Nope")
+EXPLODING_KITTEN, DEFUSE, ATTACK, SKIP, FAVOR, SEE_THE_FUTURE, SHUFFLE, NOPE = range(len(CARD_TYPES))
+CARD_CODES = {name: code for code, name in enumerate(CARD_TYPES)}
+# Cards an AI seat may choose to play on its turn
+AI_PLAYABLE = (SEE_THE_FUTURE, ATTACK, SKIP, SHUFFLE, FAVOR)
+# The scripted AI looks at the top cards once its chance of drawing a
+# kitten (Game.kitten_risk) is at least this
+STF_RISK = 0.2
+
+def scripted_play(has, hand_size, risk, rng):
+    """The scripted AI's next play, or None to draw. `has(card)` says whether
+    the hand holds one; `risk` is the seat's chance of drawing a kitten.
+    Shared by Game.ai_moves and the rollouts in mcts.py."""
+    # 1. See the Future, unless the top card is already known
+    if has(SEE_THE_FUTURE) and 0 < risk < SURE and (risk >= STF_RISK or has(DEFUSE)):
+        return SEE_THE_FUTURE
+    # 2. Attack
+    if has(ATTACK):
+        return ATTACK
+    # 3. Shuffle, always when a kitten is known to be on top
+    if has(SHUFFLE) and (risk >= SURE or rng.random() < 0.2):
+        return SHUFFLE
+    # 4. Favor
+    if has(FAVOR) and hand_size < 4:
+        return FAVOR
+    return None
+
+def card_images(name):
+    # Every picture in CARD_MAP showing this card type ("See the Future 3x",
+    # "See the Future 5x", ... all count as See the Future)
+    return tuple(f"images/{image}" for image, title in CARD_MAP.items()
+                 if title == name or title.startswith(name + " "))
+
+# CARD_IMAGES[code] = the art a game may pick from for that card type
+CARD_IMAGES = tuple(card_images(name) for name in CARD_TYPES)
+
+# The deck recipe compiled once: every card but the Defuses (one is dealt
+# to each player while they last) and the Kittens (added per table size).
+# A new game copies it, shuffles it and deals off the top.
+HAND_SIZE = 4 # dealt next to each player's Defuse
+DEFUSE_SUPPLY = CARD_NAMES["Defuse"]
+DRAW_TEMPLATE = bytes(CARD_CODES[name] for name, count in CARD_NAMES.items() if name != "Defuse" for _ in range(count))
+# Party tables shuffle in one copy of the recipe (Defuses too) for every
+# PARTY_SEATS seats, so hundreds of players still get a full deal
+PARTY_SEATS = 4
+
+# What the API sends for a card, built once per picture ("thumb" / "full"
+# point at the built image variants when there are any). Shared by every
+# game and every response, so never modify one.
+CARD_PAYLOADS = {image: {"name": name, "image": image, **variants(image)}
+                 for name, images in zip(CARD_TYPES, CARD_IMAGES) for image in images}
+
+
+# ---------------- METRICS ----------------
+# Served by app.py's /metrics (see metrics.py)
+PHASE_SECONDS = Histogram("ek_phase_seconds", "Time spent in each part of the game loop", label="phase")
+EXPLOSIONS = Counter("ek_explosions_total", "Exploding Kittens that blew a player up", label="seat")
+DEFUSES = Counter("ek_defuses_total", "Exploding Kittens defused", label="seat")
+AI_ITERATIONS = Counter("ek_ai_iterations_total", "Turns started by AI seats")
+AI_STALLS = Counter("ek_ai_stalls_total", 'Times the "AI turn sequence stalled" guard ended an AI chain')
+TIMEOUTS = Counter("ek_timeouts_total", "Moves the server made for a player whose time ran out", label="kind")
+# The part of an AI turn that produces each kind of move ai_moves() yields
+MOVE_PHASES = {"ai_play": "ai_play", "shuffle_effect": "ai_play", "seefuture_effect": "ai_play", "favor_effect": "ai_play",
+               "ai_draw": "draw", "ai_defuse": "draw", "ai_explode": "draw"}
+
+
+# ---------------- AUDIENCES ----------------
+# Who a state or event is encoded for. Seated players see what the person
+# at the table may know (their own cards, not the AI seats'), spectators
+# only what is face up, admins everything. Tables have one human seat, so
+# every seated player of a room gets the same bytes.
+PLAYER, SPECTATOR, ADMIN = "player", "spectator", "admin"
+AUDIENCES = (PLAYER, SPECTATOR, ADMIN)
+
+
+# ---------------- PLAYER CLASS & GAME STATE ----------------
+class Player:
+    def __init__(self, name, is_human=True, cards=()):
+        self.name = name
+        self.hand = Hand(cards, types=len(CARD_TYPES))
+        self.is_alive = True
+        self.is_human = is_human
+        # audience -> (hand bytes, alive, images, JSON) from the last Game.player_json
+        self.fragments = {}
+
+class AIDecision:
+    # Yielded by ai_moves() when a searched seat (ai_level set) has to pick a
+    # card. Reply with steps.send(card code, or None to draw). `view` is all
+    # the seat knows, as plain data for mcts.choose.
+    __slots__ = ("view",)
+
+    def __init__(self, view):
+        self.view = view
+
+class PhaseTimer:
+    # Drives an ai_moves() chain and adds up the engine's own time per phase,
+    # leaving out whatever the caller does between moves. Observed once per
+    # chain, so a histogram sample is what one request (or one push-mode
+    # chain) spent in that phase.
+    __slots__ = ("totals",)
+
+    def __init__(self):
+        self.totals = {}
+
+    def send(self, steps, reply=None):
+        start = perf_counter()
+        move = steps.send(reply)
+        elapsed = perf_counter() - start
+        phase = "ai_play" if move.__class__ is AIDecision else MOVE_PHASES.get(move.get("type"), "ai_other")
+        totals = self.totals
+        totals[phase] = totals.get(phase, 0.0) + elapsed
+        return move
+
+    def add(self, phase, seconds):
+        self.totals[phase] = self.totals.get(phase, 0.0) + seconds
+
+    def observe(self):
+        for phase, seconds in self.totals.items():
+            PHASE_SECONDS.observe(seconds, phase)
+        self.totals = {}
+
+class Game:
+    def __init__(self, rng=None):
+        # Each game can carry its own RNG so headless runs are reproducible
+        self.rng = rng or random.Random()
+        self.players = []
+        # Who is still in, in turn order (see seats.py); rebuilt by reset_seats()
+        self.seats = SeatRing()
+        self.deck = Deck(kind=bytearray)
+        # The chance of drawing a kitten as each seat can know it (see risk.py)
+        self.odds = KittenOdds()
+        # The picture used for each card type, picked fresh every game
+        self.images = tuple(images[0] for images in CARD_IMAGES)
+        self.current_player_idx = 0
+        self.game_started = False
+        self.turns_to_take = 1
+        self.pending_action = None
+        # When False, human actions stop once it is an AI seat's turn and the
+        # caller runs ai_moves() itself (app.py does this off the request thread)
+        self.auto_ai = True
+        # None plays the scripted priority list; a key of mcts.LEVELS makes
+        # AI seats search instead (a list gives every seat its own level)
+        self.ai_level = None
+        # Append-only, numbered log of everything that happened. seq keeps
+        # counting across restarts of the same room so old cursors stay valid.
+        self.seq = 0
+        self.events = []
+        self.events_start = 1
+        # Undo log shared by the deck and every hand while a lookahead runs
+        self.journal = None
+        # The seed and every action since start(): enough for replay.py to
+        # play the game again move for move (see log_action)
+        self.action_log = None
+        # Recorded AI picks to use instead of searching, while replaying
+        self.replay_picks = None
+        # audience -> every event so far, redacted and encoded once (see encoded_events)
+        self.wire = {}
+        # Secret of the seated human, handed out by app.py's /start_game;
+        # only requests carrying it see the PLAYER view or move
+        self.seat_token = None
+        # Idempotency key -> response of the latest moves (see app.act). Kept
+        # with the game, so a retry that reaches another worker is answered too
+        self.responses = OrderedDict()
+
+    # ---------------- HELPERS ----------------
+    def reset_seats(self):
+        # After the players list is built or replaced wholesale
+        self.seats = SeatRing(p.is_alive for p in self.players)
+
+    def get_next_player_index(self, start_idx):
+        return self.seats.next(start_idx)
+
+    def eliminate(self, idx):
+        self.players[idx].is_alive = False
+        self.seats.remove(idx)
+        # Turns still owed from an Attack die with the player
+        self.turns_to_take = 1
+
+    def add_attack_turns(self):
+        # An Attack owes two more turns, handed on by the next change_turn()
+        if self.seats.count:
+            self.turns_to_take += 2
+
+    def change_turn(self):
+        self.turns_to_take = max(0, self.turns_to_take - 1)
+        if self.turns_to_take == 0:
+            self.current_player_idx = self.get_next_player_index(self.current_player_idx)
+            if self.current_player_idx != -1:
+                self.turns_to_take = 1
+        return self.current_player_idx
+
+    def human_to_move(self):
+        # The game is waiting on a person (app.py runs their clock)
+        idx = self.current_player_idx
+        if idx == -1 or not self.game_started:
+            return False
+        player = self.players[idx]
+        if not player.is_human or not player.is_alive:
+            return False
+        return self.seats.count > 1
+
+    def ai_to_move(self):
+        idx = self.current_player_idx
+        if idx == -1 or not self.game_started:
+            return False
+        player = self.players[idx]
+        if player.is_human or not player.is_alive:
+            return False
+        return self.seats.count > 1
+
+    def kitten_risk(self, seat=None):
+        # From what `seat` has seen (None: only what everyone has)
+        return self.odds.chance(seat)
+
+    def odds_view(self, audience=PLAYER):
+        # Seated players get the human seat's chance (tables have one),
+        # spectators the public one and admins every seat's. "exact" is
+        # False while the seat's chance is risk.py's capped estimate.
+        odds = self.odds
+        view = {"deck": odds.size, "kittens": odds.kittens}
+        if audience == PLAYER:
+            human = next((i for i, p in enumerate(self.players) if p.is_human), None)
+            view["risk"] = round(odds.chance(human), 4)
+            view["exact"] = odds.exact(human)
+        else:
+            view["risk"] = round(odds.chance(), 4)
+            view["exact"] = True
+        if audience == ADMIN:
+            view["seats"] = [round(odds.chance(i), 4) for i in range(len(self.players))]
+        return view
+
+    def check_win_condition(self):
+        start = perf_counter()
+        # The ring counts who is left, so this is O(1) at any table size
+        alive = self.seats.count
+        result = None, None
+        if alive == 1:
+            winner = self.players[self.seats.head]
+            result = winner, {"type": "win", "player": winner.name, "message": f"🏆 {winner.name} wins the game! 🏆"}
+        elif alive == 0:
+            result = None, {"type": "game_broken", "message": "Game over! No remaining players. Restarting is recommended."}
+        if metrics.ENABLED:
+            PHASE_SECONDS.observe(perf_counter() - start, "win_check")
+        return result
+
+    def log_action(self, *action):
+        # Compact entries: ["b"] begin, ["d"] draw, ["p", index, target] play,
+        # ["f", card name] resolve favor, ["a"] an AI chain started by the
+        # caller (app.py's run_ai), ["m", card or None] a searched AI's pick
+        if self.action_log is not None:
+            self.action_log["actions"].append(list(action))
+
+    def card_dict(self, card):
+        return CARD_PAYLOADS[self.images[card]]
+
+    # ---------------- SETUP ----------------
+    def start(self, names, humans=1, seed=None, party=False):
+        # The first `humans` seats are people, everyone else is played by the AI.
+        # Each game reseeds the RNG, so the seed alone reproduces the deal.
+        # party=True scales the deck with the table (see PARTY_SEATS).
+        rng = self.rng
+        if seed is None:
+            seed = rng.getrandbits(64)
+        rng.seed(seed)
+        self.action_log = {"seed": seed, "players": list(names), "humans": humans,
+                           "auto_ai": self.auto_ai, "ai_level": self.ai_level, "party": party, "actions": []}
+        players = self.players
+        deck = self.deck
+
+        deck.clear()
+        self.pending_action = None
+        self.images = tuple(rng.choice(images) for images in CARD_IMAGES)
+
+        # Deal off a shuffled copy of the template: a Defuse (while they
+        # last) and HAND_SIZE cards each, the rest is the deck
+        decks = -(-len(names) // PARTY_SEATS) if party else 1
+        pile = bytearray(DRAW_TEMPLATE * decks)
+        rng.shuffle(pile)
+        defuses = DEFUSE_SUPPLY * decks
+        players.clear()
+        for i, name in enumerate(names):
+            hand = pile[i * HAND_SIZE:(i + 1) * HAND_SIZE]
+            if i < defuses:
+                hand.insert(0, DEFUSE)
+            players.append(Player(name, is_human=i < humans, cards=hand))
+        pile = pile[len(names) * HAND_SIZE:]
+        self.reset_seats()
+
+        # Exploding Kittens (N-1 for N players), each at a random depth of
+        # the already shuffled deck
+        for _ in range(len(names) - 1):
+            pile.insert(rng.randint(0, len(pile)), EXPLODING_KITTEN)
+        deck.extend(pile)
+        self.odds.reset(len(deck), len(names) - 1)
+
+        self.current_player_idx = rng.randint(0, len(players) - 1)
+        self.turns_to_take = 1
+        self.game_started = True
+
+        # A new game starts a new log; the start event carries the table
+        self.events = []
+        self.wire = {}
+        self.events_start = self.seq + 1
+        self.record([{"type": "start", "players": self.public_players(), "current_player": self.current_player_idx}])
+
+    # ---------------- LOOKAHEAD ----------------
+    # A search can apply a move, look at the result and roll it back. Hands
+    # and the deck journal their own changes; the rest is a few fields saved
+    # with each mark, so apply + rollback costs what the move touched.
+    def checkpoint(self, rng=False):
+        """Return a mark to rollback() to. rng=True rewinds the RNG as well."""
+        if self.journal is None:
+            self.journal = Journal()
+            self.deck.journal = self.journal
+        for p in self.players:
+            p.hand.journal = self.journal
+        return (self.journal.mark(), self.seats.mark(), self.current_player_idx, self.turns_to_take, self.pending_action,
+                self.game_started, tuple(self.players), tuple(p.is_alive for p in self.players),
+                self.images, self.seq, self.events, len(self.events), self.events_start,
+                self.action_log, len(self.action_log["actions"]) if self.action_log else 0,
+                self.odds.state(), self.rng.getstate() if rng else None)
+
+    def rollback(self, mark):
+        (at, seats_at, self.current_player_idx, self.turns_to_take, self.pending_action, self.game_started,
+         players, alive, self.images, self.seq, events, event_count, self.events_start,
+         action_log, action_count, odds, rng_state) = mark
+        self.journal.undo(at)
+        self.seats.undo(seats_at)
+        self.odds.restore(odds)
+        self.players[:] = players
+        for p, is_alive in zip(players, alive):
+            p.is_alive = is_alive
+        del events[event_count:]
+        self.events = events
+        self.wire = {}
+        if action_log is not None:
+            del action_log["actions"][action_count:]
+        self.action_log = action_log
+        if rng_state is not None:
+            self.rng.setstate(rng_state)
+
+    def stop_journal(self):
+        # Back to plain play: nothing is recorded any more
+        self.journal = None
+        self.deck.journal = None
+        for p in self.players:
+            p.hand.journal = None
+
+    def clone(self, rng=None):
+        """An independent copy, for when a branch has to outlive the move.
+        Hands and the deck are byte strings, so there's nothing to deepcopy.
+        Copying the RNG state is most of the cost; a search that brings its
+        own `rng` skips it."""
+        if rng is None:
+            rng = random.Random()
+            rng.setstate(self.rng.getstate())
+        game = Game(rng=rng)
+        for p in self.players:
+            player = Player(p.name, p.is_human)
+            player.is_alive = p.is_alive
+            player.hand.cards = bytearray(p.hand.cards)
+            player.hand.counts = list(p.hand.counts)
+            game.players.append(player)
+        game.reset_seats()
+        game.deck = self.deck.copy()
+        game.odds.restore(self.odds.state())
+        game.images = self.images
+        game.current_player_idx = self.current_player_idx
+        game.game_started = self.game_started
+        game.turns_to_take = self.turns_to_take
+        game.pending_action = self.pending_action
+        game.auto_ai = self.auto_ai
+        game.ai_level = self.ai_level
+        game.seat_token = self.seat_token
+        game.seq = self.seq
+        game.events = list(self.events)
+        game.events_start = self.events_start
+        if self.action_log is not None:
+            game.action_log = dict(self.action_log, actions=list(self.action_log["actions"]))
+        return game
+
+    # ---------------- EVENT LOG ----------------
+    def record(self, moves):
+        for move in moves:
+            self.seq += 1
+            self.events.append({"seq": self.seq, **move})
+        if moves:
+            # The kitten odds these moves leave, so a client can update its
+            # hint without asking for the whole state. redact() keeps the
+            # reader's: spectators the public chance, everyone else the
+            # seated player's (admins get every seat's from get_state()).
+            self.events[-1]["odds"] = {PLAYER: self.odds_view(PLAYER), SPECTATOR: self.odds_view(SPECTATOR)}
+
+    def events_since(self, since):
+        """Events newer than `since`, plus whether the caller missed a restart
+        (in which case the list starts from the new game's start event)."""
+        if since < self.events_start - 1 or since > self.seq:
+            return self.events, True
+        return self.events[since - self.events_start + 1:], False
+
+    def encoded_events(self, since, audience=PLAYER):
+        """events_since() for `audience`, as encoded JSON. Each event is
+        redacted and encoded once per audience, however many subscribers
+        read it."""
+        events, reset = self.events_since(since)
+        wire = self.wire.get(audience)
+        if wire is None:
+            wire = self.wire[audience] = []
+        for event in self.events[len(wire):]:
+            wire.append(dumps(self.redact(event, audience)))
+        return wire[len(wire) - len(events):], reset
+
+    def is_ai(self, name):
+        return any(p.name == name and not p.is_human for p in self.players)
+
+    def player_moves(self, moves):
+        # What a move's response shows: the same PLAYER view /events and
+        # /stream give, so the seated player sees one story whichever they read
+        return [self.redact(move, PLAYER) for move in moves]
+
+    def redact(self, event, audience):
+        """The event as `audience` may see it: a copy without the cards it
+        must not know about, or the event itself when nothing is hidden."""
+        if "odds" in event:
+            event = dict(event, odds=event["odds"][SPECTATOR if audience == SPECTATOR else PLAYER])
+        if audience == ADMIN:
+            return event
+        kind = event.get("type")
+        player = event.get("player")
+        if audience == PLAYER:
+            # The AI seats' own draws and peeks
+            if kind == "ai_draw" or kind == "seefuture_effect" and self.is_ai(player):
+                return {k: v for k, v in event.items() if k not in ("card", "cards")}
+            return event
+        if kind == "start":
+            return dict(event, players=[dict(p, hand=[]) for p in event["players"]])
+        if kind in ("draw", "ai_draw") and "card" in event and event["card"]["name"] != "Exploding Kitten":
+            event = {k: v for k, v in event.items() if k != "card"}
+            event["message"] = f"{player} drew a card."
+        elif kind == "seefuture_effect":
+            event = {k: v for k, v in event.items() if k != "cards"}
+            event["message"] = f"{player} saw the top 3 cards."
+        elif kind == "pending_action":
+            event = dict(event, details=self.redact_pending(event["details"]))
+        elif kind == "favor_resolved":
+            event = {k: v for k, v in event.items() if k != "card_name"}
+            event["message"] = f"{player} stole a card from {event['target']}."
+        return event
+
+    def redact_pending(self, pending, audience=SPECTATOR):
+        # A Favor shows the target's hand to the player picking from it
+        if pending is None or audience != SPECTATOR or "target_hand" not in pending:
+            return pending
+        shown = {k: v for k, v in pending.items() if k != "target_hand"}
+        shown["target_hand_length"] = len(pending["target_hand"])
+        return shown
+
+    # ---------------- AI LOGIC ----------------
+    def process_ai_turns(self):
+        moves = []
+        steps = self.ai_moves()
+        reply = None
+        timer = PhaseTimer() if metrics.ENABLED else None
+        start = perf_counter()
+        while True:
+            try:
+                move = timer.send(steps, reply) if timer else steps.send(reply)
+            except StopIteration:
+                if timer:
+                    timer.add("ai_chain", perf_counter() - start)
+                    timer.observe()
+                return moves
+            reply = None
+            if isinstance(move, AIDecision):
+                if self.replay_picks is not None:
+                    reply = self.replay_picks.popleft()
+                else:
+                    from policy import TABLE # policy and mcts import this module
+                    searched = perf_counter()
+                    reply = TABLE.decide(move.view)
+                    if timer:
+                        timer.add("ai_search", perf_counter() - searched)
+            else:
+                moves.append(move)
+
+    def seat_level(self, seat):
+        level = self.ai_level
+        return level[seat] if isinstance(level, (list, tuple)) else level
+
+    def ai_view(self, seat, known_top=()):
+        # What `seat` can know: its own hand, everyone's hand size, and the
+        # cards it can't see (deck + other hands) as one sorted pool
+        players = self.players
+        unseen = bytearray(self.deck)
+        for i, p in enumerate(players):
+            if i != seat:
+                unseen += p.hand.cards
+        return {
+            "seat": seat,
+            "hand": bytes(players[seat].hand.cards),
+            "hand_sizes": [len(p.hand) for p in players],
+            "alive": [p.is_alive for p in players],
+            "unseen": bytes(sorted(unseen)),
+            "known_top": bytes(known_top),
+            "turns_to_take": self.turns_to_take,
+            "level": self.seat_level(seat),
+            "seed": self.rng.getrandbits(32),
+        }
+
+    def ai_moves(self):
+        # Yields each AI move as it is made, so a caller can publish them one
+        # at a time (push mode) or just collect them (process_ai_turns)
+        rng = self.rng
+        players = self.players
+        deck = self.deck
+        max_iterations = len(players) * 5
+        count = 0
+        # Top cards the current AI saw with See the Future, until the deck changes
+        known_top = ()
+
+        while self.current_player_idx != -1 and players[self.current_player_idx].is_alive and not players[self.current_player_idx].is_human:
+            if count >= max_iterations:
+                AI_STALLS.inc()
+                yield {"type": "error", "message": "AI turn sequence stalled."}
+                break
+            count += 1
+
+            ai = players[self.current_player_idx]
+            is_turn_skipped_by_play = False
+
+            # --- AI Card Playing Phase ---
+            ai_played_card = True
+            while ai_played_card and not is_turn_skipped_by_play:
+                ai_played_card = False
+
+                hand = ai.hand
+
+                # Searched seats decide for themselves
+                if self.seat_level(self.current_player_idx) and any(c in hand for c in AI_PLAYABLE):
+                    played_card = yield AIDecision(self.ai_view(self.current_player_idx, known_top))
+                    self.log_action("m", played_card)
+                    if played_card is not None and played_card not in hand:
+                        played_card = None
+                else:
+                    played_card = scripted_play(hand.__contains__, len(hand), self.kitten_risk(self.current_player_idx), rng)
+
+                if played_card is not None:
+                    ai.hand.remove(played_card)
+                    ai_played_card = True
+
+                    yield {
+                        "type": "ai_play",
+                        "player": ai.name,
+                        "card": self.card_dict(played_card),
+                        "message": f"{ai.name} played {CARD_TYPES[played_card]}"
+                    }
+
+                    # Execute Card Effect
+                    if played_card == ATTACK:
+                        self.add_attack_turns()
+                        is_turn_skipped_by_play = True
+
+                    elif played_card == SKIP:
+                        is_turn_skipped_by_play = True
+
+                    elif played_card == SHUFFLE:
+                        deck.shuffle(rng)
+                        self.odds.shuffled()
+                        known_top = ()
+                        yield {"type": "shuffle_effect", "message": "The Deck was Shuffled!"}
+
+                    elif played_card == SEE_THE_FUTURE:
+                        known_top = tuple(deck.peek(3))
+                        self.odds.saw(self.current_player_idx, [c == EXPLODING_KITTEN for c in known_top])
+                        top_three = [CARD_TYPES[c] for c in known_top]
+                        yield {"type": "seefuture_effect", "player": ai.name, "cards": top_three, "message": f"{ai.name} saw the top 3 cards."}
+
+                    elif played_card == FAVOR:
+                        target_players = [p for p in players if p.name != ai.name and p.is_alive and p.hand]
+                        if target_players:
+                            target = rng.choice(target_players)
+                            stolen_card_idx = rng.randint(0, len(target.hand) - 1)
+                            stolen_card = target.hand.pop(stolen_card_idx)
+                            ai.hand.append(stolen_card)
+                            yield {"type": "favor_effect", "player": ai.name, "target": target.name, "message": f"{ai.name} stole a card from {target.name}."}
+
+
+            # --- Draw Card Phase ---
+            if self.turns_to_take > 0 and ai.is_alive and not is_turn_skipped_by_play:
+
+                if deck:
+                    card = deck.draw()
+                    self.odds.drew(card == EXPLODING_KITTEN)
+                    known_top = ()
+
+                    if card == EXPLODING_KITTEN:
+                        if DEFUSE in ai.hand:
+                            ai.hand.remove(DEFUSE)
+                            depth = rng.randint(0, len(deck))
+                            deck.insert(depth, card)
+                            self.odds.put_back(self.current_player_idx, depth)
+                            DEFUSES.inc("ai")
+                            yield {"type": "ai_defuse", "player": ai.name, "message": f"{ai.name} drew Exploding Kitten but used Defuse!"}
+                        else:
+                            self.eliminate(self.current_player_idx)
+                            EXPLOSIONS.inc("ai")
+                            yield {"type": "ai_explode", "player": ai.name, "dead_player_index": players.index(ai), "message": f"{ai.name} drew Exploding Kitten and exploded! 💀"}
+                    else:
+                        ai.hand.append(card)
+                        yield {"type": "ai_draw", "player": ai.name, "card": {"name": CARD_TYPES[card]}, "message": f"{ai.name} drew a card."}
+                else:
+                    yield {"type": "error", "message": "Deck is empty in AI draw phase."}
+
+                # --- End of Turn ---
+                self.change_turn()
+
+                winner, win_move = self.check_win_condition()
+                if win_move:
+                    yield win_move
+                    if winner or win_move["type"] == "game_broken":
+                        break
+
+        AI_ITERATIONS.inc(n=count)
+        yield {"new_current_player": self.current_player_idx, "turns_to_take": self.turns_to_take}
+
+    # ---------------- HUMAN ACTIONS ----------------
+    # These return the same payloads the Flask routes send back, so the
+    # routes only have to look up the room and serialize the result.
+    def public_player(self, p, audience=PLAYER):
+        shown = p.is_human if audience == PLAYER else audience == ADMIN
+        return {
+            "name":p.name,
+            "is_human":p.is_human,
+            "is_alive":p.is_alive,
+            "hand": [self.card_dict(c) for c in p.hand] if shown else [],
+            "hand_length": len(p.hand),
+        }
+
+    def public_players(self, audience=PLAYER):
+        return [self.public_player(p, audience) for p in self.players]
+
+    def player_json(self, p, audience=PLAYER):
+        # public_player(p, audience), encoded. Kept on the player and only
+        # re-encoded once its hand, its alive flag or the game's pictures change.
+        fragment = p.fragments.get(audience)
+        if fragment is None or fragment[0] != p.hand.cards or fragment[1] != p.is_alive or fragment[2] is not self.images:
+            fragment = p.fragments[audience] = (bytes(p.hand.cards), p.is_alive, self.images, dumps(self.public_player(p, audience)))
+        return fragment[3]
+
+    def players_json(self, audience=PLAYER):
+        return Raw(b"[" + b",".join([self.player_json(p, audience) for p in self.players]) + b"]")
+
+    def get_state(self, audience=PLAYER):
+        # "players" comes pre-encoded; serialize.dumps splices it in
+        return {
+            "players": self.players_json(audience),
+            "current_player": self.current_player_idx,
+            "turns_to_take": self.turns_to_take,
+            "pending_action": self.redact_pending(self.pending_action, audience),
+            "odds": self.odds_view(audience),
+            "seq": self.seq
+        }
+
+    def begin(self):
+        self.log_action("b")
+        players = self.players
+        current_player_idx = self.current_player_idx
+        frontend_players = self.public_players()
+
+        moves = []
+        if not players[current_player_idx].is_human and self.auto_ai:
+            moves.extend(self.process_ai_turns())
+        elif not players[current_player_idx].is_human:
+            moves.append({"new_current_player": current_player_idx, "turns_to_take": self.turns_to_take})
+        else:
+            moves.append({"message": f"{players[current_player_idx].name}'s turn (Draw 1)"})
+            moves.append({"new_current_player": current_player_idx, "turns_to_take": self.turns_to_take})
+
+        final_player_idx = moves[-1].get("new_current_player", current_player_idx)
+
+        # Update hand lengths before sending (same order as players)
+        for p_fe, p_real in zip(frontend_players, players):
+            p_fe['hand_length'] = len(p_real.hand)
+
+        self.record(moves)
+        return {"players":frontend_players,"current_player":final_player_idx, "moves": self.player_moves(moves), "seq": self.seq}
+
+    def draw_card(self):
+        self.log_action("d")
+        players = self.players
+        deck = self.deck
+        current_player_idx = self.current_player_idx
+
+        if not self.game_started or players[current_player_idx].is_human == False or players[current_player_idx].is_alive == False:
+            return {"error":"It's not your turn or game not started"}
+
+        player = players[current_player_idx]
+        moves = []
+        start = perf_counter()
+
+        if not deck:
+            moves.append({"message": "Deck is empty! Game should have ended already."})
+        else:
+            card = deck.draw()
+            self.odds.drew(card == EXPLODING_KITTEN)
+
+            if card == EXPLODING_KITTEN:
+                if DEFUSE in player.hand:
+                    player.hand.remove(DEFUSE)
+
+                    # Player must choose where to put the kitten (for now, random).
+                    # They are never told the depth, so it is unseen for them too.
+                    depth = self.rng.randint(0, len(deck))
+                    deck.insert(depth, card)
+                    self.odds.put_back(None, depth)
+                    DEFUSES.inc("human")
+                    moves.append({
+                        "type":"draw",
+                        "player": player.name,
+                        "card": self.card_dict(card),
+                        "message":f"{player.name} drew Exploding Kitten but used Defuse!"
+                    })
+                else:
+                    self.eliminate(current_player_idx)
+                    EXPLOSIONS.inc("human")
+                    moves.append({
+                        "type":"draw",
+                        "player": player.name,
+                        "dead_player_index": current_player_idx,
+                        "message":f"{player.name} drew Exploding Kitten and exploded! 💀"
+                    })
+            else:
+                player.hand.append(card)
+                moves.append({
+                    "type":"draw",
+                    "player": player.name,
+                    "card": self.card_dict(card),
+                    "message":f"{player.name} drew {CARD_TYPES[card]}. Turns left: {self.turns_to_take}"
+                })
+
+        # 1. Move to next player after drawing (or exploding)
+        self.change_turn()
+        if metrics.ENABLED:
+            PHASE_SECONDS.observe(perf_counter() - start, "draw")
+
+        # 2. Check for winner
+        winner, win_move = self.check_win_condition()
+        if win_move:
+            moves.append(win_move)
+            winner_found = winner or win_move["type"] == "game_broken"
+        else:
+            winner_found = False
+
+        # 3. Process AI moves only if no winner was found yet
+        if not winner_found and self.auto_ai:
+            ai_moves = self.process_ai_turns()
+            moves.extend(ai_moves)
+        elif not winner_found:
+            moves.append({"new_current_player": self.current_player_idx, "turns_to_take": self.turns_to_take})
+
+        final_player_idx = moves[-1].get("new_current_player", self.current_player_idx)
+        human_player_hand = [self.card_dict(c) for c in player.hand] if player.is_alive else []
+
+        self.record(moves)
+        return {"moves":self.player_moves(moves),"current_player":final_player_idx, "human_hand": human_player_hand, "seq": self.seq}
+
+    def play_card(self, idx, target_name=None):
+        self.log_action("p", idx, target_name)
+        players = self.players
+        deck = self.deck
+
+        if not self.game_started:
+            return {"error":"Invalid card index or player state"}
+
+        player = players[self.current_player_idx]
+
+        if idx is None or not isinstance(idx, int) or idx < 0 or idx >= len(player.hand) or not player.is_human or not player.is_alive:
+            return {"error":"Invalid card index or player state"}
+
+        card = player.hand.pop(idx)
+
+        human_play_move = {
+            "type": "play",
+            "card": self.card_dict(card),
+            "player": player.name,
+            "message": f"{player.name} played {CARD_TYPES[card]}"
+        }
+
+        moves = [human_play_move]
+        turn_ends = False
+
+        # --- Favor Card Logic Modification ---
+        if card == FAVOR:
+            target = next((p for p in players if p.name == target_name and p.is_alive and p.hand), None)
+
+            if not target:
+                moves.append({"message": f"Favor failed: {target_name} is not a valid target or has no cards."})
+                turn_ends = False
+            else:
+                target_hand_data = [self.card_dict(c) for c in target.hand]
+
+                # HALT the game and enter PENDING_ACTION state
+                self.pending_action = {
+                    "type": "favor_select",
+                    "player_making_favor": player.name,
+                    "target_name": target.name,
+                    "target_hand": target_hand_data,
+                }
+
+                moves.append({"type": "pending_action", "details": self.pending_action})
+
+                # Return immediately, waiting for resolve_favor
+                self.record(moves)
+                return {
+                    "moves": self.player_moves(moves),
+                    "current_player": self.current_player_idx,
+                    "turns_to_take": self.turns_to_take,
+                    "human_hand": [self.card_dict(c) for c in player.hand],
+                    "pending_action": self.pending_action,
+                    "seq": self.seq
+                }
+
+        # --- Other Card Logic ---
+        elif card == SKIP:
+            self.change_turn()
+            turn_ends = True
+
+        elif card == ATTACK:
+            self.add_attack_turns()
+            self.change_turn()
+            turn_ends = True
+
+        elif card == SHUFFLE:
+            deck.shuffle(self.rng)
+            self.odds.shuffled()
+            moves.append({"type": "shuffle_effect", "message": "The Deck was Shuffled!"})
+            turn_ends = False
+
+        elif card == SEE_THE_FUTURE:
+            seen = deck.peek(3)
+            self.odds.saw(self.current_player_idx, [c == EXPLODING_KITTEN for c in seen])
+            top_three = [CARD_TYPES[c] for c in seen]
+            moves.append({"type": "seefuture_effect", "player": player.name, "cards": top_three, "message": f"You saw the top 3 cards: {', '.join(top_three)}."})
+            turn_ends = False
+
+        elif card == DEFUSE or card == EXPLODING_KITTEN:
+            player.hand.append(card)
+            return {"error": f"Cannot play {CARD_TYPES[card]} in this phase."}
+
+        # Process AI moves if the turn ended (Skip or Attack)
+        if turn_ends:
+            winner, win_move = self.check_win_condition()
+            if win_move:
+                moves.append(win_move)
+                winner_found = winner or win_move["type"] == "game_broken"
+            else:
+                winner_found = False
+
+            if not winner_found and self.auto_ai:
+                ai_moves = self.process_ai_turns()
+                moves.extend(ai_moves)
+            elif not winner_found:
+                moves.append({"new_current_player": self.current_player_idx, "turns_to_take": self.turns_to_take})
+
+        # Return the final state
+        final_player_idx = moves[-1].get("new_current_player", self.current_player_idx)
+        final_turns_to_take = moves[-1].get("turns_to_take", self.turns_to_take)
+        human_player_hand = [self.card_dict(c) for c in player.hand]
+
+        self.record(moves)
+        return {
+            "moves": self.player_moves(moves),
+            "current_player": final_player_idx,
+            "turns_to_take": final_turns_to_take,
+            "human_hand": human_player_hand,
+            "pending_action": self.pending_action,
+            "seq": self.seq
+        }
+
+    def resolve_favor(self, selected_card_name):
+        self.log_action("f", selected_card_name)
+        players = self.players
+        pending_action = self.pending_action
+
+        if not pending_action or pending_action.get('type') != 'favor_select':
+            return {"error": "No Favor action is pending."}
+
+        player_making_favor = next((p for p in players if p.name == pending_action['player_making_favor']), None)
+        target_player = next((p for p in players if p.name == pending_action['target_name']), None)
+
+        if not player_making_favor or not target_player:
+            self.pending_action = None
+            return {"error": "Invalid player state for Favor resolution."}
+
+        moves = []
+        stolen_card = None
+
+        # 1. Find and steal the selected card from the target player's hand
+        code = CARD_CODES.get(selected_card_name)
+        if code is not None and code in target_player.hand:
+            target_player.hand.remove(code)
+            player_making_favor.hand.append(code)
+            stolen_card = code
+
+        self.pending_action = None # Clear the pending state
+
+        if stolen_card is not None:
+            moves.append({
+                "type": "favor_resolved",
+                "player": player_making_favor.name,
+                "target": target_player.name,
+                "card_name": CARD_TYPES[stolen_card],
+                "message": f"{player_making_favor.name} successfully stole {CARD_TYPES[stolen_card]} from {target_player.name}."
+            })
+        else:
+            moves.append({"type": "error", "message": "Failed to find selected card in target's hand."})
+
+        # Favor does not end the turn; player must still draw. No turn change or AI processing needed here.
+        final_player_idx = self.current_player_idx
+        final_turns_to_take = self.turns_to_take
+
+        human_player_hand = [self.card_dict(c) for c in player_making_favor.hand]
+
+        self.record(moves)
+        return {
+            "moves": self.player_moves(moves),
+            "current_player": final_player_idx,
+            "turns_to_take": final_turns_to_take,
+            "human_hand": human_player_hand,
+            "pending_action": self.pending_action,
+            "seq": self.seq
+        }
+
+    # ---------------- TIMEOUTS ----------------
+    def time_out(self):
+        """The person to move ran out of time: pick their pending Favor card
+        at random, otherwise draw for them."""
+        player = self.players[self.current_player_idx]
+        self.record([{"type": "timeout", "player": player.name, "message": f"{player.name} ran out of time."}])
+        pending = self.pending_action
+        if pending and pending.get("type") == "favor_select":
+            TIMEOUTS.inc("favor")
+            # Logged by name like any other pick, so it doesn't come from self.rng
+            return self.resolve_favor(random.choice(pending["target_hand"])["name"])
+        TIMEOUTS.inc("turn")
+        return self.draw_card()
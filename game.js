@@ -1,15 +1,29 @@
 const startBtn = document.getElementById('start-btn');
 const playerNamesInput = document.getElementById('player-names');
+const difficultySelect = document.getElementById('difficulty');
 const playersArea = document.getElementById('players-area');
 const gameArea = document.getElementById('game-area');
 const deckDiv = document.getElementById('deck');
 const messages = document.getElementById('messages');
 const discardPile = document.getElementById('discard-pile'); 
+const riskHint = document.getElementById('risk');
 
 let players = [];
 let currentPlayer = 0; // The index of the player whose turn it is
-
-const AI_MOVE_DELAY = 1200; // 1.2 seconds per AI move
+let roomId = null; // The server-side room this table lives in
+let lastSeq = 0; // Sequence number of the newest event the server has told us about
+let shownSeq = 0; // Sequence number of the last streamed event we have shown
+let eventSource = null;
+let moveQueue = Promise.resolve(); // Streamed moves are animated one after another
+
+// The server paces AI moves now, this only lets each animation play out
+const MOVE_DELAY = 300;
+
+// Built image variants (see build_assets.py); fall back to the original JPEGs
+const SUPPORTS_WEBP = document.createElement('canvas').toDataURL('image/webp').startsWith('data:image/webp');
+if (typeof CARD_BACK !== 'undefined' && CARD_BACK) {
+    document.documentElement.style.setProperty('--card-back', `url("${assetUrl(CARD_BACK.thumb)}")`);
+}
 
 // --- EVENT LISTENERS ---
 
@@ -21,25 +35,23 @@ startBtn.addEventListener('click', async () => {
     const setupArea = document.getElementById('setup-area');
     setupArea.classList.add('hidden'); 
 
-    const res = await fetch("/start_game", {
+    const res = await fetch(roomUrl("/start_game"), {
         method: "POST",
         headers: {'Content-Type':'application/json'},
-        body: JSON.stringify({players: name})
+        body: JSON.stringify({players: name, push: true, difficulty: difficultySelect ? difficultySelect.value : ""})
     });
     const data = await res.json();
     if(data.error){ alert(data.error); return; }
 
+    roomId = data.room;
     players = data.players;
     currentPlayer = data.current_player;
+    lastSeq = shownSeq = data.seq;
     renderPlayers();
     gameArea.classList.remove('hidden');
 
-    // If the AI starts, process its moves immediately
-    if (data.moves && data.moves.length > 0) {
-        currentPlayer = data.current_player; 
-        await processMoves(data.moves); 
-        renderPlayers(); 
-    }
+    // Everything from here on (including the AI's turns) arrives on the stream
+    openStream();
 });
 
 // Draw card
@@ -51,8 +63,7 @@ deckDiv.addEventListener('click', async ()=>{
     // Visually disable the deck temporarily
     deckDiv.classList.remove('clickable');
     
-    const res = await fetch("/draw_card",{method:"POST"});
-    const data = await res.json();
+    const data = await postAction("/draw_card");
 
     if(!data.moves) {
         // Re-enable if the server failed
@@ -60,14 +71,7 @@ deckDiv.addEventListener('click', async ()=>{
         return; 
     }
 
-    // Update global state BEFORE processing moves
-    currentPlayer = data.current_player;
-    
-    // Process the sequence of moves (Human draw + any AI turns)
-    await processMoves(data.moves);
-    
-    // Final render to show the correct player's turn light
-    renderPlayers();
+    // The draw and any AI turns after it are shown as they arrive on the stream
 });
 
 // --- CORE GAME LOGIC ---
@@ -84,34 +88,107 @@ async function playCard(idx){
     player.hand.splice(idx, 1);
     renderPlayers(); // Rerender to show card removed from hand
     
-    const res = await fetch("/play_card",{
-        method:"POST",
-        headers:{'Content-Type':'application/json'},
-        body: JSON.stringify({card_index: idx})
-    });
-    const data = await res.json();
+    const data = await postAction("/play_card", {card_index: idx});
 
     if(!data.moves) {
         deckDiv.classList.add('clickable');
         return; 
     }
-    
-    // Update global state
-    currentPlayer = data.current_player;
 
-    // Process the sequence of moves (Human play + any AI turns)
-    await processMoves(data.moves);
-    
-    // Final render
+    // The play and any AI turns after it are shown as they arrive on the stream
+}
+
+// Moves carry an idempotency key and the last event we had seen. A retry
+// after a network error reuses the key, so the server answers it from its
+// cache instead of moving twice; a move made against a table that has
+// changed since is refused, and we reopen the stream from the last move we
+// showed so the ones we missed still play out.
+let actionCounter = 0;
+
+async function postAction(path, body = {}){
+    const key = `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}-${actionCounter++}`;
+    const init = {
+        method: "POST",
+        headers: {'Content-Type': 'application/json', 'Idempotency-Key': key},
+        body: JSON.stringify({...body, expected_seq: lastSeq})
+    };
+    for (let attempt = 0; ; attempt++) {
+        try {
+            const data = await (await fetch(roomUrl(path), init)).json();
+            if (typeof data.seq === 'number') lastSeq = Math.max(lastSeq, data.seq);
+            if (data.stale) openStream();
+            return data;
+        } catch (err) {
+            if (attempt >= 2) throw err;
+            await new Promise(r => setTimeout(r, 500 * (attempt + 1)));
+        }
+    }
+}
+
+// Replace our copy of the table with the server's, for when the moves we
+// missed are no longer there to replay
+async function resync(){
+    const state = await (await fetch(roomUrl("/get_game_state"))).json();
+    if (state.error) return;
+    players = state.players;
+    currentPlayer = state.current_player;
+    lastSeq = Math.max(lastSeq, state.seq);
+    shownSeq = Math.max(shownSeq, state.seq);
     renderPlayers();
+    showRisk(state.odds);
+}
+
+// The server's chance that our next draw is an Exploding Kitten, counting
+// what only we have seen (See the Future, where our Defuse went). It is
+// exact unless the server had to fall back to an estimate (odds.exact).
+function showRisk(odds){
+    riskHint.innerText = odds && odds.deck
+        ? `Kitten risk: ${odds.exact === false ? '~' : ''}${Math.round(odds.risk * 100)}% (${odds.kittens} in ${odds.deck} cards)`
+        : '';
+}
+
+// Listen for every move at this table (ours, the AI's, other players'),
+// starting after the last one we showed. Reopening it replays whatever was
+// missed; a move that arrives twice is only shown once.
+function openStream(){
+    if (eventSource) eventSource.close();
+    eventSource = new EventSource(`${roomUrl("/stream")}&since=${shownSeq}`);
+    eventSource.onmessage = (e) => {
+        const move = JSON.parse(e.data);
+        lastSeq = Math.max(lastSeq, move.seq);
+        moveQueue = moveQueue
+            .then(() => showMove(move))
+            .catch(err => console.error(err));
+    };
+    // The server no longer has the moves we asked for: reload the table
+    eventSource.addEventListener('reset', () => {
+        moveQueue = moveQueue.then(resync).catch(err => console.error(err));
+    });
+}
+
+async function showMove(move){
+    if (move.seq <= shownSeq) return;
+    shownSeq = move.seq;
+    await processMoves([move]);
+    renderPlayers();
+    // The last move of each action carries the odds it left us with
+    if (move.odds) showRisk(move.odds);
 }
 
 
 // Process moves sequentially with delay
 async function processMoves(moves){
     for(const move of moves){
+        // A (re)started game replaces the whole table
+        if (move.type === "start") {
+            players = move.players;
+            currentPlayer = move.current_player;
+            renderPlayers();
+            continue;
+        }
+
         const playerIdx = players.findIndex(p => p.name === move.player);
-        const isAI = playerIdx !== undefined && !players[playerIdx].is_human;
+        const isAI = playerIdx !== -1 && !players[playerIdx].is_human;
 
         // 1. Message update
         if(move.message) messages.innerText = move.message;
@@ -143,12 +220,12 @@ async function processMoves(moves){
                 const cardToRemove = backCards[backCards.length - 1]; 
 
                 if (cardToRemove) {
-                    playCardAnimation(cardToRemove, move.card.image);
+                    playCardAnimation(cardToRemove, cardImageUrl(move.card, 'full'));
                 }
             }
 
             // State Update
-            updateDiscardPile(move.card.image);
+            updateDiscardPile(move.card);
             messages.innerText = `${move.player} played ${move.card.name}`;
             
             // If the player is AI, decrement its hand length locally
@@ -166,8 +243,8 @@ async function processMoves(moves){
         }
 
         // 4. Delay only for AI moves for better visualization
-        if (playerIdx !== undefined && !players[playerIdx].is_human) {
-            await new Promise(r => setTimeout(r, AI_MOVE_DELAY));
+        if (isAI) {
+            await new Promise(r => setTimeout(r, MOVE_DELAY));
         } else {
              // Small delay for human actions to allow animation to start
              await new Promise(r => setTimeout(r, 100)); 
@@ -180,13 +257,29 @@ async function processMoves(moves){
 
 // --- HELPER FUNCTIONS ---
 
+// Adds the room id so several tabs can each play their own table
+function roomUrl(path) {
+    return roomId ? `${path}?room=${encodeURIComponent(roomId)}` : path;
+}
+
+// Picks the WebP or JPEG url out of one {webp, jpg} variant
+function assetUrl(variant) {
+    return SUPPORTS_WEBP ? variant.webp : variant.jpg;
+}
+
+// Image url for a card at "thumb" or "full" size, or the original if not built
+function cardImageUrl(card, size) {
+    if (card[size]) return assetUrl(card[size]);
+    return card.image.startsWith('/') ? card.image : `/static/${card.image}`;
+}
+
 // Helper function to update the discard pile image
-function updateDiscardPile(cardImage) {
+function updateDiscardPile(card) {
     if (!discardPile) return;
     
     discardPile.innerHTML = '';
     const img = document.createElement('img');
-    img.src = cardImage.startsWith('/') ? cardImage : `/static/${cardImage}`; 
+    img.src = cardImageUrl(card, 'full');
     discardPile.appendChild(img);
 }
 
@@ -229,7 +322,7 @@ function renderPlayers(){
 
             p.hand.forEach((c, i) => {
                 const img = document.createElement('img');
-                img.src = `/static/${c.image}`;
+                img.src = cardImageUrl(c, 'thumb');
                 img.title = c.name;
                 
                 // Only allow playing cards if it's the human's turn AND they are alive
@@ -267,8 +360,8 @@ function flyCardAnimation(targetPlayerIdx){
 
     const flyingCard = document.createElement('div'); 
     flyingCard.classList.add('fly'); 
-    // Uses backphoto.jpg for the card back image
-    flyingCard.style.backgroundImage = `url("/static/images/backphoto.jpg")`;
+    // Uses the card back image (style.css falls back to backphoto.jpg)
+    flyingCard.style.backgroundImage = 'var(--card-back, url("/static/images/backphoto.jpg"))';
     document.body.appendChild(flyingCard);
 
     const deckRect = deckDiv.getBoundingClientRect(); 
@@ -301,7 +394,7 @@ function playCardAnimation(sourceElement, finalCardImage) {
     // 1. Create the flying element
     const playingCard = document.createElement('div');
     playingCard.classList.add('fly');
-    playingCard.style.backgroundImage = `url("/static/images/backphoto.jpg")`; 
+    playingCard.style.backgroundImage = 'var(--card-back, url("/static/images/backphoto.jpg"))'; 
     
     // 2. Set initial position (at the AI card position)
     playingCard.style.left = sourceRect.left + 'px';
@@ -327,7 +420,7 @@ function playCardAnimation(sourceElement, finalCardImage) {
 
         // 6. Flip the card mid-flight 
         setTimeout(() => {
-            playingCard.style.backgroundImage = `url("/static/${finalCardImage}")`;
+            playingCard.style.backgroundImage = `url("${finalCardImage}")`;
             playingCard.style.transform = 'rotate(360deg) scale(1.1) rotateY(180deg)'; 
         }, 350); 
         
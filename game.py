@@ -1,9 +1,25 @@
+import random
+
 from player import Player
 from deck import Deck
 from cards import Defuse, ExplodingKitten, Attack, Skip, Favor
 
+# Cards are never modified, so every game shares the same instances and
+# the deck for each table size is built once
+DEFUSE = Defuse()
+BASIC_CARDS = (Attack(), Skip(), Favor()) * 3
+DECK_TEMPLATES = {}
+
+def deck_template(players):
+    # Top first, in the order setup_deck used to add them
+    template = DECK_TEMPLATES.get(players)
+    if template is None:
+        template = DECK_TEMPLATES[players] = BASIC_CARDS + (ExplodingKitten(),) * (players - 1) + (DEFUSE,) * players
+    return template
+
 class Game:
-    def __init__(self):
+    def __init__(self, rng=None):
+        self.rng = rng or random.Random()
         self.players = []
         self.deck = Deck()
         self.discard = Deck()
@@ -15,22 +31,13 @@ class Game:
             self.players.append(Player(name))
 
     def setup_deck(self):
-        # Basic cards
-        for _ in range(3):
-            self.deck.add_card(Attack())
-            self.deck.add_card(Skip())
-            self.deck.add_card(Favor())
-        # Exploding Kittens
-        for _ in range(len(self.players)-1):
-            self.deck.add_card(ExplodingKitten())
-        # Defuse cards
-        for _ in range(len(self.players)):
-            self.deck.add_card(Defuse())
-        self.deck.shuffle()
+        # Basic cards, N-1 Exploding Kittens and N Defuses in one copy
+        self.deck.extend(deck_template(len(self.players)))
+        self.deck.shuffle(self.rng)
 
     def deal_cards(self):
         for p in self.players:
-            p.hand.append(Defuse())  # Each player gets one Defuse
+            p.hand.append(DEFUSE)  # Each player gets one Defuse
             for _ in range(3):
                 card = self.deck.draw()
                 if card:
@@ -51,7 +58,7 @@ class Game:
                     player.hand.remove(has_defuse)
                     self.discard.add_card(has_defuse)
                     self.deck.add_card(card)
-                    self.deck.shuffle()
+                    self.deck.shuffle(self.rng)
                     self.messages.append(f"{player.name} used Defuse to avoid explosion!")
                 else:
                     player.is_alive = False
@@ -1,5 +1,8 @@
 import random
 
+from deck import Deck
+from seats import SeatRing
+
 # ----- Cards -----
 class Card:
     def __init__(self, name, img):
@@ -26,6 +29,22 @@ class Favor(Card):
     def __init__(self, img):
         super().__init__("Favor", img)
 
+# ----- Deck templates -----
+# Cards are never modified, so games share them: one deck per table size
+# (the pictures depend on it) and a Defuse for every picture a dealt one
+# may show
+IMAGES = 45
+DEALT_DEFUSES = tuple(Defuse(f"card{i}.jpg") for i in range(1, IMAGES + 1))
+DECK_TEMPLATES = {}
+
+def deck_template(players):
+    # card1.jpg .. in the order setup_deck used to add them, top first
+    template = DECK_TEMPLATES.get(players)
+    if template is None:
+        kinds = [Attack, Skip, Favor] * 3 + [ExplodingKitten] * (players - 1) + [Defuse] * players
+        template = DECK_TEMPLATES[players] = tuple(kind(f"card{i}.jpg") for i, kind in enumerate(kinds, 1))
+    return template
+
 # ----- Player -----
 class Player:
     def __init__(self, name):
@@ -33,23 +52,13 @@ class Player:
         self.hand = []
         self.is_alive = True
 
-# ----- Deck -----
-class Deck:
-    def __init__(self):
-        self.cards = []
-
-    def shuffle(self):
-        random.shuffle(self.cards)
-
-    def draw(self):
-        if self.cards:
-            return self.cards.pop(0)
-        return None
-
 # ----- Game -----
 class Game:
-    def __init__(self, player_names):
+    def __init__(self, player_names, rng=None):
+        self.rng = rng or random.Random()
         self.players = [Player(n) for n in player_names]
+        # Turn order over the seats still in (see seats.py)
+        self.seats = SeatRing(p.is_alive for p in self.players)
         self.active_index = 0
         self.messages = []
         self.deck = Deck()
@@ -59,22 +68,14 @@ class Game:
         self.add_message("Game started!")
 
     def setup_deck(self):
-        # Add images for each card (card1.jpg .. card45.jpg)
-        img_index = 1
-        for _ in range(3):
-            self.deck.cards.append(Attack(f"card{img_index}.jpg")); img_index+=1
-            self.deck.cards.append(Skip(f"card{img_index}.jpg")); img_index+=1
-            self.deck.cards.append(Favor(f"card{img_index}.jpg")); img_index+=1
-        for _ in range(len(self.players)-1):
-            self.deck.cards.append(ExplodingKitten(f"card{img_index}.jpg")); img_index+=1
-        for _ in range(len(self.players)):
-            self.deck.cards.append(Defuse(f"card{img_index}.jpg")); img_index+=1
-        self.deck.shuffle()
+        # Each card has its own image (card1.jpg, card2.jpg, ...)
+        self.deck.extend(deck_template(len(self.players)))
+        self.deck.shuffle(self.rng)
 
     def deal_cards(self):
         for p in self.players:
             # 1 Defuse
-            p.hand.append(Defuse(f"card{random.randint(1,45)}.jpg"))
+            p.hand.append(DEALT_DEFUSES[self.rng.randint(1, IMAGES) - 1])
             for _ in range(3):
                 card = self.deck.draw()
                 if card:
@@ -92,12 +93,12 @@ class Game:
         self.add_message(f"{player.name} draws {card.name}")
         player.hand.append(card)
 
+    def eliminate(self, index):
+        self.players[index].is_alive = False
+        self.seats.remove(index)
+
     def next_player(self):
-        alive = [p for p in self.players if p.is_alive]
-        if len(alive) <= 1:
+        if self.seats.count <= 1:
             return None
-        while True:
-            self.active_index = (self.active_index + 1) % len(self.players)
-            if self.players[self.active_index].is_alive:
-                break
+        self.active_index = self.seats.next(self.active_index)
         return self.players[self.active_index]
@@ -0,0 +1,84 @@
+# hand.py
+# A player's hand of integer card codes. The ordered cards (what the UI
+# shows and card_index points into) sit in a bytearray, and a count per
+# card type sits next to them so "has a Defuse?" / "how many Attacks?"
+# never scan the hand.
+
+class Hand:
+    __slots__ = ("cards", "counts", "journal")
+
+    def __init__(self, cards=(), types=8):
+        self.cards = bytearray(cards)
+        self.counts = [0] * types
+        for card in self.cards:
+            self.counts[card] += 1
+        # A journal.Journal while a search may roll this hand back
+        self.journal = None
+
+    def __len__(self):
+        return len(self.cards)
+
+    def __iter__(self):
+        return iter(self.cards)
+
+    def __getitem__(self, idx):
+        return self.cards[idx]
+
+    def __contains__(self, card):
+        return self.counts[card] > 0
+
+    def __repr__(self):
+        return f"Hand({list(self.cards)!r})"
+
+    def count(self, card):
+        return self.counts[card]
+
+    def append(self, card):
+        self.cards.append(card)
+        self.counts[card] += 1
+        if self.journal is not None:
+            self.journal.entries.append((self._take, (len(self.cards) - 1,)))
+
+    def extend(self, cards):
+        for card in cards:
+            self.append(card)
+
+    def pop(self, idx=-1):
+        if self.journal is not None and idx < 0:
+            idx += len(self.cards)
+        card = self.cards.pop(idx)
+        self.counts[card] -= 1
+        if self.journal is not None:
+            self.journal.entries.append((self._put, (idx, card)))
+        return card
+
+    def remove(self, card):
+        """Drop the first card of this type. The count check is O(1); the
+        byte shuffle that follows is a single memmove over the hand."""
+        if not self.counts[card]:
+            raise ValueError(f"card {card} not in hand")
+        idx = self.cards.index(card)
+        del self.cards[idx]
+        self.counts[card] -= 1
+        if self.journal is not None:
+            self.journal.entries.append((self._put, (idx, card)))
+
+    def clear(self):
+        if self.journal is not None:
+            self.journal.entries.append((self._restore, (self.cards, self.counts)))
+        self.cards = bytearray()
+        self.counts = [0] * len(self.counts)
+
+    # ---------------- UNDO ----------------
+    # Used by the journal only, so they don't journal themselves
+    def _take(self, idx):
+        card = self.cards.pop(idx)
+        self.counts[card] -= 1
+
+    def _put(self, idx, card):
+        self.cards.insert(idx, card)
+        self.counts[card] += 1
+
+    def _restore(self, cards, counts):
+        self.cards = cards
+        self.counts = counts
@@ -0,0 +1,25 @@
+# journal.py
+# Undo log for lookahead. While a Hand or Deck has a journal attached,
+# every change it makes appends the operation that reverses it, so a
+# search can apply a move, look at the result and roll back for the cost
+# of the cards that actually moved (see Game.checkpoint / Game.rollback).
+
+class Journal:
+    __slots__ = ("entries",)
+
+    def __init__(self):
+        # (undo function, args) pairs, oldest first
+        self.entries = []
+
+    def __len__(self):
+        return len(self.entries)
+
+    def mark(self):
+        return len(self.entries)
+
+    def undo(self, mark=0):
+        """Reverse every change made since `mark`, newest first."""
+        entries = self.entries
+        while len(entries) > mark:
+            undo, args = entries.pop()
+            undo(*args)
@@ -0,0 +1,265 @@
+# mcts.py
+# Search-based AI seats: single-observer information-set Monte Carlo tree
+# search. Every iteration deals the cards the seat cannot see into one
+# possible world (its own hand, hand sizes, deck size and anything it saw
+# with See the Future stay fixed), walks a tree of the seat's own
+# decisions, then plays the game out with the scripted AI from engine.py
+# for everybody. The card it picks is the most visited one at the root.
+#
+# choose() only takes plain data (Game.ai_view) so app.py can run it in a
+# process pool. The rules mirror ai_moves(): an AI's turn is any number of
+# plays followed by one draw.
+
+import math
+import random
+import time
+
+from engine import AI_PLAYABLE, ATTACK, CARD_TYPES, DEFUSE, EXPLODING_KITTEN, FAVOR, SEE_THE_FUTURE, SHUFFLE, scripted_play
+
+DRAW = -1
+# Rollouts per decision for each difficulty
+LEVELS = {"easy": 200, "medium": 1000, "hard": 5000}
+TIME_BUDGET = 1.0 # seconds; a decision stops at whichever budget runs out first
+EXPLORATION = 0.7
+MAX_STEPS = 2000 # plays + draws before a rollout gives up and counts as a loss
+
+
+# ---------------- SIMULATED GAME ----------------
+class Sim:
+    # A bare copy of the rules: hands are counts per card type, the deck is
+    # a list with the top card last
+    __slots__ = ("hands", "sizes", "alive", "alive_count", "deck", "kittens", "known", "cur", "turns", "rng")
+
+    def __init__(self, hands, alive, deck, cur, turns, rng, known=None):
+        self.hands = hands
+        self.sizes = [sum(h) for h in hands]
+        self.alive = alive
+        self.alive_count = sum(alive)
+        self.deck = deck
+        self.kittens = deck.count(EXPLODING_KITTEN)
+        # How many cards off the top each seat has seen, for its kitten risk
+        self.known = known or [0] * len(hands)
+        self.cur = cur
+        self.turns = turns
+        self.rng = rng
+
+    def actions(self, seat):
+        hand = self.hands[seat]
+        return [card for card in AI_PLAYABLE if hand[card]] + [DRAW]
+
+    def risk(self, seat):
+        # What Game.kitten_risk would say: certain for a seat that has seen
+        # the top card, the share of kittens in the deck for anyone else
+        deck = self.deck
+        if not deck:
+            return 0.0
+        if self.known[seat]:
+            return float(deck[-1] == EXPLODING_KITTEN)
+        return self.kittens / len(deck)
+
+    def scripted(self, seat):
+        card = scripted_play(self.hands[seat].__getitem__, self.sizes[seat], self.risk(seat), self.rng)
+        return DRAW if card is None else card
+
+    def play(self, seat, card):
+        self.hands[seat][card] -= 1
+        self.sizes[seat] -= 1
+        # Skip changes nothing here: an AI that skips still has to draw
+        # before its turn ends, same as in ai_moves
+        if card == ATTACK:
+            self.turns += 2
+        elif card == SEE_THE_FUTURE:
+            self.known[seat] = max(self.known[seat], min(3, len(self.deck)))
+        elif card == SHUFFLE:
+            self.rng.shuffle(self.deck)
+            self.known = [0] * len(self.known)
+        elif card == FAVOR:
+            sizes = self.sizes
+            targets = [p for p in range(len(sizes)) if p != seat and self.alive[p] and sizes[p]]
+            if targets:
+                target = self.rng.choice(targets)
+                pick = self.rng.randrange(sizes[target])
+                hand = self.hands[target]
+                for stolen, n in enumerate(hand):
+                    if pick < n:
+                        break
+                    pick -= n
+                hand[stolen] -= 1
+                sizes[target] -= 1
+                self.hands[seat][stolen] += 1
+                sizes[seat] += 1
+
+    def draw(self, seat):
+        """Draw, then pass the turn on. Returns the winner or None."""
+        deck = self.deck
+        if deck:
+            card = deck.pop()
+            self.known = [k - 1 if k else 0 for k in self.known]
+            if card == EXPLODING_KITTEN:
+                if self.hands[seat][DEFUSE]:
+                    self.hands[seat][DEFUSE] -= 1
+                    self.sizes[seat] -= 1
+                    depth = self.rng.randint(0, len(deck))
+                    deck.insert(len(deck) - depth, card)
+                    # Only the defuser knows where it went
+                    known = self.known[seat]
+                    self.known = [0] * len(self.known)
+                    self.known[seat] = known + 1 if depth <= known else known
+                else:
+                    self.kittens -= 1
+                    self.alive[seat] = False
+                    self.alive_count -= 1
+                    self.turns = 1
+            else:
+                self.hands[seat][card] += 1
+                self.sizes[seat] += 1
+
+        self.turns = max(0, self.turns - 1)
+        if self.turns == 0:
+            alive = self.alive
+            nxt = seat
+            for _ in range(len(alive)):
+                nxt = (nxt + 1) % len(alive)
+                if alive[nxt]:
+                    break
+            self.cur = nxt
+            self.turns = 1
+        if self.alive_count == 1:
+            return self.alive.index(True)
+        return None
+
+
+def determinize(view, rng):
+    """One deal of the unseen cards that fits everything the seat knows."""
+    seat = view["seat"]
+    sizes = view["hand_sizes"]
+    known = list(view["known_top"]) # top first
+
+    pool = list(view["unseen"])
+    for card in known:
+        pool.remove(card)
+    # Kittens never sit in a hand, so only the rest gets dealt out
+    kittens = [c for c in pool if c == EXPLODING_KITTEN]
+    others = [c for c in pool if c != EXPLODING_KITTEN]
+    rng.shuffle(others)
+
+    hands = []
+    pos = 0
+    for p, size in enumerate(sizes):
+        counts = [0] * len(CARD_TYPES)
+        if p == seat:
+            for card in view["hand"]:
+                counts[card] += 1
+        else:
+            for card in others[pos:pos + size]:
+                counts[card] += 1
+            pos += size
+        hands.append(counts)
+
+    rest = others[pos:] + kittens
+    rng.shuffle(rest)
+    deck = rest + known[::-1]
+    seen = [0] * len(sizes)
+    seen[seat] = len(known)
+    return Sim(hands, list(view["alive"]), deck, seat, view["turns_to_take"], rng, seen)
+
+
+# ---------------- SEARCH ----------------
+class Node:
+    __slots__ = ("children", "visits", "wins", "avail")
+
+    def __init__(self):
+        self.children = {}
+        self.visits = 0
+        self.wins = 0.0
+        # Times this action was legal when its parent was visited (ISMCTS)
+        self.avail = 1
+
+
+def select(node, actions):
+    # UCB1 over the actions legal in this deal, using availability counts
+    best, best_score = None, -1.0
+    for action in actions:
+        child = node.children[action]
+        child.avail += 1
+        score = child.wins / child.visits + EXPLORATION * math.sqrt(math.log(child.avail) / child.visits)
+        if score > best_score:
+            best, best_score = action, score
+    return best
+
+
+def iterate(root, view, rng):
+    sim = determinize(view, rng)
+    seat = view["seat"]
+    node = root
+    path = [root]
+    in_tree = True
+    winner = None
+    steps = 0
+
+    while winner is None and steps < MAX_STEPS:
+        steps += 1
+        player = sim.cur
+        if player == seat and in_tree:
+            actions = sim.actions(seat)
+            untried = [a for a in actions if a not in node.children]
+            if untried:
+                action = rng.choice(untried)
+                node.children[action] = Node()
+                in_tree = False
+            else:
+                action = select(node, actions)
+            node = node.children[action]
+            path.append(node)
+            if action == SEE_THE_FUTURE and in_tree:
+                # What it saw splits the tree: a kitten on top is a
+                # different situation from a safe draw
+                outcome = ("top", bool(sim.deck) and sim.deck[-1] == EXPLODING_KITTEN)
+                node = node.children.setdefault(outcome, Node())
+                path.append(node)
+        else:
+            action = sim.scripted(player)
+
+        if action == DRAW:
+            winner = sim.draw(player)
+        else:
+            sim.play(player, action)
+
+    won = 1.0 if winner == seat else 0.0
+    for n in path:
+        n.visits += 1
+        n.wins += won
+
+
+def choose(view, rollouts=None, time_budget=TIME_BUDGET):
+    """Card code for the seat in `view` to play next, or None to draw."""
+    hand = view["hand"]
+    if not any(card in hand for card in AI_PLAYABLE):
+        return None
+    if rollouts is None:
+        rollouts = LEVELS.get(view.get("level"), LEVELS["medium"])
+
+    rng = random.Random(view.get("seed"))
+    root = Node()
+    deadline = time.perf_counter() + time_budget if time_budget else None
+    for i in range(rollouts):
+        iterate(root, view, rng)
+        # Checking the clock every few rollouts is plenty
+        if deadline and i % 8 == 7 and time.perf_counter() > deadline:
+            break
+
+    best = max(root.children.items(), key=lambda item: item[1].visits)[0]
+    return None if best == DRAW else best
+
+
+def rollout_rate(view, seconds=1.0):
+    """Rollouts per second on this core for one position (bench_mcts.py)."""
+    rng = random.Random(view.get("seed"))
+    root = Node()
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for _ in range(16):
+            iterate(root, view, rng)
+        count += 16
+    return count / (time.perf_counter() - start)
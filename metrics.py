@@ -0,0 +1,110 @@
+# metrics.py
+# Counters and histograms cheap enough to leave on in production, and the
+# Prometheus text format for app.py's /metrics. Each metric takes at most
+# one label. Values live in this process only: with several workers every
+# worker reports its own and Prometheus adds them up.
+
+import bisect
+import threading
+
+# Upper bounds in seconds; the last bucket is +Inf
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+REGISTRY = []
+# Timings cost a little per move; batch tools that never serve /metrics
+# (simulate.py and everything built on it, replay.py) switch them off
+ENABLED = True
+
+
+def _labels(label, value, extra=""):
+    parts = [f'{label}="{value}"'] if label else []
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name, help, label=None):
+        self.name = name
+        self.help = help
+        self.label = label
+        # Unlabelled counters show up as 0 before anything happens
+        self.values = {} if label else {None: 0}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, value=None, n=1):
+        with self.lock:
+            self.values[value] = self.values.get(value, 0) + n
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            values = list(self.values.items())
+        for value, n in sorted(values, key=lambda item: str(item[0])):
+            lines.append(f"{self.name}{_labels(self.label, value)} {n}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, label=None, buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = buckets
+        # label value -> [count per bucket (+Inf last), sum]
+        self.values = {}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, seconds, value=None):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            state = self.values.get(value)
+            if state is None:
+                state = self.values[value] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][i] += 1
+            state[1] += seconds
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            values = [(value, list(counts), total) for value, (counts, total) in self.values.items()]
+        for value, counts, total in sorted(values, key=lambda item: str(item[0])):
+            running = 0
+            for bound, n in zip(self.buckets + ("+Inf",), counts):
+                running += n
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label, value, le)} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.label, value)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.label, value)} {running}")
+        return lines
+
+
+class Gauge:
+    # Read when scraped, from a function returning a number or {label value: number}.
+    # kind="counter" for totals something else already keeps count of.
+    def __init__(self, name, help, read, label=None, kind="gauge"):
+        self.name = name
+        self.help = help
+        self.read = read
+        self.label = label
+        self.kind = kind
+        REGISTRY.append(self)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        values = self.read()
+        if not isinstance(values, dict):
+            values = {None: values}
+        for value, n in values.items():
+            lines.append(f"{self.name}{_labels(self.label, value)} {n}")
+        return lines
+
+
+def render():
+    """Every registered metric in the Prometheus text format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
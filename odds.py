@@ -0,0 +1,192 @@
+# odds.py
+# Batched Monte Carlo estimate of when each seat explodes. Thousands of
+# shuffled decks are held as one integer array and every game advances one
+# draw per step, so sweeps over deck recipes and table sizes stay fast.
+#
+# Only the draw / Defuse / reinsert loop is modelled: nobody plays cards,
+# each seat draws once per turn in order, a Defuse in hand saves the
+# player and puts the kitten back at a random depth. Needs numpy.
+#
+#   python odds.py --players 2 3 4 5 --decks 200000
+
+import argparse
+import time
+
+import numpy as np
+
+from engine import CARD_NAMES
+
+OTHER, KITTEN, DEFUSE = 0, 1, 2
+HAND_SIZE = 4
+Z_95 = 1.959964
+
+
+def wilson_interval(hits, trials, z=Z_95):
+    """95% Wilson score interval for hits/trials, elementwise."""
+    hits = np.asarray(hits, dtype=float)
+    trials = np.maximum(np.asarray(trials, dtype=float), 1)
+    p = hits / trials
+    denom = 1 + z * z / trials
+    centre = (p + z * z / (2 * trials)) / denom
+    half = z * np.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denom
+    return centre - half, centre + half
+
+
+class OddsResult:
+    def __init__(self, players, decks, explode_counts, win_counts):
+        self.players = players
+        self.decks = decks
+        # explode_counts[seat, k] = games where `seat` exploded on its turn k+1
+        self.explode_counts = explode_counts
+        self.win_counts = win_counts
+
+    @property
+    def explode(self):
+        return self.explode_counts / self.decks
+
+    @property
+    def explode_ci(self):
+        return wilson_interval(self.explode_counts, self.decks)
+
+    @property
+    def survival(self):
+        """survival[seat, k] = chance `seat` is still alive after k+1 turns."""
+        return 1 - np.cumsum(self.explode_counts, axis=1) / self.decks
+
+    @property
+    def win(self):
+        return self.win_counts / self.decks
+
+    @property
+    def win_ci(self):
+        return wilson_interval(self.win_counts, self.decks)
+
+
+def deal(players, recipe=CARD_NAMES, leftover_defuses_in_deck=False):
+    """Count what start_game leaves in the deck and hands for this table.
+
+    Returns (other cards in deck, kittens, Defuses in deck, Defuses per seat).
+    """
+    defuses = recipe.get("Defuse", 0)
+    others = sum(n for name, n in recipe.items() if name != "Defuse")
+    dealt = [1 if seat < defuses else 0 for seat in range(players)]
+    others_in_deck = max(0, others - HAND_SIZE * players)
+    defuses_in_deck = defuses - sum(dealt) if leftover_defuses_in_deck else 0
+    return others_in_deck, players - 1, defuses_in_deck, dealt
+
+
+def estimate(players, recipe=CARD_NAMES, decks=100_000, seed=None, leftover_defuses_in_deck=False, start_seat=None):
+    rng = np.random.default_rng(seed)
+    others, kittens, deck_defuses, dealt = deal(players, recipe, leftover_defuses_in_deck)
+
+    base = np.array([OTHER] * others + [KITTEN] * kittens + [DEFUSE] * deck_defuses, dtype=np.int8)
+    length = len(base)
+    deck = rng.permuted(np.tile(base, (decks, 1)), axis=1)
+    top = np.zeros(decks, dtype=np.int64)
+    cols = np.arange(length)
+
+    alive = np.ones((decks, players), dtype=bool)
+    defuse = np.tile(np.array(dealt, dtype=np.int16), (decks, 1))
+    turns = np.zeros((decks, players), dtype=np.int64)
+    if start_seat is None:
+        seat = rng.integers(0, players, decks)
+    else:
+        seat = np.full(decks, start_seat, dtype=np.int64)
+
+    # A game lasts at most one pass through the deck plus one extra draw per
+    # Defuse, so this bounds how many turns a seat can ever take
+    max_turns = length + int(defuse.sum(axis=1).max(initial=0)) + deck_defuses + 1
+    explode_counts = np.zeros((players, max_turns), dtype=np.int64)
+
+    live = np.arange(decks)
+    while len(live):
+        s = seat[live]
+        card = deck[live, top[live]]
+        top[live] += 1
+        k = turns[live, s]
+        turns[live, s] += 1
+
+        got_defuse = card == DEFUSE
+        defuse[live[got_defuse], s[got_defuse]] += 1
+
+        kitten = card == KITTEN
+        saved = kitten & (defuse[live, s] > 0)
+        dead = kitten & ~saved
+
+        if saved.any():
+            rows = live[saved]
+            defuse[rows, s[saved]] -= 1
+            # Put the kitten back in the slot it came from, then slide it
+            # down to a random depth among the remaining cards
+            start = top[rows] - 1
+            top[rows] = start
+            depth = rng.integers(0, length - start)
+            stop = start + depth
+            c = cols[None, :]
+            shift = (c >= start[:, None]) & (c < stop[:, None])
+            src = np.where(shift, c + 1, c)
+            moved = np.take_along_axis(deck[rows], src, axis=1)
+            moved[c == stop[:, None]] = KITTEN
+            deck[rows] = moved
+
+        if dead.any():
+            rows = live[dead]
+            alive[rows, s[dead]] = False
+            np.add.at(explode_counts, (s[dead], k[dead]), 1)
+
+        # Pass the turn to the next seat still alive
+        nxt = (s + 1) % players
+        for _ in range(players):
+            stuck = ~alive[live, nxt]
+            if not stuck.any():
+                break
+            nxt[stuck] = (nxt[stuck] + 1) % players
+        seat[live] = nxt
+
+        live = live[alive[live].sum(axis=1) > 1]
+
+    winners = alive.argmax(axis=1)
+    win_counts = np.bincount(winners, minlength=players)
+    return OddsResult(players, decks, explode_counts, win_counts)
+
+
+def sweep(players=(2, 3, 4, 5), recipes=None, decks=100_000, seed=None, **kwargs):
+    """Run `estimate` for every (recipe name, player count) pair."""
+    recipes = recipes or {"base": CARD_NAMES}
+    seeds = np.random.SeedSequence(seed).spawn(len(recipes) * len(players))
+    results = {}
+    i = 0
+    for name, recipe in recipes.items():
+        for n in players:
+            results[(name, n)] = estimate(n, recipe, decks, seeds[i], **kwargs)
+            i += 1
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate explosion odds per seat and turn.")
+    parser.add_argument("--players", type=int, nargs="+", default=[2, 3, 4, 5])
+    parser.add_argument("--decks", type=int, default=100_000)
+    parser.add_argument("--turns", type=int, default=6, help="turns to print per seat")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = sweep(args.players, decks=args.decks, seed=args.seed)
+    elapsed = time.perf_counter() - start
+    total = args.decks * len(args.players)
+    print(f"{total} decks in {elapsed:.2f}s ({total / elapsed:,.0f} decks/sec)")
+
+    for (name, n), res in results.items():
+        low, high = res.win_ci
+        # A property over the whole table, so work it out once per table
+        lo, hi = res.explode_ci
+        print(f"\n{name}, {n} players")
+        for seat in range(n):
+            print(f"  seat {seat}: win {res.win[seat]:.3f} [{low[seat]:.3f}, {high[seat]:.3f}]")
+            for k in range(min(args.turns, res.explode.shape[1])):
+                print(f"    turn {k + 1}: explode {res.explode[seat, k]:.4f} [{lo[seat, k]:.4f}, {hi[seat, k]:.4f}]")
+
+
+if __name__ == "__main__":
+    main()
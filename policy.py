@@ -0,0 +1,132 @@
+# policy.py
+# Memoized decisions for searched AI seats. A decision is filed under a
+# small abstraction of the seat's view (card counts in hand, deck size,
+# turns owed, opponents left, what it saw on top and its difficulty), so
+# once a situation has been searched every later seat that lands in it is
+# answered by a dictionary lookup. The table is a bounded LRU and can be
+# filled offline with build_policy.py and loaded at startup.
+
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+import mcts
+from engine import CARD_TYPES
+
+POLICY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "policy.bin")
+CAPACITY = 200_000
+MISSING = object()
+
+# File layout: header, then one fixed-size record per entry, least recently
+# used first so loading a file restores the same eviction order
+MAGIC = b"EKPT"
+VERSION = 1
+HEADER = struct.Struct("<4sBI") # magic, version, entries
+# level, hand counts, deck size, turns, opponents, known top (length + cards), card (-1 = draw)
+RECORD = struct.Struct(f"<B{len(CARD_TYPES)}sIHHB3sb")
+LEVEL_NAMES = tuple(mcts.LEVELS)
+NO_LEVEL = 255
+
+
+def abstract_key(view):
+    counts = [0] * len(CARD_TYPES)
+    for card in view["hand"]:
+        counts[card] += 1
+    seat = view["seat"]
+    sizes = view["hand_sizes"]
+    # Whatever isn't in another hand is in the deck
+    deck_size = len(view["unseen"]) - (sum(sizes) - sizes[seat])
+    return (
+        view.get("level"),
+        bytes(min(n, 255) for n in counts),
+        deck_size,
+        min(view["turns_to_take"], 0xFFFF),
+        min(sum(view["alive"]) - 1, 0xFFFF),
+        bytes(view["known_top"]),
+    )
+
+
+# ---------------- TABLE ----------------
+class PolicyTable:
+    def __init__(self, capacity=CAPACITY):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """The stored card (None means draw), or MISSING."""
+        with self.lock:
+            card = self.entries.get(key, MISSING)
+            if card is MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            return card
+
+    def put(self, key, card):
+        with self.lock:
+            self.entries[key] = card
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+    def decide(self, view, search=mcts.choose):
+        """What mcts.choose would say for `view`, searching only on a miss.
+        If `search` raises nothing is stored."""
+        key = abstract_key(view)
+        card = self.get(key)
+        if card is MISSING:
+            card = search(view)
+            self.put(key, card)
+        return card
+
+    def stats(self):
+        return {"entries": len(self.entries), "capacity": self.capacity, "hits": self.hits, "misses": self.misses}
+
+    # ---------------- FILE ----------------
+    def save(self, path=POLICY_FILE):
+        with self.lock:
+            items = list(self.entries.items())
+        parts = [HEADER.pack(MAGIC, VERSION, len(items))]
+        for (level, counts, deck_size, turns, opponents, known), card in items:
+            level = LEVEL_NAMES.index(level) if level in LEVEL_NAMES else NO_LEVEL
+            parts.append(RECORD.pack(level, counts, deck_size, turns, opponents, len(known), known, -1 if card is None else card))
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(b"".join(parts))
+        os.replace(tmp, path)
+
+    def load(self, path=POLICY_FILE):
+        """Add the entries saved in `path`. Returns how many were read."""
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} policy file")
+        entries = []
+        for level, counts, deck_size, turns, opponents, known_len, known, card in RECORD.iter_unpack(data[HEADER.size:HEADER.size + count * RECORD.size]):
+            level = LEVEL_NAMES[level] if level < len(LEVEL_NAMES) else None
+            entries.append(((level, counts, deck_size, turns, opponents, known[:known_len]), None if card < 0 else card))
+        for key, card in entries:
+            self.put(key, card)
+        return count
+
+
+def load_table(path=POLICY_FILE, capacity=CAPACITY):
+    table = PolicyTable(capacity)
+    try:
+        table.load(path)
+    except FileNotFoundError:
+        pass
+    return table
+
+
+# Shared by every AI seat in this process
+TABLE = load_table()
@@ -0,0 +1,216 @@
+# replay.py
+# Plays games again from their action logs (Game.action_log: the seed plus
+# every action, see engine.py), headless and as fast as the engine goes.
+# A corpus is a JSON-lines file of {"log": ..., "digest": ...}; replaying it
+# checks every game still ends in exactly the recorded state.
+#
+#   python replay.py record corpus.jsonl --games 100000   # make a corpus
+#   python replay.py run corpus.jsonl [--workers 4]       # check it
+#   python replay.py export ROOM_ID >> bug.jsonl          # a live room's log
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+
+import metrics
+from engine import DEFUSE, EXPLODING_KITTEN, FAVOR, Game
+
+# Nothing here serves /metrics, so skip the per-move timings
+metrics.ENABLED = False
+
+CHUNK_SIZE = 2000
+MAX_ACTIONS = 2000 # per recorded game, in case the bots never finish
+
+ACTIONS = {
+    "b": lambda game, action: game.begin(),
+    "d": lambda game, action: game.draw_card(),
+    "p": lambda game, action: game.play_card(action[1], action[2]),
+    "f": lambda game, action: game.resolve_favor(action[1]),
+    "a": lambda game, action: game.record(game.process_ai_turns()),
+    "m": lambda game, action: None, # consumed through replay_picks
+}
+
+
+def replay(log):
+    """A fresh Game that has played every action in `log` again."""
+    # start() reseeds, so there is no point paying for an urandom seed here
+    game = Game(rng=random.Random(0))
+    game.auto_ai = log["auto_ai"]
+    game.ai_level = log["ai_level"]
+    actions = log["actions"]
+    # Searches are not repeatable (they stop on a clock), so searched seats
+    # get the picks they made the first time
+    game.replay_picks = deque(action[1] for action in actions if action[0] == "m")
+    game.start(log["players"], log["humans"], seed=log["seed"], party=log.get("party", False))
+    for action in actions:
+        ACTIONS[action[0]](game, action)
+    game.replay_picks = None
+    return game
+
+
+def digest(game):
+    # Everything that decides what happens next, not the event log: a room
+    # restored from a snapshot starts a new one
+    h = hashlib.blake2b(digest_size=8)
+    h.update(json.dumps([game.current_player_idx, game.turns_to_take, game.pending_action, game.images,
+                         [[p.is_alive, p.hand.cards.hex()] for p in game.players]]).encode())
+    h.update(bytes(game.deck))
+    return h.hexdigest()
+
+
+# ---------------- RECORDING ----------------
+def finished(game):
+    idx = game.current_player_idx
+    return (idx == -1 or sum(p.is_alive for p in game.players) <= 1
+            or not game.players[idx].is_human or not game.players[idx].is_alive)
+
+
+def bot_move(game, rng):
+    # A human seat that plays whatever it holds at random
+    player = game.players[game.current_player_idx]
+    pending = game.pending_action
+    if pending:
+        names = [card["name"] for card in pending["target_hand"]]
+        game.resolve_favor(rng.choice(names) if names else None)
+        return
+    playable = [i for i, card in enumerate(player.hand) if card not in (DEFUSE, EXPLODING_KITTEN)]
+    if playable and rng.random() < 0.3:
+        idx = rng.choice(playable)
+        target = None
+        if player.hand[idx] == FAVOR:
+            target = rng.choice([p.name for p in game.players if p is not player and p.is_alive])
+        game.play_card(idx, target)
+    else:
+        game.draw_card()
+
+
+def record_chunk(job):
+    seed, games, seats, humans, level = job
+    rng = random.Random(seed)
+    game = Game(rng=random.Random(rng.getrandbits(64)))
+    game.ai_level = level
+    lines = []
+    for _ in range(games):
+        game.start([f"P{i}" for i in range(seats)], humans)
+        game.begin()
+        for _ in range(MAX_ACTIONS):
+            if finished(game):
+                break
+            bot_move(game, rng)
+        lines.append(json.dumps({"log": game.action_log, "digest": digest(game)}, separators=(",", ":")))
+    return lines
+
+
+def run_chunk(lines):
+    mismatches = []
+    for line in lines:
+        entry = json.loads(line)
+        if digest(replay(entry["log"])) != entry["digest"]:
+            mismatches.append(entry)
+    return len(lines), mismatches
+
+
+def chunks(f, size=CHUNK_SIZE):
+    chunk = []
+    for line in f:
+        if line.strip():
+            chunk.append(line)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def pool_map(fn, jobs, workers):
+    if workers == 1:
+        yield from map(fn, jobs)
+        return
+    with Pool(workers) as pool:
+        yield from pool.imap(fn, jobs)
+
+
+# ---------------- COMMANDS ----------------
+def cmd_record(args):
+    master = random.Random(args.seed)
+    jobs = []
+    remaining = args.games
+    while remaining > 0:
+        n = min(CHUNK_SIZE, remaining)
+        jobs.append((master.getrandbits(64), n, args.players, args.humans, args.level))
+        remaining -= n
+    start = time.perf_counter()
+    with open(args.corpus, "w") as f:
+        for lines in pool_map(record_chunk, jobs, args.workers):
+            f.write("\n".join(lines) + "\n")
+    elapsed = time.perf_counter() - start
+    print(f"recorded {args.games:,} games in {elapsed:.1f}s -> {args.corpus} ({os.path.getsize(args.corpus):,} bytes)")
+
+
+def cmd_run(args):
+    start = time.perf_counter()
+    total = 0
+    failed = []
+    with open(args.corpus) as f:
+        for count, mismatches in pool_map(run_chunk, chunks(f), args.workers):
+            total += count
+            failed.extend(mismatches)
+    elapsed = time.perf_counter() - start
+    print(f"replayed {total:,} games in {elapsed:.1f}s ({total / elapsed:,.0f} games/sec), {len(failed)} mismatched")
+    for entry in failed[:10]:
+        print(f"  seed {entry['log']['seed']}: {len(entry['log']['actions'])} actions")
+    return 1 if failed else 0
+
+
+def cmd_export(args):
+    if args.store:
+        from store import open_store
+        loaded = open_store(args.store).load(args.room)
+        game = loaded[0] if loaded else None
+    else:
+        from snapshots import SnapshotStore
+        snapshots = SnapshotStore(args.db)
+        game = snapshots.load(args.room)
+        snapshots.close()
+    if game is None or not game.action_log:
+        print(f"no action log for room {args.room}", file=sys.stderr)
+        return 1
+    print(json.dumps({"log": game.action_log, "digest": digest(game)}, separators=(",", ":")))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay games from action logs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="play bot games and save their logs")
+    record.add_argument("corpus")
+    record.add_argument("--games", type=int, default=10000)
+    record.add_argument("--players", type=int, default=3)
+    record.add_argument("--humans", type=int, default=1, help="seats played by a random bot")
+    record.add_argument("--level", default=None, help="search difficulty for AI seats (slow to record)")
+    record.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    record.add_argument("--seed", type=int, default=None)
+
+    run = commands.add_parser("run", help="replay a corpus and compare final states")
+    run.add_argument("corpus")
+    run.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+
+    export = commands.add_parser("export", help="print the log of a saved room")
+    export.add_argument("room")
+    export.add_argument("--db", default="games.db", help="snapshot database (see SNAPSHOT_DB)")
+    export.add_argument("--store", default="", help="shared store spec instead (see GAME_STORE)")
+
+    args = parser.parse_args()
+    handler = {"record": cmd_record, "run": cmd_run, "export": cmd_export}[args.command]
+    sys.exit(handler(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+# risk.py
+# The exact chance that the next card drawn is an Exploding Kitten, as each
+# player can know it. No sampling: a belief is a handful of weighted deck
+# layouts. Each layout is a tuple of blocks from the top, where a block is
+# a card known to be a kitten (KITTEN) or not (SAFE), or a run of cards
+# nobody at the table has seen, as (cards, kittens in them). Any order of a
+# run is equally likely, so the chance for the top card is read straight
+# off the first block.
+#
+# What everyone knows (deck size, kittens left, every draw, every shuffle)
+# is one shared belief, and it stays a single run. Only a player who has
+# seen cards with See the Future or put a kitten back with their own Defuse
+# gets a belief of their own. A kitten someone else put back at a depth you
+# did not see splits your layouts one way per place it could have gone.
+# Each update costs O(layouts). That is one layout for the shared belief
+# and a few for a private one (simulated games never go past four). A
+# private belief that outgrows MAX_LAYOUTS falls back to the shared one:
+# from then until the next shuffle that seat's chance is an estimate, and
+# exact(seat) says so.
+#
+#   odds = KittenOdds()
+#   odds.reset(len(deck), kittens)
+#   odds.saw(seat, [card == EXPLODING_KITTEN for card in top_three])
+#   odds.chance(seat)
+
+from math import comb
+
+KITTEN, SAFE = "K", "S"
+MAX_LAYOUTS = 64
+SURE = 1 - 1e-9 # chance() at or above this: the player knows a kitten is on top
+
+
+# ---------------- BELIEFS ----------------
+# {layout: weight}. These functions never modify their arguments, so
+# beliefs can be shared between players and kept by checkpoints.
+def unseen(size, kittens):
+    return {((size, kittens),): 1.0} if size else {(): 1.0}
+
+
+def top_chance(belief):
+    total = 0.0
+    for blocks, weight in belief.items():
+        if blocks:
+            first = blocks[0]
+            if first == KITTEN:
+                total += weight
+            elif first != SAFE:
+                total += weight * first[1] / first[0]
+    return total
+
+
+def _add(belief, blocks, weight):
+    if weight > 1e-15:
+        belief[blocks] = belief.get(blocks, 0.0) + weight
+
+
+def _normalize(belief):
+    total = sum(belief.values())
+    return {blocks: weight / total for blocks, weight in belief.items()} if total else belief
+
+
+def _take_top(blocks, kitten):
+    # (chance the top card is `kitten`, the blocks under it)
+    first = blocks[0]
+    if first == KITTEN or first == SAFE:
+        return float((first == KITTEN) == kitten), blocks[1:]
+    size, kittens = first
+    chance = (kittens if kitten else size - kittens) / size
+    rest = blocks[1:] if size == 1 else ((size - 1, kittens - kitten),) + blocks[1:]
+    return chance, rest
+
+
+def drawn(belief, kitten):
+    """Everyone saw whether the top card was a kitten; it is gone."""
+    new = {}
+    for blocks, weight in belief.items():
+        if blocks:
+            chance, rest = _take_top(blocks, kitten)
+            _add(new, rest, weight * chance)
+    return _normalize(new)
+
+
+def seen(belief, kittens):
+    """The top len(kittens) cards were looked at (True where a kitten)."""
+    new = {}
+    for blocks, weight in belief.items():
+        known = []
+        for kitten in kittens:
+            if not blocks:
+                break
+            chance, blocks = _take_top(blocks, kitten)
+            weight *= chance
+            known.append(KITTEN if kitten else SAFE)
+        _add(new, tuple(known) + blocks, weight)
+    return _normalize(new)
+
+
+def put_back_unseen(belief, size):
+    """A kitten went back into the `size` card deck at a depth this player
+    did not see: any of the size + 1 places, equally likely."""
+    new = {}
+    for blocks, weight in belief.items():
+        share = weight / (size + 1)
+        after_run = False
+        for i, block in enumerate(blocks):
+            if block == KITTEN or block == SAFE:
+                # The place above a known card (the one above a run's last
+                # card counts as the run's)
+                if not after_run:
+                    _add(new, blocks[:i] + (KITTEN,) + blocks[i:], share)
+                after_run = False
+            else:
+                # Anywhere in a run, or just under it, keeps it a run
+                cards, kittens = block
+                _add(new, blocks[:i] + ((cards + 1, kittens + 1),) + blocks[i + 1:], share * (cards + 1))
+                after_run = True
+        if not after_run:
+            _add(new, blocks + (KITTEN,), share)
+    return _normalize(new)
+
+
+def put_back_at(belief, depth):
+    """A kitten went back with `depth` cards above it, and this player saw where."""
+    new = {}
+    for blocks, weight in belief.items():
+        at = 0
+        for i, block in enumerate(blocks):
+            if at == depth:
+                _add(new, blocks[:i] + (KITTEN,) + blocks[i:], weight)
+                break
+            if block == KITTEN or block == SAFE:
+                at += 1
+                continue
+            cards, kittens = block
+            if depth < at + cards:
+                # Inside a run: it splits in two, with the kittens shared out
+                # between them as a hypergeometric
+                above, below = depth - at, at + cards - depth
+                for k in range(max(0, kittens - below), min(above, kittens) + 1):
+                    share = comb(above, k) * comb(below, kittens - k) / comb(cards, kittens)
+                    _add(new, blocks[:i] + ((above, k), KITTEN, (below, kittens - k)) + blocks[i + 1:], weight * share)
+                break
+            at += cards
+        else:
+            _add(new, blocks + (KITTEN,), weight)
+    return _normalize(new)
+
+
+# ---------------- PER GAME ----------------
+class KittenOdds:
+    def __init__(self):
+        self.reset(0, 0)
+
+    def reset(self, size, kittens):
+        # A fresh deal or a shuffle: nobody knows anything about the order
+        self.size = size
+        self.kittens = kittens
+        # seat -> belief, only for seats that know more than everyone. The
+        # shared belief is always one unseen run, so it is just the counts.
+        self.private = {}
+        # Seats whose belief hit MAX_LAYOUTS since the last deal or shuffle
+        self.estimated = set()
+
+    @property
+    def public(self):
+        return unseen(self.size, self.kittens)
+
+    def chance(self, seat=None):
+        """The chance `seat` (None: anyone watching) gives the next draw of
+        being a kitten."""
+        belief = self.private.get(seat)
+        if belief is None:
+            return self.kittens / self.size if self.size else 0.0
+        return top_chance(belief)
+
+    def knows(self, seat):
+        return seat in self.private
+
+    def exact(self, seat=None):
+        return seat not in self.estimated
+
+    def shuffled(self):
+        self.reset(self.size, self.kittens)
+
+    def drew(self, kitten):
+        self.size -= 1
+        self.kittens -= kitten
+        if self.private:
+            self._update(lambda belief: drawn(belief, kitten))
+
+    def saw(self, seat, kittens):
+        self._keep(seat, seen(self.private.get(seat) or self.public, kittens))
+
+    def put_back(self, seat, depth):
+        """`seat` defused and put the kitten back under `depth` cards. With
+        seat=None nobody saw where it went (the server picked the depth
+        and told no one)."""
+        size = self.size
+        mine = None if seat is None else put_back_at(self.private.get(seat) or self.public, depth)
+        self.size += 1
+        self.kittens += 1
+        self._update(lambda belief: put_back_unseen(belief, size))
+        if mine is not None:
+            self._keep(seat, mine)
+
+    def _update(self, step):
+        for seat, belief in list(self.private.items()):
+            self._keep(seat, step(belief))
+
+    def _keep(self, seat, belief):
+        # Drop what no longer tells the seat more than everyone knows, and
+        # what has grown too big to be worth keeping
+        if len(belief) > MAX_LAYOUTS:
+            self.private.pop(seat, None)
+            self.estimated.add(seat)
+        elif belief == self.public:
+            self.private.pop(seat, None)
+        else:
+            self.private[seat] = belief
+
+    # ---------------- LOOKAHEAD ----------------
+    def state(self):
+        return self.size, self.kittens, dict(self.private), frozenset(self.estimated)
+
+    def restore(self, state):
+        self.size, self.kittens, private, estimated = state
+        self.private = dict(private)
+        self.estimated = set(estimated)
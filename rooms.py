@@ -0,0 +1,135 @@
+# rooms.py
+# Registry of live game rooms. Each room owns its own game object and lock,
+# so requests for different rooms never wait on each other.
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+ROOM_TTL_SECONDS = 30 * 60
+MAX_ROOMS = 10000
+SWEEP_INTERVAL = 5.0
+
+
+class Room:
+    def __init__(self, room_id, game):
+        self.id = room_id
+        self.game = game
+        self.lock = threading.Lock()
+        # Notified (with the lock held) whenever the game logs new events
+        self.changed = threading.Condition(self.lock)
+        # Set while a background worker is playing the AI seats
+        self.ai_running = False
+        # Version of the shared copy `game` was loaded from (0 = not stored)
+        self.version = 0
+        # game.seq when the turn clock was last (re)started (see app.py)
+        self.clock_seq = None
+        self.last_seen = time.monotonic()
+
+
+class RoomRegistry:
+    def __init__(self, game_factory, ttl=ROOM_TTL_SECONDS, max_rooms=MAX_ROOMS, clock=time.monotonic, loader=None):
+        self.game_factory = game_factory
+        # loader(room_id) -> (game, version) or None, for rooms not held in
+        # memory (restarted process, another worker's room, or evicted here)
+        self.loader = loader
+        self.ttl = ttl
+        self.max_rooms = max_rooms
+        self.clock = clock
+        # Least recently used rooms sit at the front, so eviction only
+        # ever looks at the rooms it actually removes.
+        self._rooms = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_sweep = 0.0
+
+    def __len__(self):
+        return len(self._rooms)
+
+    def __contains__(self, room_id):
+        return room_id in self._rooms
+
+    def new_room_id(self):
+        return secrets.token_urlsafe(8)
+
+    def get(self, room_id):
+        """Return the room and mark it as used, or None if it is unknown or expired."""
+        if not room_id:
+            return None
+        now = self.clock()
+        with self._lock:
+            self._sweep(now)
+            room = self._rooms.get(room_id)
+            if room is not None:
+                room.last_seen = now
+                self._rooms.move_to_end(room_id)
+                return room
+        if self.loader is None:
+            return None
+        # Load outside the lock so a slow disk read only holds up this room
+        loaded = self.loader(room_id)
+        if loaded is None:
+            return None
+        with self._lock:
+            # Another request may have restored it first; keep theirs
+            room = self._rooms.get(room_id)
+            if room is None:
+                room = Room(room_id, loaded[0])
+                room.version = loaded[1]
+                self._rooms[room_id] = room
+                self._evict_over_cap()
+            room.last_seen = now
+            self._rooms.move_to_end(room_id)
+            return room
+
+    def peek(self, room_id):
+        """The room if it is held in memory, without marking it as used."""
+        with self._lock:
+            return self._rooms.get(room_id)
+
+    def create(self, room_id=None):
+        now = self.clock()
+        with self._lock:
+            self._sweep(now)
+            if not room_id or room_id in self._rooms:
+                room_id = self.new_room_id()
+                while room_id in self._rooms:
+                    room_id = self.new_room_id()
+            room = Room(room_id, self.game_factory())
+            room.last_seen = now
+            self._rooms[room_id] = room
+            self._evict_over_cap()
+            return room
+
+    def get_or_create(self, room_id):
+        return self.get(room_id) or self.create(room_id)
+
+    def remove(self, room_id):
+        with self._lock:
+            return self._rooms.pop(room_id, None)
+
+    def sweep(self):
+        """Evict every room that has been idle for longer than the TTL."""
+        with self._lock:
+            self._next_sweep = 0.0
+            return self._sweep(self.clock())
+
+    def _evict_over_cap(self):
+        # Hard cap: drop the least recently used rooms first
+        while len(self._rooms) > self.max_rooms:
+            self._rooms.popitem(last=False)
+
+    def _sweep(self, now):
+        # Called with self._lock held
+        if now < self._next_sweep:
+            return 0
+        self._next_sweep = now + SWEEP_INTERVAL
+        evicted = 0
+        deadline = now - self.ttl
+        while self._rooms:
+            room = next(iter(self._rooms.values()))
+            if room.last_seen > deadline:
+                break
+            self._rooms.popitem(last=False)
+            evicted += 1
+        return evicted
@@ -0,0 +1,79 @@
+# seats.py
+# Turn order for tables of any size. The seats still in the game form a
+# circular doubly linked list over seat indices, so passing the turn and
+# knocking a seat out are O(1) however many seats are already out, and the
+# number still in is counted as it changes (the win check only reads it).
+# A seat that goes out keeps its links, so the turn can still pass on from
+# it, and so a lookahead can put it back (undo, newest first).
+#
+#   ring = SeatRing([True] * 200)
+#   ring.remove(7)
+#   ring.next(6)  # -> 8
+
+class SeatRing:
+    def __init__(self, alive=()):
+        alive = bytearray(1 if a else 0 for a in alive)
+        n = len(alive)
+        self.alive = alive
+        self.count = sum(alive)
+        self._next = [0] * n
+        self._prev = [0] * n
+        # Seats taken out, in order, for undo()
+        self._removed = []
+        seats = [i for i in range(n) if alive[i]]
+        # Any seat still in (the winner once only one is)
+        self.head = seats[0] if seats else -1
+        for a, b in zip(seats, seats[1:] + seats[:1]):
+            self._next[a] = b
+            self._prev[b] = a
+        # Seats already out point at the next seat in after them
+        after = self.head
+        for i in reversed(range(n)):
+            if alive[i]:
+                after = i
+            else:
+                self._next[i] = after
+
+    def __len__(self):
+        return self.count
+
+    def next(self, seat):
+        """The first seat still in after `seat` (itself when it is the last
+        one in), or -1 when nobody is."""
+        if not self.count:
+            return -1
+        nxt = self._next
+        seat = nxt[seat]
+        # Only a seat that went out before its successor did gets here
+        while not self.alive[seat]:
+            seat = nxt[seat]
+        return seat
+
+    def remove(self, seat):
+        if not self.alive[seat]:
+            return
+        prev, nxt = self._prev[seat], self._next[seat]
+        self._next[prev] = nxt
+        self._prev[nxt] = prev
+        self.alive[seat] = 0
+        self.count -= 1
+        if self.head == seat:
+            self.head = nxt if self.count else -1
+        self._removed.append(seat)
+
+    # ---------------- UNDO ----------------
+    def mark(self):
+        return len(self._removed)
+
+    def undo(self, mark):
+        # A removed seat's links are as they were when it went out, so
+        # relinking in reverse order restores the ring exactly
+        removed = self._removed
+        while len(removed) > mark:
+            seat = removed.pop()
+            self._next[self._prev[seat]] = seat
+            self._prev[self._next[seat]] = seat
+            self.alive[seat] = 1
+            self.count += 1
+            if self.head == -1:
+                self.head = seat
@@ -0,0 +1,33 @@
+# serialize.py
+# JSON for API responses. Uses orjson when it is installed (several times
+# faster than the json module) and falls back to json otherwise. Parts of a
+# response that were encoded earlier can be passed in as Raw and are
+# spliced in as they are (see Game.players_json).
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class Raw(bytes):
+    # Already-encoded JSON, for a top-level value of the dict given to dumps()
+    __slots__ = ()
+
+
+def encode(obj):
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def dumps(obj):
+    """obj as UTF-8 JSON bytes."""
+    if not isinstance(obj, dict) or not any(type(v) is Raw for v in obj.values()):
+        return encode(obj)
+    raw = b",".join(encode(k) + b":" + v for k, v in obj.items() if type(v) is Raw)
+    rest = encode({k: v for k, v in obj.items() if type(v) is not Raw})
+    # rest is "{...}": put the spliced pairs first
+    return b"{" + raw + (b"," + rest[1:] if len(rest) > 2 else b"}")
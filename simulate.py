@@ -0,0 +1,134 @@
+# simulate.py
+# Plays complete AI-only games with the engine rules, spread over a process
+# pool. Used for balance checks, e.g.
+#
+#   python simulate.py --games 1000000 --players 4 --seed 7
+#   python simulate.py --games 1000 --players 200 --party
+
+import argparse
+import os
+import random
+import time
+from collections import Counter
+from multiprocessing import Pool
+
+import metrics
+from engine import Game
+
+# Nothing here serves /metrics, so skip the per-move timings
+metrics.ENABLED = False
+
+CHUNK_SIZE = 2000
+DRAW_MOVES = ("ai_draw", "ai_defuse", "ai_explode")
+
+
+def play_game(game, seats, party=False):
+    """Play one game to the end. Returns (winner seat or None, turns, card plays)."""
+    game.start([f"AI {i}" for i in range(seats)], humans=0, party=party)
+    turns = 0
+    plays = Counter()
+    while True:
+        moves = game.process_ai_turns()
+        for move in moves:
+            kind = move.get("type")
+            if kind in DRAW_MOVES:
+                turns += 1
+            elif kind == "ai_play":
+                plays[move["card"]["name"]] += 1
+            elif kind == "win":
+                return int(move["player"].rsplit(" ", 1)[1]), turns, plays
+            elif kind == "game_broken":
+                return None, turns, plays
+        current = game.current_player_idx
+        if current == -1 or not game.players[current].is_alive:
+            return None, turns, plays
+
+
+def run_chunk(job):
+    seed, games, seats, party = job
+    rng = random.Random(seed)
+    game = Game(rng=rng)
+    wins = Counter()
+    lengths = Counter()
+    plays = Counter()
+    for _ in range(games):
+        winner, turns, played = play_game(game, seats, party)
+        wins[winner] += 1
+        lengths[turns] += 1
+        plays.update(played)
+    return wins, lengths, plays
+
+
+def simulate(games, seats, workers=None, seed=None, chunk_size=CHUNK_SIZE, party=False):
+    # Chunk seeds come from one master RNG, so a given --seed gives the same
+    # totals no matter how many workers share the work
+    master = random.Random(seed)
+    jobs = []
+    remaining = games
+    while remaining > 0:
+        n = min(chunk_size, remaining)
+        jobs.append((master.getrandbits(64), n, seats, party))
+        remaining -= n
+
+    wins = Counter()
+    lengths = Counter()
+    plays = Counter()
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = map(run_chunk, jobs)
+    else:
+        pool = Pool(workers)
+        results = pool.imap_unordered(run_chunk, jobs)
+    for chunk_wins, chunk_lengths, chunk_plays in results:
+        wins.update(chunk_wins)
+        lengths.update(chunk_lengths)
+        plays.update(chunk_plays)
+    if workers != 1:
+        pool.close()
+        pool.join()
+    return wins, lengths, plays
+
+
+def length_percentile(lengths, total, pct):
+    seen = 0
+    for turns in sorted(lengths):
+        seen += lengths[turns]
+        if seen * 100 >= total * pct:
+            return turns
+    return 0
+
+
+def report(games, seats, elapsed, wins, lengths, plays):
+    print(f"{games} games, {seats} seats in {elapsed:.1f}s ({games / elapsed:,.0f} games/sec)")
+    print("\nWin rate by seat:")
+    for seat in range(seats):
+        print(f"  seat {seat}: {wins[seat] / games:6.2%}")
+    if wins[None]:
+        print(f"  no winner: {wins[None] / games:6.2%}")
+
+    mean = sum(t * n for t, n in lengths.items()) / games
+    print("\nGame length (turns drawn):")
+    print(f"  mean {mean:.1f}  p50 {length_percentile(lengths, games, 50)}"
+          f"  p90 {length_percentile(lengths, games, 90)}  max {max(lengths)}")
+
+    print("\nCards played per game:")
+    for name, count in plays.most_common():
+        print(f"  {name:<16} {count / games:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play AI-only Exploding Kittens games headlessly.")
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--players", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=None, help="defaults to one per core")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--party", action="store_true", help="scale the deck with the table (engine.PARTY_SEATS)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    wins, lengths, plays = simulate(args.games, args.players, args.workers, args.seed, party=args.party)
+    report(args.games, args.players, time.perf_counter() - start, wins, lengths, plays)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+# snapshots.py
+# Durable copies of every game so a deploy or a crashed worker does not
+# lose the tables in progress. Each game is packed into a small binary
+# snapshot and written to a local SQLite database in WAL mode by a
+# background thread; requests only pay for packing the bytes.
+#
+# Rooms come back lazily: RoomRegistry asks the store for a snapshot the
+# first time it is asked for a room id it does not hold in memory.
+
+import json
+import random
+from collections import OrderedDict
+import sqlite3
+import struct
+import threading
+import time
+
+from engine import CARD_IMAGES, EXPLODING_KITTEN, Game, Player
+
+FORMAT_VERSION = 8 # 2 added the optional event log, 3 the AI level, 4 the action log, 5 party-size tables, 6 kitten odds, 7 the seat token, 8 recent responses, 9 estimated odds
+MAGIC = b"EKS"
+
+FLUSH_INTERVAL = 0.05 # seconds the writer waits to batch up saves
+KEEP_SECONDS = 7 * 24 * 3600 # snapshots untouched this long get pruned
+PRUNE_INTERVAL = 3600
+
+# ---------------- BINARY FORMAT ----------------
+# header: magic, version, game_started, auto_ai, current player (-1 = none),
+#         turns_to_take, seq, events_start, player count
+HEADER = struct.Struct("<3sBBBhHIIH")
+# Up to version 4 the player count was one byte
+HEADER_V4 = struct.Struct("<3sBBBhHIIB")
+# per player: alive, human, name length, hand length (name + hand bytes follow)
+PLAYER = struct.Struct("<BBBH")
+# Mersenne Twister state: 624 words plus the position, then gauss_next
+RNG_WORDS = struct.Struct("<625I")
+GAUSS = struct.Struct("<Bd")
+LENGTH = struct.Struct("<I")
+
+
+def encode(game, events=False):
+    """Pack everything needed to carry on playing `game` into bytes.
+
+    The event log and the responses to recent moves are only kept with
+    events=True (store.py needs them so every worker can serve /events and
+    answer retries); otherwise a restored game starts a fresh log at the
+    same sequence number (see decode)."""
+    players = game.players
+    parts = [HEADER.pack(MAGIC, FORMAT_VERSION, game.game_started, game.auto_ai, game.current_player_idx,
+                         game.turns_to_take, game.seq, game.events_start, len(players))]
+    for p in players:
+        name = p.name.encode()[:255]
+        parts.append(PLAYER.pack(p.is_alive, p.is_human, len(name), len(p.hand)))
+        parts.append(name)
+        parts.append(bytes(p.hand.cards))
+
+    # Top card first
+    deck = bytes(game.deck)
+    parts.append(LENGTH.pack(len(deck)))
+    parts.append(deck)
+
+    # Which picture each card type uses, as an index into CARD_IMAGES
+    parts.append(bytes(images.index(image) if image in images else 0
+                       for images, image in zip(CARD_IMAGES, game.images)))
+
+    pending = json.dumps(game.pending_action).encode() if game.pending_action else b""
+    parts.append(LENGTH.pack(len(pending)))
+    parts.append(pending)
+
+    _, words, gauss = game.rng.getstate()
+    parts.append(RNG_WORDS.pack(*words))
+    parts.append(GAUSS.pack(gauss is not None, gauss or 0.0))
+
+    log = json.dumps(game.events, separators=(",", ":")).encode() if events else b""
+    parts.append(LENGTH.pack(len(log)))
+    parts.append(log)
+
+    level = json.dumps(game.ai_level).encode() if game.ai_level else b""
+    parts.append(LENGTH.pack(len(level)))
+    parts.append(level)
+
+    actions = json.dumps(game.action_log, separators=(",", ":")).encode() if game.action_log else b""
+    parts.append(LENGTH.pack(len(actions)))
+    parts.append(actions)
+
+    # What each seat has seen of the deck beyond what everyone knows
+    # (risk.py), as [seat, [[layout, weight], ...]] pairs, then [seat, null]
+    # for each seat whose chance is only an estimate
+    private, estimated = game.odds.private, game.odds.estimated
+    odds = json.dumps([[seat, list(belief.items())] for seat, belief in private.items()]
+                      + [[seat, None] for seat in sorted(estimated)],
+                      separators=(",", ":")).encode() if private or estimated else b""
+    parts.append(LENGTH.pack(len(odds)))
+    parts.append(odds)
+
+    token = game.seat_token.encode() if game.seat_token else b""
+    parts.append(LENGTH.pack(len(token)))
+    parts.append(token)
+
+    responses = json.dumps(list(game.responses.items()), separators=(",", ":")).encode() if events and game.responses else b""
+    parts.append(LENGTH.pack(len(responses)))
+    parts.append(responses)
+    return b"".join(parts)
+
+
+def decode(data):
+    """Rebuild a Game from encode()'s bytes."""
+    header = HEADER if len(data) > 3 and data[3] >= 5 else HEADER_V4
+    magic, version, started, auto_ai, current, turns, seq, events_start, count = header.unpack_from(data)
+    if magic != MAGIC or not 1 <= version <= FORMAT_VERSION:
+        raise ValueError(f"unsupported snapshot (magic {magic!r}, version {version})")
+    pos = header.size
+
+    game = Game(rng=random.Random())
+    game.game_started = bool(started)
+    game.auto_ai = bool(auto_ai)
+    game.current_player_idx = current
+    game.turns_to_take = turns
+    game.seq = seq
+
+    for _ in range(count):
+        alive, human, name_len, hand_len = PLAYER.unpack_from(data, pos)
+        pos += PLAYER.size
+        player = Player(data[pos:pos + name_len].decode(), is_human=bool(human))
+        pos += name_len
+        player.is_alive = bool(alive)
+        player.hand.extend(data[pos:pos + hand_len])
+        pos += hand_len
+        game.players.append(player)
+    game.reset_seats()
+
+    (deck_len,) = LENGTH.unpack_from(data, pos)
+    pos += LENGTH.size
+    game.deck.extend(data[pos:pos + deck_len])
+    # Before version 6 what each seat had seen of the deck was not kept:
+    # everyone restarts from what the whole table knows
+    game.odds.reset(deck_len, data[pos:pos + deck_len].count(EXPLODING_KITTEN))
+    pos += deck_len
+
+    picks = data[pos:pos + len(CARD_IMAGES)]
+    pos += len(CARD_IMAGES)
+    # Art that has since been removed falls back to the first picture
+    game.images = tuple(images[i] if i < len(images) else images[0] for images, i in zip(CARD_IMAGES, picks))
+
+    (pending_len,) = LENGTH.unpack_from(data, pos)
+    pos += LENGTH.size
+    game.pending_action = json.loads(data[pos:pos + pending_len]) if pending_len else None
+    pos += pending_len
+
+    words = RNG_WORDS.unpack_from(data, pos)
+    pos += RNG_WORDS.size
+    has_gauss, gauss = GAUSS.unpack_from(data, pos)
+    game.rng.setstate((3, words, gauss if has_gauss else None))
+    pos += GAUSS.size
+
+    log_len = 0
+    if version >= 2:
+        (log_len,) = LENGTH.unpack_from(data, pos)
+        pos += LENGTH.size
+    log = data[pos:pos + log_len]
+    pos += log_len
+
+    if version >= 3:
+        (level_len,) = LENGTH.unpack_from(data, pos)
+        pos += LENGTH.size
+        if level_len:
+            game.ai_level = json.loads(data[pos:pos + level_len])
+        pos += level_len
+
+    if version >= 4:
+        (actions_len,) = LENGTH.unpack_from(data, pos)
+        pos += LENGTH.size
+        if actions_len:
+            game.action_log = json.loads(data[pos:pos + actions_len])
+        pos += actions_len
+
+    if version >= 6:
+        (odds_len,) = LENGTH.unpack_from(data, pos)
+        pos += LENGTH.size
+        for seat, belief in json.loads(data[pos:pos + odds_len]) if odds_len else ():
+            if belief is None:
+                game.odds.estimated.add(seat)
+                continue
+            # Layout blocks are KITTEN / SAFE or (cards, kittens) runs
+            game.odds.private[seat] = {tuple(b if isinstance(b, str) else tuple(b) for b in blocks): weight
+                                       for blocks, weight in belief}
+        pos += odds_len
+
+    if version >= 7:
+        (token_len,) = LENGTH.unpack_from(data, pos)
+        pos += LENGTH.size
+        # Older snapshots have none, so nobody is seated at those tables any more
+        game.seat_token = data[pos:pos + token_len].decode() or None
+        pos += token_len
+
+    if version >= 8:
+        (responses_len,) = LENGTH.unpack_from(data, pos)
+        pos += LENGTH.size
+        if responses_len:
+            game.responses = OrderedDict(json.loads(data[pos:pos + responses_len]))
+
+    if log:
+        game.events = json.loads(log)
+        game.events_start = events_start
+        return game
+
+    # Old cursors stay valid: clients that were at `seq` get this start
+    # event next and redraw the table from it
+    game.events_start = seq + 1
+    if game.game_started:
+        game.record([{"type": "start", "players": game.public_players(), "current_player": current, "restored": True}])
+    return game
+
+
+# ---------------- SQLITE STORE ----------------
+class SnapshotStore:
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL, keep_seconds=KEEP_SECONDS, clock=time.time):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.keep_seconds = keep_seconds
+        self.clock = clock
+        self.writes = 0
+        self.batches = 0
+
+        self._local = threading.local()
+        db = self._db()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("CREATE TABLE IF NOT EXISTS snapshots (room_id TEXT PRIMARY KEY, updated REAL NOT NULL, data BLOB NOT NULL)")
+        db.commit()
+
+        # room_id -> latest bytes not yet on disk. A room saved twice before
+        # the writer wakes up is only written once.
+        self._pending = {}
+        # The batch the writer is committing right now, still readable by load()
+        self._writing = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._idle = threading.Condition(self._lock)
+        self._flushing = False
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, name="snapshots", daemon=True)
+        self._writer.start()
+
+    def _db(self):
+        # One connection per thread; WAL lets readers run during a write
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            # WAL + NORMAL survives a crashed process; only an OS crash can
+            # lose the last few batches
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def save(self, room_id, game):
+        """Queue a snapshot of `game`. Call with the room's lock held so the
+        bytes are consistent; the disk write happens on the writer thread."""
+        self.save_bytes(room_id, encode(game))
+
+    def save_bytes(self, room_id, data):
+        with self._lock:
+            self._pending[room_id] = data
+        self._wake.set()
+
+    def load(self, room_id):
+        """The saved Game for `room_id`, or None."""
+        with self._lock:
+            data = self._pending.get(room_id) or self._writing.get(room_id)
+        if data is None:
+            row = self._db().execute("SELECT data FROM snapshots WHERE room_id = ?", (room_id,)).fetchone()
+            if row is None:
+                return None
+            data = row[0]
+        return decode(data)
+
+    def delete(self, room_id):
+        with self._lock:
+            self._pending.pop(room_id, None)
+            self._writing.pop(room_id, None)
+        db = self._db()
+        db.execute("DELETE FROM snapshots WHERE room_id = ?", (room_id,))
+        db.commit()
+
+    def flush(self):
+        """Block until everything saved so far is on disk."""
+        self._wake.set()
+        with self._idle:
+            self._idle.wait_for(lambda: not self._pending and not self._flushing)
+
+    def close(self):
+        self.flush()
+        self._closed = True
+        self._wake.set()
+        self._writer.join()
+
+    def count(self):
+        """Snapshots on disk, after writing out anything still queued."""
+        self.flush()
+        return self._db().execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+
+    def _run(self):
+        db = self._db()
+        next_prune = 0.0
+        while not self._closed:
+            self._wake.wait()
+            # Let a burst of saves pile up, then write them in one transaction
+            time.sleep(self.flush_interval)
+            self._wake.clear()
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._writing = batch
+                self._flushing = bool(batch)
+            if batch:
+                now = self.clock()
+                with db:
+                    db.executemany("INSERT OR REPLACE INTO snapshots (room_id, updated, data) VALUES (?, ?, ?)",
+                                   [(room_id, now, data) for room_id, data in batch.items()])
+                self.writes += len(batch)
+                self.batches += 1
+            now = self.clock()
+            if now >= next_prune:
+                next_prune = now + PRUNE_INTERVAL
+                with db:
+                    db.execute("DELETE FROM snapshots WHERE updated < ?", (now - self.keep_seconds,))
+            with self._idle:
+                self._writing = {}
+                self._flushing = False
+                self._idle.notify_all()
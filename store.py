@@ -0,0 +1,207 @@
+# store.py
+# Shared game state for running app.py under several worker processes.
+# Every backend keeps one versioned snapshot (see snapshots.py) per room;
+# save() only succeeds if the caller read the latest version, so workers
+# serving the same room never overwrite each other's moves.
+#
+#   GAME_STORE=memory          one process, several threads (dev / tests)
+#   GAME_STORE=sqlite:games.db SQLite on local disk, shared by all workers
+#   GAME_STORE=file:state/     one file per room, a stand-in for a
+#                              networked key-value store such as Redis
+
+import abc
+import fcntl
+import hashlib
+import os
+import sqlite3
+import threading
+
+from snapshots import decode, encode
+
+
+class VersionConflict(Exception):
+    """Somebody else saved the room since we loaded it."""
+
+
+class GameStore(abc.ABC):
+    # Backends store (version, bytes); this layer turns the bytes into games.
+    # Version 0 means "not stored yet".
+    def __init__(self):
+        self.conflicts = 0
+
+    def load(self, room_id):
+        """(game, version) for the latest save of `room_id`, or None."""
+        found = self.get(room_id)
+        if found is None:
+            return None
+        version, data = found
+        return decode(data), version
+
+    def save(self, room_id, game, expected_version):
+        """Store `game` if the room is still at `expected_version` and return
+        the new version; raise VersionConflict otherwise."""
+        try:
+            return self.put(room_id, encode(game, events=True), expected_version)
+        except VersionConflict:
+            self.conflicts += 1
+            raise
+
+    @abc.abstractmethod
+    def version(self, room_id):
+        """The room's stored version, 0 if it has none."""
+
+    @abc.abstractmethod
+    def get(self, room_id):
+        """(version, bytes) for the room, or None."""
+
+    @abc.abstractmethod
+    def put(self, room_id, data, expected_version):
+        """Store `data` as the next version if the room is still at
+        `expected_version`; raise VersionConflict otherwise."""
+
+    @abc.abstractmethod
+    def delete(self, room_id):
+        """Forget the room."""
+
+
+# ---------------- MEMORY ----------------
+class MemoryStore(GameStore):
+    # Only shared between threads of one process
+    def __init__(self):
+        super().__init__()
+        self._rooms = {}
+        self._lock = threading.Lock()
+
+    def version(self, room_id):
+        found = self._rooms.get(room_id)
+        return found[0] if found else 0
+
+    def get(self, room_id):
+        return self._rooms.get(room_id)
+
+    def put(self, room_id, data, expected_version):
+        with self._lock:
+            if self.version(room_id) != expected_version:
+                raise VersionConflict(room_id)
+            self._rooms[room_id] = (expected_version + 1, data)
+            return expected_version + 1
+
+    def delete(self, room_id):
+        with self._lock:
+            self._rooms.pop(room_id, None)
+
+
+# ---------------- SQLITE ----------------
+class SQLiteStore(GameStore):
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self._local = threading.local()
+        db = self._db()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("CREATE TABLE IF NOT EXISTS games (room_id TEXT PRIMARY KEY, version INTEGER NOT NULL, data BLOB NOT NULL)")
+        db.commit()
+
+    def _db(self):
+        # One connection per thread (and per worker process)
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def version(self, room_id):
+        row = self._db().execute("SELECT version FROM games WHERE room_id = ?", (room_id,)).fetchone()
+        return row[0] if row else 0
+
+    def get(self, room_id):
+        return self._db().execute("SELECT version, data FROM games WHERE room_id = ?", (room_id,)).fetchone()
+
+    def put(self, room_id, data, expected_version):
+        db = self._db()
+        with db:
+            if expected_version == 0:
+                cur = db.execute("INSERT OR IGNORE INTO games (room_id, version, data) VALUES (?, 1, ?)", (room_id, data))
+            else:
+                cur = db.execute("UPDATE games SET version = version + 1, data = ? WHERE room_id = ? AND version = ?",
+                                 (data, room_id, expected_version))
+        if cur.rowcount != 1:
+            raise VersionConflict(room_id)
+        return expected_version + 1
+
+    def delete(self, room_id):
+        db = self._db()
+        with db:
+            db.execute("DELETE FROM games WHERE room_id = ?", (room_id,))
+
+
+# ---------------- FILE (KEY-VALUE) ----------------
+class FileStore(GameStore):
+    # Each room is one file: an 8 byte version followed by the snapshot.
+    # Writers take an flock on a side lock file, then swap the data file in
+    # with os.replace, so readers never see half a write and need no lock.
+    VERSION_BYTES = 8
+
+    def __init__(self, directory):
+        super().__init__()
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, room_id):
+        # Room ids come from clients: a hash keeps any of them a safe,
+        # fixed-length file name
+        return os.path.join(self.directory, hashlib.blake2b(room_id.encode(), digest_size=20).hexdigest())
+
+    def _read(self, path, size=-1):
+        try:
+            with open(path, "rb") as f:
+                return f.read(size)
+        except FileNotFoundError:
+            return None
+
+    def version(self, room_id):
+        head = self._read(self._path(room_id), self.VERSION_BYTES)
+        return int.from_bytes(head, "little") if head else 0
+
+    def get(self, room_id):
+        raw = self._read(self._path(room_id))
+        if not raw:
+            return None
+        return int.from_bytes(raw[:self.VERSION_BYTES], "little"), raw[self.VERSION_BYTES:]
+
+    def put(self, room_id, data, expected_version):
+        path = self._path(room_id)
+        with open(path + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if self.version(room_id) != expected_version:
+                raise VersionConflict(room_id)
+            version = expected_version + 1
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(version.to_bytes(self.VERSION_BYTES, "little"))
+                f.write(data)
+            os.replace(tmp, path)
+            return version
+
+    def delete(self, room_id):
+        path = self._path(room_id)
+        for name in (path, path + ".lock"):
+            try:
+                os.remove(name)
+            except FileNotFoundError:
+                pass
+
+
+def open_store(spec):
+    """Build a store from a GAME_STORE value, or None for an empty one."""
+    if not spec:
+        return None
+    kind, _, where = spec.partition(":")
+    if kind == "memory":
+        return MemoryStore()
+    if kind == "sqlite" and where:
+        return SQLiteStore(where)
+    if kind == "file" and where:
+        return FileStore(where)
+    raise ValueError(f"unknown GAME_STORE {spec!r} (use memory, sqlite:PATH or file:DIR)")
@@ -0,0 +1,84 @@
+# test_deck.py
+# The block deck (deck.py) against a plain list, top card first, with the
+# journal attached: random draws, inserts, extends and shuffles, rolled
+# back to random marks. Small blocks make the splits and the Fenwick tree
+# do real work.
+#
+#   python -m pytest test_deck.py
+
+import random
+
+import pytest
+
+import deck
+from deck import Deck
+from journal import Journal
+
+
+def step(d, model, rng):
+    op = rng.random()
+    card = rng.randrange(8)
+    if op < 0.25:
+        assert d.draw() == (model.pop(0) if model else None)
+    elif op < 0.35:
+        assert d.draw_bottom() == (model.pop() if model else None)
+    elif op < 0.7:
+        index = rng.randint(0, len(model))
+        d.insert(index, card)
+        model.insert(index, card)
+    elif op < 0.8:
+        d.add_card(card)
+        model.append(card)
+    elif op < 0.85:
+        d.extend([card, 7 - card])
+        model += [card, 7 - card]
+    elif op < 0.9:
+        d.shuffle(rng)
+        model[:] = list(d)
+        assert sorted(model) == sorted(d)
+    elif op < 0.92:
+        d.clear()
+        model.clear()
+    else:
+        assert d.peek(3) == model[:3]
+
+
+@pytest.mark.parametrize("block_size", [2, 3, 8, 512])
+@pytest.mark.parametrize("kind", [list, bytearray])
+def test_matches_list(monkeypatch, block_size, kind):
+    monkeypatch.setattr(deck, "BLOCK_SIZE", block_size)
+    rng = random.Random(block_size)
+    for _ in range(50):
+        model = [rng.randrange(8) for _ in range(rng.randint(0, 40))]
+        d = Deck(model, kind=kind)
+        for _ in range(200):
+            step(d, model, rng)
+            assert list(d) == model
+            assert len(d) == len(model)
+
+
+@pytest.mark.parametrize("block_size", [2, 3, 512])
+def test_journal_undo(monkeypatch, block_size):
+    monkeypatch.setattr(deck, "BLOCK_SIZE", block_size)
+    rng = random.Random(block_size)
+    for _ in range(50):
+        model = [rng.randrange(8) for _ in range(rng.randint(0, 40))]
+        d = Deck(model, kind=bytearray)
+        dealt = list(model)
+        d.journal = journal = Journal()
+        # (journal mark, the deck then), oldest first
+        saved = []
+        for _ in range(200):
+            if rng.random() < 0.1:
+                saved.append((journal.mark(), list(model)))
+            step(d, model, rng)
+            if saved and rng.random() < 0.05:
+                mark, model = saved.pop(rng.randrange(len(saved)))
+                # Marks after this one are gone with the entries they pointed at
+                saved = [(m, cards) for m, cards in saved if m <= mark]
+                journal.undo(mark)
+                assert len(journal) == mark
+            assert list(d) == model
+            assert len(d) == len(model)
+        journal.undo()
+        assert list(d) == dealt
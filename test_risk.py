@@ -0,0 +1,126 @@
+# test_risk.py
+# KittenOdds against brute force: every arrangement of kittens in a small
+# deck, weighted, filtered and split by hand as each seat sees the game
+# play out. The chance each seat gets must match exactly.
+#
+#   python -m pytest test_risk.py
+
+import itertools
+import random
+from collections import defaultdict
+
+import pytest
+
+import risk
+from risk import KittenOdds
+
+SEATS = 3
+
+
+def normalize(belief):
+    total = sum(belief.values())
+    return {layout: weight / total for layout, weight in belief.items() if weight > 0}
+
+
+def every_layout(size, kittens):
+    # layout: True where a kitten, top first
+    return normalize({tuple(i in spots for i in range(size)): 1.0
+                      for spots in itertools.combinations(range(size), kittens)})
+
+
+def top(belief):
+    return sum(weight for layout, weight in belief.items() if layout and layout[0])
+
+
+@pytest.fixture(autouse=True)
+def no_fallback(monkeypatch):
+    # A private belief over the cap falls back to the shared one, which is
+    # an estimate; lifted here so every seat's chance is exact
+    monkeypatch.setattr(risk, "MAX_LAYOUTS", 10 ** 9)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_matches_brute_force(seed):
+    rng = random.Random(seed)
+    for _ in range(100):
+        size, kittens = rng.randint(3, 9), rng.randint(1, 3)
+        deck = [True] * kittens + [False] * (size - kittens)
+        rng.shuffle(deck)
+        odds = KittenOdds()
+        odds.reset(size, kittens)
+        truth = [every_layout(size, kittens) for _ in range(SEATS)]
+
+        for _ in range(25):
+            if not deck:
+                break
+            op = rng.random()
+            if op < 0.35:
+                card = deck.pop(0)
+                odds.drew(card)
+                truth = [normalize({layout[1:]: weight for layout, weight in belief.items() if layout and layout[0] == card})
+                         for belief in truth]
+            elif op < 0.55:
+                seat = rng.randrange(SEATS)
+                shown = tuple(deck[:rng.randint(1, 3)])
+                odds.saw(seat, shown)
+                truth[seat] = normalize({layout: weight for layout, weight in truth[seat].items() if layout[:len(shown)] == shown})
+            elif op < 0.8:
+                # None: a put-back nobody at the table was shown
+                seat = rng.choice([*range(SEATS), None])
+                n = len(deck)
+                depth = rng.randint(0, n)
+                deck.insert(depth, True)
+                odds.put_back(seat, depth)
+                new = []
+                for i, belief in enumerate(truth):
+                    split = defaultdict(float)
+                    for layout, weight in belief.items():
+                        if i == seat:
+                            split[layout[:depth] + (True,) + layout[depth:]] += weight
+                        else:
+                            for d in range(n + 1):
+                                split[layout[:d] + (True,) + layout[d:]] += weight / (n + 1)
+                    new.append(normalize(split))
+                truth = new
+            else:
+                rng.shuffle(deck)
+                odds.shuffled()
+                truth = [every_layout(len(deck), sum(deck)) for _ in range(SEATS)]
+
+            for seat in range(SEATS):
+                assert odds.chance(seat) == pytest.approx(top(truth[seat]), abs=1e-9)
+            assert odds.chance() == pytest.approx(sum(deck) / len(deck) if deck else 0.0)
+
+
+def test_capped_belief_is_an_estimate(monkeypatch):
+    monkeypatch.setattr(risk, "MAX_LAYOUTS", 4)
+    odds = KittenOdds()
+    odds.reset(10, 2)
+    odds.saw(0, [False, True, False])
+    assert odds.exact(0) and odds.chance(0) == 0.0
+    # Kittens put back where seat 0 did not see split its layouts past the cap
+    for depth in (4, 7, 2):
+        odds.put_back(None, depth)
+    assert not odds.knows(0) and not odds.exact(0)
+    assert odds.chance(0) == odds.chance()
+    assert odds.exact(1) and odds.exact()
+    # Still an estimate when it sees more, until the next shuffle
+    odds.saw(0, [False])
+    assert odds.knows(0) and not odds.exact(0)
+    state = odds.state()
+    odds.shuffled()
+    assert odds.exact(0)
+    odds.restore(state)
+    assert not odds.exact(0)
+
+
+def test_restore_undoes_updates():
+    odds = KittenOdds()
+    odds.reset(10, 2)
+    odds.saw(0, [False, True, False])
+    state = odds.state()
+    before = [odds.chance(seat) for seat in range(SEATS)]
+    odds.drew(False)
+    odds.put_back(1, 0)
+    odds.restore(state)
+    assert [odds.chance(seat) for seat in range(SEATS)] == before
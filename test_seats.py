@@ -0,0 +1,63 @@
+# test_seats.py
+# SeatRing against a plain list of who is still in: random removals and
+# undos to random marks, on tables from one seat to party size.
+#
+#   python -m pytest test_seats.py
+
+import random
+
+import pytest
+
+from seats import SeatRing
+
+
+def next_in(alive, seat):
+    # The scan the ring replaced
+    n = len(alive)
+    for step in range(1, n + 1):
+        if alive[(seat + step) % n]:
+            return (seat + step) % n
+    return -1
+
+
+def check(ring, alive):
+    assert ring.count == len(ring) == sum(alive)
+    assert list(ring.alive) == [int(a) for a in alive]
+    assert ring.head == -1 if not any(alive) else alive[ring.head]
+    for seat in range(len(alive)):
+        assert ring.next(seat) == next_in(alive, seat)
+
+
+@pytest.mark.parametrize("seats", [1, 2, 3, 5, 8, 40, 100])
+def test_matches_list(seats):
+    rng = random.Random(seats)
+    for _ in range(30):
+        alive = [rng.random() < 0.8 for _ in range(seats)]
+        ring = SeatRing(alive)
+        check(ring, alive)
+        # (ring mark, who was in then), oldest first
+        saved = []
+        for _ in range(3 * seats):
+            op = rng.random()
+            if op < 0.15:
+                saved.append((ring.mark(), list(alive)))
+            elif op < 0.3 and saved:
+                mark, alive = saved.pop(rng.randrange(len(saved)))
+                saved = [(m, was) for m, was in saved if m <= mark]
+                ring.undo(mark)
+            else:
+                # Sometimes a seat already out, which changes nothing
+                seat = rng.randrange(seats)
+                ring.remove(seat)
+                alive[seat] = False
+            check(ring, alive)
+
+
+def test_undo_to_the_start():
+    ring = SeatRing([True] * 10)
+    mark = ring.mark()
+    for seat in random.Random(1).sample(range(10), 10):
+        ring.remove(seat)
+    assert ring.next(3) == -1 and ring.head == -1
+    ring.undo(mark)
+    check(ring, [True] * 10)
@@ -0,0 +1,105 @@
+# timers.py
+# One thread and one heap for every deadline the server keeps: turn and
+# Favor timeouts, and the pause before each AI move in push mode. Timers
+# are keyed (e.g. (room_id, "turn")); scheduling a key again replaces its
+# timer and cancel() drops it. Both are O(log n) / O(1), replaced and
+# cancelled entries are skipped when they reach the top of the heap.
+#
+#   timers = Scheduler()
+#   timers.schedule((room.id, "turn"), 60, lambda: ...)
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+log = logging.getLogger("timers")
+
+
+class Scheduler:
+    def __init__(self, clock=time.monotonic, name="timers"):
+        self.clock = clock
+        self.name = name
+        # (due, tiebreak, key) min-heap; the entry is live only while
+        # _timers[key] still holds the same tiebreak
+        self._heap = []
+        self._timers = {}
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self.fired = 0
+
+    def __len__(self):
+        return len(self._timers)
+
+    def __contains__(self, key):
+        return key in self._timers
+
+    def schedule(self, key, delay, fn):
+        """Call fn() on the timer thread about `delay` seconds from now,
+        replacing any timer already set for key. fn must be quick: hand real
+        work to a pool."""
+        due = self.clock() + delay
+        with self._cond:
+            tiebreak = next(self._counter)
+            self._timers[key] = (tiebreak, fn, due)
+            heapq.heappush(self._heap, (due, tiebreak, key))
+            self._compact()
+            if self._heap[0][1] == tiebreak:
+                self._cond.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+        return due
+
+    def cancel(self, key):
+        with self._cond:
+            return self._timers.pop(key, None) is not None
+
+    def due(self, key):
+        """When key's timer fires (clock time), or None."""
+        with self._cond:
+            timer = self._timers.get(key)
+            return timer[2] if timer is not None else None
+
+    def _compact(self):
+        # Called with the lock held. Replaced and cancelled entries stay in
+        # the heap until popped; rebuild it once they are most of it
+        if len(self._heap) > 2 * len(self._timers) + 1024:
+            self._heap = [entry for entry in self._heap if self._timers.get(entry[2], (None,))[0] == entry[1]]
+            heapq.heapify(self._heap)
+
+    def pop_due(self, now=None):
+        """Remove and return the callbacks of every timer due by now."""
+        now = self.clock() if now is None else now
+        ready = []
+        with self._cond:
+            heap = self._heap
+            while heap and heap[0][0] <= now:
+                _, tiebreak, key = heapq.heappop(heap)
+                timer = self._timers.get(key)
+                if timer is not None and timer[0] == tiebreak:
+                    del self._timers[key]
+                    ready.append(timer[1])
+        return ready
+
+    def run_due(self, now=None):
+        ready = self.pop_due(now)
+        for fn in ready:
+            try:
+                fn()
+            except Exception:
+                log.exception("timer callback failed")
+        self.fired += len(ready)
+        return len(ready)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    wait = self._heap[0][0] - self.clock() if self._heap else None
+                    if wait is not None and wait <= 0:
+                        break
+                    self._cond.wait(wait)
+            self.run_due()